@@ -0,0 +1,240 @@
+import argparse
+import glob
+import json
+import os
+import struct
+import sys
+import time
+import zipfile
+
+from casespec import CaseSpec
+from content import load_pack
+from engine import Clue, Location, Suspect, iter_cases, make_answer_key, use_content
+
+# ---------------------
+# Config
+# ---------------------
+# Cases per .npz file; the writer holds one chunk in memory at a time
+CHUNK_SIZE = 10000
+CHUNK_NAME = "cases-{:06d}.npz"
+
+# ---------------------
+# Records
+# ---------------------
+# One case as plain JSON-able data; the same record shape comes back out of
+# both the NDJSON and the .npz readers.
+def case_to_dict(case):
+    return {
+        "seed": case.get('seed'),
+        "culprit": case['culprit'],
+        "linking_tag": case['linking_tag'],
+        "suspects": [{"name": s.name, "motive": s.motive, "alibi": s.alibi, "tags": sorted(s.tags)}
+                     for s in case['suspects'].values()],
+        "locations": [{"name": name, "clues": [{"id": c.id, "type": c.type_name, "desc": c.desc,
+                                                 "tags": sorted(c.tags)} for c in loc.clues]}
+                      for name, loc in case['locations'].items()],
+    }
+
+def case_from_dict(record):
+    # A playable case again, answer key included.
+    locations = {}
+    for entry in record["locations"]:
+        loc = Location(entry["name"])
+        loc.clues = [Clue(c["id"], c["type"], c["desc"], c["tags"]) for c in entry["clues"]]
+        locations[loc.name] = loc
+    suspects = {s["name"]: Suspect(s["name"], s["motive"], s["alibi"], s["tags"]) for s in record["suspects"]}
+    case = {
+        "locations": locations,
+        "suspects": suspects,
+        "culprit": record["culprit"],
+        "linking_tag": record["linking_tag"]
+    }
+    case['answer_key'] = make_answer_key(case)
+    if record.get("seed") is not None:
+        case['seed'] = record["seed"]
+    return case
+
+# ---------------------
+# NDJSON
+# ---------------------
+def write_ndjson(cases, f):
+    # One record per line; returns the number of cases written.
+    n = 0
+    for case in cases:
+        f.write(json.dumps(case_to_dict(case), separators=(",", ":")) + "\n")
+        n += 1
+    return n
+
+def iter_ndjson(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# ---------------------
+# Columnar chunks
+# ---------------------
+# Each .npz file holds up to CHUNK_SIZE cases as flat columns. Strings are
+# codes into the chunk's own `strings` column, and nested lists are
+# CSR-style: the items of row i are items[start[i]:start[i + 1]].
+#   seed, culprit, linking_tag                        one per case
+#   suspect_start -> suspect_name/motive/alibi        suspect_tag_start -> suspect_tags
+#   location_start -> location_name                   clue_start -> clue_id/type/desc
+#   clue_tag_start -> clue_tags
+# Files are written uncompressed so load_chunk can memory-map the columns.
+def _encode_chunk(records):
+    import numpy as np  # optional dependency, only needed for .npz files
+    codes = {}
+
+    def code(text):
+        c = codes.get(text)
+        if c is None:
+            c = codes[text] = len(codes)
+        return c
+
+    cols = {name: [] for name in (
+        "seed", "culprit", "linking_tag", "suspect_name", "suspect_motive", "suspect_alibi", "suspect_tags",
+        "location_name", "clue_id", "clue_type", "clue_desc", "clue_tags")}
+    starts = {name: [0] for name in ("suspect_start", "suspect_tag_start", "location_start",
+                                     "clue_start", "clue_tag_start")}
+    for r in records:
+        cols["seed"].append(-1 if r["seed"] is None else r["seed"])
+        cols["culprit"].append(code(r["culprit"]))
+        cols["linking_tag"].append(code(r["linking_tag"]))
+        for s in r["suspects"]:
+            cols["suspect_name"].append(code(s["name"]))
+            cols["suspect_motive"].append(code(s["motive"]))
+            cols["suspect_alibi"].append(code(s["alibi"]))
+            cols["suspect_tags"].extend(code(t) for t in s["tags"])
+            starts["suspect_tag_start"].append(len(cols["suspect_tags"]))
+        starts["suspect_start"].append(len(cols["suspect_name"]))
+        for loc in r["locations"]:
+            cols["location_name"].append(code(loc["name"]))
+            for c in loc["clues"]:
+                cols["clue_id"].append(c["id"])
+                cols["clue_type"].append(code(c["type"]))
+                cols["clue_desc"].append(code(c["desc"]))
+                cols["clue_tags"].extend(code(t) for t in c["tags"])
+                starts["clue_tag_start"].append(len(cols["clue_tags"]))
+            starts["clue_start"].append(len(cols["clue_id"]))
+        starts["location_start"].append(len(cols["location_name"]))
+
+    arrays = {name: np.array(values, dtype=np.int64 if name == "seed" else np.int32)
+              for name, values in cols.items()}
+    arrays.update((name, np.array(values, dtype=np.int64)) for name, values in starts.items())
+    arrays["strings"] = np.array(list(codes), dtype=str) if codes else np.zeros(0, dtype="U1")
+    return arrays
+
+def write_npz(cases, directory, chunk=CHUNK_SIZE):
+    # Writes CHUNK_NAME files into `directory`; returns the number of cases.
+    import numpy as np  # optional dependency, only needed for .npz files
+    os.makedirs(directory, exist_ok=True)
+    n = 0
+    records = []
+    for case in cases:
+        records.append(case_to_dict(case))
+        if len(records) == chunk:
+            np.savez(os.path.join(directory, CHUNK_NAME.format(n // chunk)), **_encode_chunk(records))
+            n += len(records)
+            records = []
+    if records:
+        np.savez(os.path.join(directory, CHUNK_NAME.format(n // chunk)), **_encode_chunk(records))
+        n += len(records)
+    return n
+
+def load_chunk(path, mmap=False):
+    # The columns of one .npz file. With mmap=True they are read-only views
+    # of the file, paged in as they are touched.
+    import numpy as np  # optional dependency, only needed for .npz files
+    if not mmap:
+        with np.load(path) as z:
+            return {name: z[name] for name in z.files}
+    columns = {}
+    with open(path, "rb") as raw, zipfile.ZipFile(raw) as zf:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} is compressed and cannot be memory-mapped")
+            # The member's data follows its local header, whose name and
+            # extra field lengths can differ from the central directory's
+            raw.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", raw.read(4))
+            raw.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(raw)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran, dtype = read_header(raw)
+            name = info.filename.removesuffix(".npy")
+            if 0 in shape:
+                columns[name] = np.zeros(shape, dtype)
+            else:
+                columns[name] = np.memmap(path, dtype, "r", raw.tell(), shape, "F" if fortran else "C")
+    return columns
+
+def iter_chunks(directory, mmap=False):
+    for path in sorted(glob.glob(os.path.join(directory, CHUNK_NAME.replace("{:06d}", "*")))):
+        yield load_chunk(path, mmap)
+
+def chunk_records(columns):
+    # The case_to_dict records stored in one chunk, in order.
+    strings = columns["strings"].tolist()
+
+    def text(name, i):
+        return strings[columns[name][i]]
+
+    def rows(start, i):
+        return range(columns[start][i], columns[start][i + 1])
+
+    def tags(start, column, i):
+        return [strings[t] for t in columns[column][columns[start][i]:columns[start][i + 1]]]
+
+    for i in range(len(columns["seed"])):
+        seed = int(columns["seed"][i])
+        yield {
+            "seed": None if seed < 0 else seed,
+            "culprit": text("culprit", i),
+            "linking_tag": text("linking_tag", i),
+            "suspects": [{"name": text("suspect_name", s), "motive": text("suspect_motive", s),
+                          "alibi": text("suspect_alibi", s), "tags": tags("suspect_tag_start", "suspect_tags", s)}
+                         for s in rows("suspect_start", i)],
+            "locations": [{"name": text("location_name", loc),
+                           "clues": [{"id": int(columns["clue_id"][c]), "type": text("clue_type", c),
+                                      "desc": text("clue_desc", c), "tags": tags("clue_tag_start", "clue_tags", c)}
+                                     for c in rows("clue_start", loc)]}
+                          for loc in rows("location_start", i)],
+        }
+
+# ---------------------
+# Command line
+# ---------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream generated cases to NDJSON or chunked .npz files.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0, help="first seed; cases use consecutive seeds")
+    parser.add_argument("--format", choices=("ndjson", "npz"), default="ndjson")
+    parser.add_argument("--out", default="-", help="NDJSON file ('-' for stdout) or .npz directory")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="cases per .npz file")
+    parser.add_argument("--spec", type=json.loads, help='CaseSpec arguments as JSON, e.g. \'{"suspects": 8}\'')
+    parser.add_argument("--pack", help="content pack (JSON) to deal cases from")
+    args = parser.parse_args(argv)
+    if args.pack:
+        use_content(load_pack(args.pack))
+    try:
+        spec = CaseSpec(**args.spec) if args.spec else None
+    except (TypeError, ValueError) as e:
+        parser.error(f"--spec: {e}")
+
+    started = time.perf_counter()
+    cases = iter_cases(args.seed, args.games, spec)
+    if args.format == "npz":
+        if args.out == "-":
+            parser.error("--format npz needs an --out directory")
+        n = write_npz(cases, args.out, args.chunk)
+    elif args.out == "-":
+        n = write_ndjson(cases, sys.stdout)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            n = write_ndjson(cases, f)
+    elapsed = time.perf_counter() - started
+    print(f"{n} cases in {elapsed:.1f}s ({n / elapsed:,.0f} cases/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
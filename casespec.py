@@ -0,0 +1,394 @@
+import bisect
+import itertools
+import random
+import threading
+
+import engine
+from engine import START_CREDIBILITY, AnswerKey, Clue, Location, Suspect, make_answer_key
+
+# ---------------------
+# Case specs
+# ---------------------
+class CaseSpec:
+    # What a constructed case must satisfy.
+    #   min_reachable_clues - culprit clues collectable (and the culprit still
+    #       accusable) within credibility_budget, starting at the first location
+    #   max_herrings_per_suspect - filler clues that may carry one innocent's name
+    #   herring_rate - share of filler clues that borrow an innocent suspect's tag
+    #   alibi_weights - relative odds of each location index being an alibi
+    #   lazy - deal each location's clues only when they are first looked at
+    #       (see LazyLocation), for cases with very many clues
+    def __init__(self, locations=4, suspects=5, culprit_clues=4, filler_clues=5,
+                 min_reachable_clues=2, credibility_budget=START_CREDIBILITY,
+                 max_herrings_per_suspect=1, herring_rate=0.5, alibi_weights=None, lazy=False):
+        self.locations = locations
+        self.suspects = suspects
+        self.culprit_clues = culprit_clues
+        self.filler_clues = filler_clues
+        self.min_reachable_clues = min_reachable_clues
+        self.credibility_budget = credibility_budget
+        self.max_herrings_per_suspect = max_herrings_per_suspect
+        self.herring_rate = herring_rate
+        self.alibi_weights = alibi_weights
+        self.lazy = lazy
+        self.validate()
+
+    def max_moves(self):
+        # Each collection and move costs 1, and credibility must still be
+        # above 0 after paying for the accusation.
+        return self.credibility_budget - 2 - self.min_reachable_clues
+
+    def validate(self):
+        content = engine.CONTENT
+        if not 1 <= self.locations <= len(content.locations):
+            raise ValueError(f"locations must be between 1 and {len(content.locations)}")
+        # Suspects need distinct first names, since that is the tag clues link by
+        if not 2 <= self.suspects <= len(content.first_names):
+            raise ValueError(f"suspects must be between 2 and {len(content.first_names)}")
+        if self.min_reachable_clues < 2:
+            raise ValueError("min_reachable_clues must be at least 2 for the case to be winnable")
+        if self.culprit_clues < self.min_reachable_clues:
+            raise ValueError("culprit_clues must be at least min_reachable_clues")
+        if self.filler_clues < 0 or self.max_herrings_per_suspect < 0:
+            raise ValueError("filler_clues and max_herrings_per_suspect cannot be negative")
+        if not 0 <= self.herring_rate <= 1:
+            raise ValueError("herring_rate must be between 0 and 1")
+        if self.max_moves() < 0:
+            raise ValueError("credibility_budget is too small to collect min_reachable_clues and accuse")
+        if self.alibi_weights is not None and len(self.alibi_weights) != self.locations:
+            raise ValueError("alibi_weights needs one weight per location")
+
+# ---------------------
+# Constructive generation
+# ---------------------
+# Every step draws a fixed number of values, so the cost is linear in the
+# size of the spec and there is no retry loop.
+def generate_from_spec(spec, rng=random):
+    content = engine.CONTENT
+    loc_names = rng.sample(content.locations, spec.locations)
+    locations = {name: Location(name) for name in loc_names}
+
+    name_tags, suspects_list = content.draw_suspects(rng, spec.suspects)
+    culprit = rng.randrange(spec.suspects)
+    culprit_name = suspects_list[culprit]
+    alibis = rng.choices(loc_names, weights=spec.alibi_weights, k=len(suspects_list))
+
+    suspects = {}
+    motive_tags = []
+    for name, tag, alibi in zip(suspects_list, name_tags, alibis):
+        m = rng.randrange(len(content.motives))
+        motive_tags.append(content.motive_tags[m])
+        suspects[name] = Suspect(name, content.motives[m], alibi, [tag, motive_tags[-1]])
+    linking_tag = name_tags[culprit]
+    if spec.lazy:
+        locations = _lazy_locations(spec, rng, loc_names, suspects, name_tags, motive_tags, culprit)
+        case = {
+            "locations": {loc.name: loc for loc in locations},
+            "suspects": suspects,
+            "culprit": culprit_name,
+            "linking_tag": linking_tag
+        }
+        case['answer_key'] = _lazy_answer_key(case)
+        return case
+
+    # Culprit clues: the required ones go along a route from the starting
+    # location that is short enough for the credibility budget.
+    k = spec.min_reachable_clues
+    stops = rng.randint(1, min(k, spec.max_moves() + 1, spec.locations))
+    route = [0] + rng.sample(range(1, spec.locations), stops - 1)
+    culprit_locs = route + [rng.choice(route) for _ in range(k - stops)]
+    culprit_locs += [rng.randrange(spec.locations) for _ in range(spec.culprit_clues - k)]
+
+    n_types = len(content.clue_types)
+    types = rng.sample(range(n_types), min(n_types, len(culprit_locs)))
+    clue_id = 1
+    for i, li in enumerate(culprit_locs):
+        t = types[i % len(types)]
+        tname, tdesc = content.clue_types[t]
+        c = Clue(clue_id, tname, f"{tdesc} clearly connected to {linking_tag}", {linking_tag, content.clue_tags[t]})
+        locations[loc_names[li]].clues.append(c)
+        clue_id += 1
+
+    # Filler clues: an innocent's name tag is only used while that suspect is
+    # under max_herrings_per_suspect; after that the filler takes their motive.
+    innocents = [i for i in range(spec.suspects) if i != culprit]
+    herrings = [0] * spec.suspects
+    for _ in range(spec.filler_clues):
+        t = rng.randrange(n_types)
+        tname, tdesc = content.clue_types[t]
+        if rng.random() < spec.herring_rate:
+            donor = rng.choice(innocents)
+            if rng.random() < 0.5 and herrings[donor] < spec.max_herrings_per_suspect:
+                herrings[donor] += 1
+                filler_tag = name_tags[donor]
+            else:
+                filler_tag = motive_tags[donor]
+        else:
+            filler_tag = content.motive_tags[rng.randrange(len(content.motives))]
+        c = Clue(clue_id, tname, f"Generic {tdesc} related to {filler_tag}", {filler_tag, content.clue_tags[t]})
+        locations[loc_names[rng.randrange(spec.locations)]].clues.append(c)
+        clue_id += 1
+
+    case = {
+        "locations": locations,
+        "suspects": suspects,
+        "culprit": culprit_name,
+        "linking_tag": linking_tag
+    }
+    case['answer_key'] = make_answer_key(case)
+    return case
+
+# ---------------------
+# Lazy dealing
+# ---------------------
+# Up front a lazy case only draws how many clues of each source tag every
+# location holds (a few values per location and suspect, however many clues
+# there are). Ids are fixed by those counts: culprit clues first, location by
+# location, then the filler clues in the same order. A location's clue types
+# and descriptions are drawn from its own seed the first time its clues are
+# read, so the same case always deals the same clues.
+#
+# A snapshot shares its LazyLocations with the live state, and the autosave
+# thread reads snapshots, so dealing is done under one lock.
+_deal_lock = threading.Lock()
+
+class LazyLocation(Location):
+    #   sources - (source tag, count) pairs; the first is the linking tag
+    #   culprit_id, filler_id - first ids of this location's two blocks
+    #   seed - seeds this location's draws
+    #   types - clue type indices to draw from
+    #   taken - ids of clues collected before the location was dealt (a
+    #       restored save); dealing leaves them out
+    def __init__(self, name, sources, culprit_id, filler_id, seed, types, taken=()):
+        self.name = name
+        self.sources = sources
+        self.culprit_id = culprit_id
+        self.filler_id = filler_id
+        self.seed = seed
+        self.types = types
+        self.taken = frozenset(taken)
+        self._clues = None
+
+    @classmethod
+    def from_summary(cls, name, summary):
+        return cls(name, [tuple(src) for src in summary["sources"]], summary["culprit_id"], summary["filler_id"],
+                   summary["seed"], summary["types"], summary.get("taken", ()))
+
+    def summary(self):
+        # Everything _deal() needs, JSON-able: what a save holds instead of the clues
+        return {"sources": [list(src) for src in self.sources], "culprit_id": self.culprit_id,
+                "filler_id": self.filler_id, "seed": self.seed, "types": list(self.types), "taken": self.removed()}
+
+    def copy(self):
+        # Still lazy, so it saves as a summary; its clue list is the engine's to change
+        loc = LazyLocation(self.name, self.sources, self.culprit_id, self.filler_id, self.seed, self.types, self.taken)
+        loc._clues = list(self.clues)
+        return loc
+
+    def ids(self):
+        # Every id this location deals, taken ones included
+        n_filler = sum(n for _, n in self.sources[1:])
+        return itertools.chain(range(self.culprit_id, self.culprit_id + self.sources[0][1]),
+                               range(self.filler_id, self.filler_id + n_filler))
+
+    def removed(self):
+        # Ids no longer here, in order
+        if self._clues is None:
+            return sorted(self.taken)
+        here = {c.id for c in self._clues}
+        return [cid for cid in self.ids() if cid not in here]
+
+    def source_tag(self, cid):
+        (tag, n), fillers = self.sources[0], self.sources[1:]
+        if self.culprit_id <= cid < self.culprit_id + n:
+            return tag
+        first = self.filler_id
+        for tag, n in fillers:
+            if first <= cid < first + n:
+                return tag
+            first += n
+        return None
+
+    @property
+    def clues(self):
+        if self._clues is None:
+            with _deal_lock:
+                if self._clues is None:
+                    self._clues = self._deal()
+        return self._clues
+
+    @clues.setter
+    def clues(self, clues):
+        self._clues = clues
+
+    def dealt(self):
+        return self._clues is not None
+
+    def clue_count(self):
+        if self._clues is None:
+            return sum(n for _, n in self.sources) - len(self.taken)
+        return len(self._clues)
+
+    def count_matching(self, tags):
+        # Exact from the summary: every clue has one source tag and no clue
+        # type tag is also a suspect's tag
+        if self._clues is None:
+            return (sum(n for t, n in self.sources if t in tags)
+                    - sum(1 for cid in self.taken if self.source_tag(cid) in tags))
+        return super().count_matching(tags)
+
+    def _deal(self):
+        content = engine.CONTENT
+        rng = random.Random(self.seed)
+        (linking_tag, n_culprit), fillers = self.sources[0], self.sources[1:]
+        clues = []
+        for i in range(n_culprit):
+            t = rng.choice(self.types)
+            tname, tdesc = content.clue_types[t]
+            clues.append(Clue(self.culprit_id + i, tname, f"{tdesc} clearly connected to {linking_tag}",
+                              {linking_tag, content.clue_tags[t]}))
+        cid = self.filler_id
+        for tag, n in fillers:
+            for _ in range(n):
+                t = rng.choice(self.types)
+                tname, tdesc = content.clue_types[t]
+                clues.append(Clue(cid, tname, f"Generic {tdesc} related to {tag}", {tag, content.clue_tags[t]}))
+                cid += 1
+        if self.taken:
+            # Drawn all the same, so the others come out as they always do
+            clues = [c for c in clues if c.id not in self.taken]
+        return clues
+
+class ClueLinks:
+    # suspects_by_clue (or named_by_clue, location_by_clue) for a lazy case, looked up from
+    # the id range each source tag (or location) covers instead of being
+    # stored per clue.
+    def __init__(self, ranges):
+        ranges = sorted(ranges)
+        self.starts = [first for first, _, _ in ranges]
+        self.ends = [first + n for first, n, _ in ranges]
+        self.linked = [linked for _, _, linked in ranges]
+
+    def get(self, cid, default=None):
+        i = bisect.bisect_right(self.starts, cid) - 1
+        if i < 0 or cid >= self.ends[i]:
+            return default
+        return self.linked[i]
+
+    def __getitem__(self, cid):
+        linked = self.get(cid)
+        if linked is None:
+            raise KeyError(cid)
+        return linked
+
+def _spread(counts, n, slots, rng):
+    # Adds n to counts[slots] as evenly as possible, the remainder at random.
+    slots = list(slots)
+    if not slots:
+        return counts
+    each, extra = divmod(n, len(slots))
+    for i in slots:
+        counts[i] += each
+    for i in rng.sample(slots, extra):
+        counts[i] += 1
+    return counts
+
+def _lazy_locations(spec, rng, loc_names, suspects, name_tags, motive_tags, culprit):
+    content = engine.CONTENT
+    n = spec.locations
+    owned = set(name_tags) | set(motive_tags)
+    types = tuple(t for t in range(len(content.clue_types)) if content.clue_tags[t] not in owned)
+    if not types:
+        raise ValueError("Every clue type tag is also a suspect's tag")
+
+    # Culprit clues, with the same route guarantee as generate_from_spec
+    k = spec.min_reachable_clues
+    stops = rng.randint(1, min(k, spec.max_moves() + 1, n))
+    route = [0] + rng.sample(range(1, n), stops - 1)
+    culprit_counts = _spread([0] * n, stops, route, rng)
+    _spread(culprit_counts, k - stops, route, rng)
+    _spread(culprit_counts, spec.culprit_clues - k, range(n), rng)
+    filler_counts = _spread([0] * n, spec.filler_clues, range(n), rng)
+
+    # Per location: the borrowed share split over the innocents (their name
+    # tag while under max_herrings_per_suspect, else their motive), the rest
+    # over the generic motives
+    innocents = [i for i in range(spec.suspects) if i != culprit]
+    herrings_left = [spec.max_herrings_per_suspect] * spec.suspects
+    content_seed = rng.getrandbits(64)
+    locations = []
+    culprit_id = 1
+    filler_id = 1 + spec.culprit_clues
+    for li, name in enumerate(loc_names):
+        fillers = filler_counts[li]
+        borrowed = min(fillers, int(fillers * spec.herring_rate + rng.random()))
+        sources = [(name_tags[culprit], culprit_counts[li])]
+        for d, b in enumerate(_spread([0] * spec.suspects, borrowed, innocents, rng)):
+            if b:
+                herring = min(herrings_left[d], int(b / 2 + rng.random()))
+                herrings_left[d] -= herring
+                sources += [(name_tags[d], herring), (motive_tags[d], b - herring)]
+        generic = _spread([0] * len(content.motives), fillers - borrowed, range(len(content.motives)), rng)
+        sources += [(content.motive_tags[m], c) for m, c in enumerate(generic)]
+        sources = sources[:1] + [(t, c) for t, c in sources[1:] if c]
+        locations.append(LazyLocation(name, sources, culprit_id, filler_id, f"{content_seed}:{li}", types))
+        culprit_id += culprit_counts[li]
+        filler_id += fillers
+    return locations
+
+def _lazy_answer_key(case, proof_clues=engine.DEFAULT_PROOF_CLUES, found_at=None):
+    # The same answer make_answer_key gives once every location is dealt.
+    # Locations already dealt (or copied into a plain Location) are keyed
+    # clue by clue. Given `found_at` (clue id -> location, as savegame
+    # records it), `case` is a restored state and its found clues go first.
+    linking_tag = case['linking_tag']
+    owners = {}
+    for name, s in case['suspects'].items():
+        for t in s.tags:
+            owners.setdefault(t, []).append(name)
+    names = {engine.name_tag(name): [name] for name, s in case['suspects'].items() if engine.name_tag(name) in s.tags}
+    ranges = []
+    named = []
+    places = []
+    culprit_clues = []
+
+    def add_clues(clues, place):
+        here = []
+        for c in clues:
+            ranges.append((c.id, 1, list(dict.fromkeys(n for t in c.tags if t in owners for n in owners[t]))))
+            named.append((c.id, 1, [names[t][0] for t in c.tags if t in names]))
+            places.append((c.id, 1, place(c.id)))
+            if linking_tag in c.tags:
+                here.append(c.id)
+        culprit_clues.append(here)
+
+    if found_at is not None:
+        # Clues taken from a location that is still undealt are covered by
+        # its id ranges, which answer for them as they did before
+        covered = set().union(*(loc.taken for loc in case['locations'].values()
+                                if isinstance(loc, LazyLocation) and not loc.dealt()))
+        add_clues([c for c in case['found_clues'] if c.id not in covered], lambda cid: found_at.get(str(cid)))
+        culprit_clues[-1] += [c.id for c in case['found_clues'] if c.id in covered and linking_tag in c.tags]
+    for loc in case['locations'].values():
+        if not isinstance(loc, LazyLocation) or loc.dealt():
+            add_clues(loc.clues, lambda cid, name=loc.name: name)
+            continue
+        (tag, n), fillers = loc.sources[0], loc.sources[1:]
+        ranges.append((loc.culprit_id, n, owners.get(tag, [])))
+        named.append((loc.culprit_id, n, names.get(tag, [])))
+        places.append((loc.culprit_id, n, loc.name))
+        culprit_clues.append([cid for cid in range(loc.culprit_id, loc.culprit_id + n) if cid not in loc.taken])
+        cid = loc.filler_id
+        for tag, n in fillers:
+            ranges.append((cid, n, owners.get(tag, [])))
+            named.append((cid, n, names.get(tag, [])))
+            cid += n
+        places.append((loc.filler_id, cid - loc.filler_id, loc.name))
+    ordered = culprit_clues[:1] + sorted(culprit_clues[1:], key=len, reverse=True)
+    conviction = tuple(cid for here in ordered for cid in here)[:proof_clues]
+    return AnswerKey(ClueLinks([r for r in ranges if r[1]]), ClueLinks([r for r in named if r[1]]), conviction,
+                     ClueLinks([r for r in places if r[1]]))
+
+def restored_answer_key(state, found_at):
+    # For a state loaded from a save that kept some locations undealt
+    return _lazy_answer_key(state, found_at=found_at)
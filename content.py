@@ -0,0 +1,139 @@
+import json
+import marshal
+import os
+import sys
+import tempfile
+
+# ---------------------
+# Config
+# ---------------------
+# Bump when the compiled layout changes so old caches are rebuilt
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".cache"
+# A case needs 4 locations, 5 suspects with different first names and up to
+# 4 distinct culprit clue types
+MIN_LOCATIONS = 4
+MIN_FIRST_NAMES = 5
+MIN_CLUE_TYPES = 4
+
+# ---------------------
+# Packs
+# ---------------------
+class ContentPack:
+    # The word lists cases are dealt from, with the tag tables derived from
+    # them. All strings are interned, so tag comparisons are identity checks.
+    #   suspect_names - grouped by first name, in order of first appearance
+    #   first_names - distinct first-name tags; the names with first_names[i]
+    #       are suspect_names[name_starts[i]:name_starts[i + 1]]
+    #   motive_tags, clue_tags - tag for each entry of motives / clue_types
+    def __init__(self, locations, suspect_names, motives, clue_types):
+        groups = {}
+        for name in suspect_names:
+            groups.setdefault(sys.intern(name.split()[0].lower()), []).append(sys.intern(name))
+        self.locations = [sys.intern(s) for s in locations]
+        self.suspect_names = [name for names in groups.values() for name in names]
+        self.first_names = list(groups)
+        self.name_starts = [0]
+        for names in groups.values():
+            self.name_starts.append(self.name_starts[-1] + len(names))
+        self.motives = [sys.intern(s) for s in motives]
+        self.motive_tags = [sys.intern(m.lower().replace(' ', '-')) for m in self.motives]
+        self.clue_types = [(sys.intern(n), sys.intern(d)) for n, d in clue_types]
+        self.clue_tags = [sys.intern(n.lower()) for n, _ in self.clue_types]
+        self.motive_tag_set = frozenset(self.motive_tags)
+
+    def draw_suspect_ids(self, rng, k):
+        # k suspects with different first names, as (first_names indices,
+        # suspect_names indices).
+        r = rng.random
+        starts = self.name_starts
+        tag_ids = rng.sample(range(len(self.first_names)), k)
+        return tag_ids, [starts[i] + int(r() * (starts[i + 1] - starts[i])) for i in tag_ids]
+
+    def draw_suspects(self, rng, k):
+        # Same draw as draw_suspect_ids; returns (tags, names).
+        tag_ids, name_ids = self.draw_suspect_ids(rng, k)
+        return [self.first_names[i] for i in tag_ids], [self.suspect_names[i] for i in name_ids]
+
+    def validate(self):
+        if len(self.locations) < MIN_LOCATIONS:
+            raise ValueError(f"A content pack needs at least {MIN_LOCATIONS} locations")
+        if len(self.first_names) < MIN_FIRST_NAMES:
+            raise ValueError(f"A content pack needs suspects with at least {MIN_FIRST_NAMES} different first names")
+        if not self.motives:
+            raise ValueError("A content pack needs at least one motive")
+        if len(self.clue_types) < MIN_CLUE_TYPES:
+            raise ValueError(f"A content pack needs at least {MIN_CLUE_TYPES} clue types")
+        return self
+
+    def to_compiled(self):
+        return (self.locations, self.suspect_names, self.first_names, self.name_starts,
+                self.motives, self.motive_tags, self.clue_types, self.clue_tags)
+
+    @classmethod
+    def from_compiled(cls, data):
+        pack = cls.__new__(cls)
+        (pack.locations, pack.suspect_names, pack.first_names, pack.name_starts,
+         pack.motives, pack.motive_tags, pack.clue_types, pack.clue_tags) = data
+        pack.motive_tag_set = frozenset(pack.motive_tags)
+        return pack
+
+# ---------------------
+# Loading
+# ---------------------
+# A pack source is a JSON object:
+#   {"locations": [...], "suspect_names": [...], "motives": [...],
+#    "clue_types": [["Fingerprint", "links person to a location"], ...]}
+def compile_pack(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    try:
+        pack = ContentPack(data["locations"], data["suspect_names"], data["motives"], data["clue_types"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed content pack {path}: {e}") from None
+    return pack.validate()
+
+def cache_path(path):
+    return path + CACHE_SUFFIX
+
+def _source_key(path):
+    st = os.stat(path)
+    return (CACHE_VERSION, st.st_mtime_ns, st.st_size)
+
+def _read_cache(path, key):
+    try:
+        # marshal.loads on the whole buffer; marshal.load(f) reads in small pieces
+        with open(cache_path(path), "rb") as f:
+            cached_key, data = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return data if cached_key == key else None
+
+def _write_cache(path, key, pack):
+    # Same temp-file-and-rename as savegame.atomic_write, in binary. A
+    # read-only pack folder just means no cache.
+    folder = os.path.dirname(os.path.abspath(path))
+    try:
+        fd, tmp = tempfile.mkstemp(prefix=".pack-", suffix=".tmp", dir=folder)
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(marshal.dumps((key, pack.to_compiled())))
+        os.replace(tmp, cache_path(path))
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+def load_pack(path):
+    # Loads the compiled cache next to `path` if it was built from the file as
+    # it is now; otherwise parses the source and rebuilds the cache.
+    key = _source_key(path)
+    data = _read_cache(path, key)
+    if data is not None:
+        return ContentPack.from_compiled(data)
+    pack = compile_pack(path)
+    _write_cache(path, key, pack)
+    return pack
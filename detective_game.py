@@ -1,891 +1,123 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog, scrolledtext
+import getpass
+import os
 import random
+import sqlite3
+import sys
 import textwrap
+from contextlib import contextmanager
+
+from content import load_pack
+from engine import (
+    DECAY_PERIOD_S, GameEngine, describe_action, diff_states, generate_tutorial_case, parse_actions,
+    seeded_case, use_content,
+)
+from hints import HintEngine
+from leaderboard import LEADERBOARD_PATH, LeaderboardLoader, daily_seed
+from logindex import LogIndex
+from memprofile import PROFILE_ENV, AllocationProfiler, count_widgets
+from realtime import DecayScheduler
+from outcomes import OUTCOMES_PATH, OutcomeStore, case_features, game_row
+from savegame import (
+    AUTOSAVE_PATH, AUTOSAVE_POLL_MS, MAX_UNDO, Autosaver, load_game, pack_session, unpack_session,
+)
+from tracker import CulpritTracker
 
 # ---------------------
 # Config
 # ---------------------
-START_CREDIBILITY = 10
-MAX_TURNS = 50
 WINDOW_TITLE = "The Deductionist: Case File"
-
-LOCATIONS = [
-    "Victim's Penthouse", "Industrial Dock", "Grand Hotel Lobby",
-    "Office Tower", "Local Dive Bar", "City Park",
-    "Security Office", "Rooftop Garden"
-]
-
-SUSPECT_NAMES = [
-    "Avery Collins", "Jordan Blake", "Riley Park",
-    "Morgan Hale", "Casey Lin", "Elias Vance"
-]
-
-MOTIVES = [
-    "Financial", "Revenge", "Jealousy", "Political Cover-Up", "Power Struggle"
-]
-
-CLUE_TYPES = [
-    ("Fingerprint", "links person to a location"),
-    ("Receipt", "shows a recent purchase or expense"),
-    ("Message", "a threatening or revealing text/email"),
-    ("Witness", "eye witness statement placing someone at the scene"),
-    ("Weapon Trace", "residue or tool mark"),
-    ("Photo", "visual evidence or security footage snippet")
-]
-
-# ---------------------
-# Core data classes
-# ---------------------
-class Clue:
-    def __init__(self, id, type_name, desc, tags):
-        self.id = id
-        self.type_name = type_name
-        self.desc = desc
-        self.tags = set(tags)
-        self.found = False
-
-    def brief(self):
-        return f"[{self.type_name}] {self.desc}"
-
-class Suspect:
-    def __init__(self, name, motive, alibi, tags):
-        self.name = name
-        self.motive = motive
-        self.alibi = alibi
-        self.tags = set(tags)
-        self.interrogated = False
-        # Tracks which Clue IDs have been used in a successful presentation against this suspect.
-        self.presented_clues = set()
-
-    def summary(self):
-        return f"{self.name} | Motive: {self.motive} | Alibi: {self.alibi}"
-
-class Location:
-    def __init__(self, name):
-        self.name = name
-        self.clues = []
-
-# ---------------------
-# Case generation
-# ---------------------
-def generate_case():
-    locs = LOCATIONS[:]
-    random.shuffle(locs)
-    # Use 4 random locations
-    locations = {name: Location(name) for name in locs[:4]}
-
-    # Use 5 random suspects
-    suspects_list = random.sample(SUSPECT_NAMES, 5)
-    culprit_name = random.choice(suspects_list)
-
-    suspects = {}
-    for name in suspects_list:
-        motive = random.choice(MOTIVES)
-        alibi = random.choice(list(locations.keys()))
-        tags = [name.split()[0].lower(), motive.lower().replace(' ', '-')]
-        suspects[name] = Suspect(name, motive, alibi, tags)
-
-    culprit = suspects[culprit_name]
-    linking_tag = culprit.tags.intersection({t.split()[0].lower() for t in SUSPECT_NAMES}).pop()
-
-    # Generate "strong" clues linked to the culprit (3-4 clues)
-    clue_pool = []
-    clue_id = 1
-    
-    num_culprit_clues = random.randint(3, 4)
-    culprit_clues = random.sample(CLUE_TYPES, num_culprit_clues)
-    
-    for tname, tdesc in culprit_clues:
-        c = Clue(clue_id, tname, f"{tdesc} clearly connected to {linking_tag}", {linking_tag, tname.lower()})
-        clue_pool.append(c)
-        clue_id += 1
-
-    # Generate "filler" clues (4-6 clues)
-    num_filler_clues = random.randint(4, 6)
-    all_other_suspects = [s for name, s in suspects.items() if name != culprit_name]
-    
-    for _ in range(num_filler_clues):
-        tname, tdesc = random.choice(CLUE_TYPES)
-        # Link filler clues to other suspects or generic tags
-        filler_tag = random.choice(all_other_suspects).tags.pop() if all_other_suspects and random.random() < 0.5 else random.choice(MOTIVES).lower().replace(' ', '-')
-        tags = {filler_tag, tname.lower()}
-        c = Clue(clue_id, tname, f"Generic {tdesc} related to {filler_tag}", tags)
-        clue_pool.append(c)
-        clue_id += 1
-
-    # Distribute clues across locations
-    loc_names = list(locations.keys())
-    for c in clue_pool:
-        chosen = random.choice(loc_names)
-        locations[chosen].clues.append(c)
-
-    return {
-        "locations": locations,
-        "suspects": suspects,
-        "culprit": culprit_name,
-        "linking_tag": linking_tag
-    }
-
-def generate_tutorial_case():
-    locations = {
-        "Victim's Penthouse": Location("Victim's Penthouse"),
-        "Local Dive Bar": Location("Local Dive Bar"),
-        "Office Tower": Location("Office Tower"),
-        "Rooftop Garden": Location("Rooftop Garden")
-    }
-    suspects_list = ["Avery Collins", "Jordan Blake", "Riley Park", "Morgan Hale"]
-    culprit = "Avery Collins"
-    suspects = {}
-    for name in suspects_list:
-        motive = "Jealousy" if "Avery" in name else random.choice(MOTIVES)
-        alibi = "Local Dive Bar" if name != "Avery Collins" else "Victim's Penthouse"
-        tags = [name.split()[0].lower(), motive.lower()]
-        suspects[name] = Suspect(name, motive, alibi, tags)
-
-    # Clues linking to Avery
-    c1 = Clue(1, "Photo", "A crumpled photo of the victim defaced with the name 'Avery' on the back", {"avery", "photo"})
-    c2 = Clue(2, "Message", "A threatening text referencing a 'financial deal gone sour' sent by a number traced to the Office Tower.", {"avery", "message"})
-    # Distraction clue
-    c3 = Clue(3, "Receipt", "A late-night receipt from a convenience store for someone with an alibi.", {"distraction", "receipt"})
-    # Strongest linking clue
-    c4 = Clue(4, "Fingerprint", "A clear fingerprint match for Avery found on the murder weapon (a broken statue).", {"avery", "fingerprint"})
-
-
-    locations["Victim's Penthouse"].clues.extend([c1, c4])
-    locations["Office Tower"].clues.append(c2)
-    locations["Rooftop Garden"].clues.append(c3)
-
-    return {
-        "locations": locations,
-        "suspects": suspects,
-        "culprit": culprit,
-        "linking_tag": "avery"
-    }
-
-# ---------------------
-# Game controller and UI
-# ---------------------
-class DetectiveGameUI:
-    def __init__(self, root):
-        self.root = root
-        root.title(WINDOW_TITLE)
-        self.case_state = None
-        
-        # Apply a basic style configuration
-        self.bg_color = "#2c3e50" # Dark Blue/Grey
-        self.fg_color = "#ecf0f1" # Light Grey
-        self.accent_color = "#3498db" # Blue
-        self.button_color = "#34495e" # Darker Grey
-
-        self.root.configure(bg=self.bg_color)
-        
-        default_font = ("Consolas", 10)
-        heading_font = ("Consolas", 12, "bold")
-
-        # --- Top frame: controls and status ---
-        top = tk.Frame(root, bg=self.bg_color)
-        top.pack(fill="x", padx=10, pady=10)
-
-        self.cred_label = tk.Label(top, text="Credibility: -", bg=self.bg_color, fg=self.fg_color, font=heading_font)
-        self.cred_label.pack(side="left", padx=(0, 20))
-
-        self.turn_label = tk.Label(top, text="Turns: -", bg=self.bg_color, fg=self.fg_color, font=heading_font)
-        self.turn_label.pack(side="left", padx=(0, 20))
-
-        # Buttons on the right
-        btn_frame = tk.Frame(top, bg=self.bg_color)
-        btn_frame.pack(side="right")
-        
-        start_btn = tk.Button(btn_frame, text="Start New Case", command=self.start_case, bg=self.accent_color, fg="white", font=default_font)
-        start_btn.pack(side="right", padx=4)
-        tut_btn = tk.Button(btn_frame, text="Tutorial Case", command=self.start_tutorial, bg=self.button_color, fg=self.fg_color, font=default_font)
-        tut_btn.pack(side="right", padx=4)
-
-        # --- Main content area ---
-        main_content = tk.Frame(root, bg=self.bg_color)
-        main_content.pack(fill="both", expand=True, padx=10, pady=5)
-
-        # Left frame: locations
-        left = tk.LabelFrame(main_content, text="Locations", padx=6, pady=6, bg=self.bg_color, fg=self.fg_color, font=heading_font)
-        left.pack(side="left", fill="y", padx=(0, 10))
-
-        self.location_buttons = {}
-        for i in range(4):
-            b = tk.Button(left, text=f"Location {i+1}", width=20, bg=self.button_color, fg=self.fg_color, font=default_font, activebackground=self.accent_color)
-            b.pack(pady=4)
-            self.location_buttons[f"loc{i}"] = b
-
-        # Right frame: suspects
-        right = tk.LabelFrame(main_content, text="Suspects", padx=6, pady=6, bg=self.bg_color, fg=self.fg_color, font=heading_font)
-        right.pack(side="right", fill="y", padx=(10, 0))
-        
-        self.suspect_listbox = tk.Listbox(right, width=40, height=10, bg=self.button_color, fg=self.fg_color, selectbackground=self.accent_color, font=default_font)
-        self.suspect_listbox.pack(padx=4, pady=4)
-        
-        self.suspect_info = tk.Label(right, text="Select a suspect for details.", wraplength=300, justify="left", bg=self.bg_color, fg=self.fg_color, font=default_font)
-        self.suspect_info.pack(padx=4, pady=4)
-
-        # Bind selection update
-        self.suspect_listbox.bind("<<ListboxSelect>>", self.on_suspect_select)
-        
-        # Middle frame: actions and output
-        mid = tk.Frame(main_content, bg=self.bg_color)
-        mid.pack(side="left", fill="both", expand=True)
-
-        actions = tk.LabelFrame(mid, text="Available Actions", padx=6, pady=6, bg=self.bg_color, fg=self.fg_color, font=heading_font)
-        actions.pack(fill="x", pady=(0, 8))
-
-        # Action Buttons Layout (using grid for uniform size)
-        action_buttons = [
-            ("Examine Scene (0 cost)", self.examine),
-            ("Search/Collect (-1 cred)", self.search_prompt),
-            ("Interrogate (-1 cred)", self.interrogate_prompt),
-            ("Present Evidence (-1 cred)", self.present_prompt),
-            ("Accuse (End Case)", self.accuse_prompt),
-            ("Notebook (Clues/Info)", self.show_notebook)
-        ]
-        
-        for i, (text, command) in enumerate(action_buttons):
-            b = tk.Button(actions, text=text, command=command, bg=self.accent_color, fg="white", font=default_font, padx=5, pady=5)
-            b.grid(row=0, column=i, padx=4, pady=4, sticky="ew")
-
-        actions.grid_columnconfigure(5, weight=1) # Ensure Notebook stretches slightly
-
-        # Output area
-        out_frame = tk.LabelFrame(mid, text="Investigative Log", padx=6, pady=6, bg=self.bg_color, fg=self.fg_color, font=heading_font)
-        out_frame.pack(fill="both", expand=True)
-        self.log = scrolledtext.ScrolledText(out_frame, height=18, state="disabled", wrap="word", bg="#1b2c3a", fg="#d3d9df", font=default_font)
-        self.log.pack(fill="both", expand=True)
-
-        # initialize disabled state
-        self.disable_game_ui()
-        self.log_write("Welcome, Detective. The clock is ticking. Click Tutorial or Start New Case to begin your investigation.")
-
-    # ---------------------
-    # UI helpers
-    # ---------------------
-    def log_write(self, text, style='info'):
-        self.log.configure(state="normal")
-        
-        tag_name = style
-        if tag_name not in self.log.tag_names():
-            if style == 'error':
-                self.log.tag_config(tag_name, foreground="#e74c3c", font=("Consolas", 10, "bold"))
-            elif style == 'win':
-                self.log.tag_config(tag_name, foreground="#2ecc71", font=("Consolas", 10, "bold"))
-            elif style == 'action':
-                self.log.tag_config(tag_name, foreground="#f39c12", font=("Consolas", 10, "italic"))
-            else: # info
-                self.log.tag_config(tag_name, foreground="#ecf0f1")
-        
-        
-        self.log.insert("end", textwrap.fill(text, 80) + "\n\n", tag_name)
-        self.log.see("end")
-        self.log.configure(state="disabled")
-
-    def enable_game_ui(self):
-        for b in self.location_buttons.values():
-            b.configure(state="normal")
-        # Other action buttons remain enabled/disabled via their initial setup, 
-        # but the core location/suspect interaction must be enabled.
-        self.suspect_listbox.configure(state="normal")
-
-    def disable_game_ui(self):
-        for b in self.location_buttons.values():
-            b.configure(state="disabled")
-        self.suspect_listbox.configure(state="disabled")
-
-    def update_status(self):
-        cs = self.case_state
-        self.cred_label.config(text=f"Credibility: {max(0, cs['credibility'])}")
-        self.turn_label.config(text=f"Turns: {cs['turns']}/{MAX_TURNS}")
-        
-        if cs['credibility'] <= 0 or cs['turns'] >= MAX_TURNS:
-            self.disable_game_ui()
-            # If the game is already over due to accusation, don't re-log the loss conditions.
-
-    def refresh_locations(self):
-        loc_names = list(self.case_state['locations'].keys())
-        btns = list(self.location_buttons.values())
-        for i in range(4):
-            name = loc_names[i]
-            btn = btns[i]
-            
-            # Show number of visible clues
-            clue_count = len(self.case_state['locations'][name].clues)
-            clue_indicator = f" ({clue_count})" if clue_count > 0 else ""
-            
-            btn.config(text=name + clue_indicator, command=lambda n=name: self.move_to(n))
-            
-            # highlight current location
-            if name == self.case_state['current_location']:
-                btn.config(relief="sunken", bg=self.accent_color)
-            else:
-                btn.config(relief="raised", bg=self.button_color)
-
-    def refresh_suspects(self):
-        self.suspect_listbox.delete(0, "end")
-        for s in self.case_state['suspects'].values():
-            pres = self.case_state['presented'].get(s.name, "none")
-            
-            # Show if interrogated and if evidence was strong
-            int_mark = " (I)" if s.interrogated else ""
-            pres_mark = ""
-            if pres == "strong":
-                pres_mark = " [STRONG EVIDENCE]"
-            elif pres == "weak":
-                pres_mark = " [WEAK]"
-            
-            self.suspect_listbox.insert("end", f"{s.name}{int_mark} | {s.alibi}{pres_mark}")
-
-    def current_location_obj(self):
-        return self.case_state['locations'][self.case_state['current_location']]
-
-    # ---------------------
-    # Game lifecycle
-    # ---------------------
-    def start_case(self):
-        case = generate_case()
-        self.setup_case(case)
-        self.log_write("CASE START: A high-profile murder has been committed. The police commissioner has given you a limited budget and only 50 hours of investigation time. Find the culprit and present a watertight case.", style='win')
-        self.log_write("Suspects identified:")
-        for s in self.case_state['suspects'].values():
-            self.log_write(f"- {s.summary()}")
-        self.refresh_ui_after_change()
-
-    def start_tutorial(self):
-        case = generate_tutorial_case()
-        self.setup_case(case)
-        self.log_write("TUTORIAL CASE LOADED. Welcome to the case of the Defaced Photo. Start by clicking EXAMINE SCENE.", style='win')
-        self.case_state['tutorial_step'] = 1
-        self.refresh_ui_after_change()
-
-    def setup_case(self, case):
-        self.case_state = {
-            "locations": case['locations'],
-            "suspects": case['suspects'],
-            "culprit": case['culprit'],
-            "linking_tag": case['linking_tag'],
-            "current_location": list(case['locations'].keys())[0],
-            "credibility": START_CREDIBILITY,
-            "turns": 0,
-            "found_clues": [],
-            "presented": {}
-        }
-        self.enable_game_ui()
-        self.refresh_ui_after_change()
-
-    # ---------------------
-    # Action handlers
-    # ---------------------
-    def move_to(self, loc_name):
-        if self.case_state is None:
-            return
-        if loc_name not in self.case_state['locations']:
-            messagebox.showinfo("Move", "Unknown location.")
-            return
-            
-        # Cost is only applied if moving to a *new* location
-        if loc_name != self.case_state['current_location']:
-            self.apply_credibility(1)
-            self.case_state['current_location'] = loc_name
-            self.log_write(f"You travel to {loc_name}. (-1 Credibility)", style='action')
-        else:
-            self.log_write(f"You are already at {loc_name}.")
-
-        self.refresh_ui_after_change()
-
-    def examine(self):
-        if self.case_state is None:
-            return
-        
-        # Examine is a free action
-        loc = self.current_location_obj()
-        if not loc.clues:
-            self.log_write("You see nothing of obvious interest in this area.")
-        else:
-            self.log_write(f"Visible items and clues at {loc.name}:")
-            for c in loc.clues:
-                self.log_write(f" • id {c.id}: {c.brief()}")
-        
-        # tutorial guidance
-        if self.case_state.get('tutorial_step') == 1:
-            self.log_write("Tutorial hint: Click Search/Collect and enter clue ID 1 to secure this piece of evidence. This costs 1 Credibility.", style='win')
-            self.case_state['tutorial_step'] = 2
-
-    def search_prompt(self):
-        if self.case_state is None or self.case_state['credibility'] <= 0: return
-        
-        loc = self.current_location_obj()
-        if not loc.clues:
-            messagebox.showinfo("Search", "No loose clues here to collect.")
-            return
-
-        ids = [str(c.id) for c in loc.clues]
-        default = ids[0]
-        
-        val = simpledialog.askstring("Search / Collect Evidence", 
-                                     f"Enter the ID of the clue you wish to collect (visible IDs: {', '.join(ids)})", 
-                                     initialvalue=default)
-        if val is None:
-            return
-        
-        try:
-            cid = int(val.strip())
-        except ValueError:
-            messagebox.showerror("Search", "Clue ID must be a number.")
-            return
-        
-        found = next((c for c in loc.clues if c.id == cid), None)
-
-        if not found:
-            messagebox.showinfo("Search", "No such clue here.")
-            return
-
-        # Perform the action and apply cost
-        self.apply_credibility(1)
-        found.found = True
-        self.case_state['found_clues'].append(found)
-        loc.clues.remove(found)
-        
-        self.log_write(f"You collected the evidence: {found.brief()} (-1 Credibility)", style='action')
-        
-        # tutorial guidance
-        if self.case_state.get('tutorial_step') == 2:
-            self.log_write("Tutorial hint: Open your Notebook to see the collected clue and its tags. Then, select a suspect (e.g., Avery Collins) and click Interrogate.", style='win')
-            self.case_state['tutorial_step'] = 3
-        
-        self.refresh_ui_after_change()
-
-    def interrogate_prompt(self):
-        if self.case_state is None or self.case_state['credibility'] <= 0: return
-        
-        sel = self.get_selected_suspect_name()
-        if sel is None:
-            messagebox.showinfo("Interrogate", "Select a suspect from the list first.")
-            return
-        
-        suspect = self.case_state['suspects'][sel]
-        
-        # Only pay cost if not already interrogated
-        cost = 0
-        if not suspect.interrogated:
-            cost = 1
-            self.apply_credibility(cost)
-            suspect.interrogated = True
-            
-            self.log_write(f"You interrogate {suspect.name}. (-{cost} Credibility)", style='action')
-        else:
-            self.log_write(f"You re-interrogate {suspect.name}. The suspect is cooperative but offers no new information.")
-            return
-
-        # Reveal a lead if matching tags exist in uncollected clues (20% chance if tags match)
-        reveal = False
-        for locname, loc in self.case_state['locations'].items():
-            for c in loc.clues:
-                if suspect.tags & c.tags and random.random() < 0.2:
-                    self.log_write(f"During questioning, {suspect.name} mentions a detail that points to a lead at: {locname}")
-                    reveal = True
-                    break
-            if reveal:
-                break
-                
-        if not reveal:
-            self.log_write(f"{suspect.name} maintains their alibi: {suspect.alibi}. They don't budge.")
-            
-        # tutorial guidance
-        if self.case_state.get('tutorial_step') == 3:
-            self.log_write("Tutorial hint: Did you notice the clue you found was linked to 'avery'? Now try to Present Evidence against 'Avery Collins'.", style='win')
-            self.case_state['tutorial_step'] = 4
-            
-        self.refresh_ui_after_change()
-
-    def present_prompt(self):
-        if self.case_state is None or self.case_state['credibility'] <= 0: return
-        
-        sel = self.get_selected_suspect_name()
-        if sel is None:
-            messagebox.showinfo("Present", "Select a suspect from the list first.")
-            return
-        
-        self.apply_credibility(1) # Apply cost regardless of outcome
-        self.log_write(f"Preparing to present evidence against {sel}...", style='action')
-        self.present_evidence(sel)
-        
-        # tutorial guidance
-        if self.case_state.get('tutorial_step') == 4:
-            self.log_write("Tutorial hint: You gained credibility! Use Accuse to close the case on 'Avery Collins'.", style='win')
-            self.case_state['tutorial_step'] = 5
-            
-        self.refresh_ui_after_change()
-
-    def accuse_prompt(self):
-        if self.case_state is None or self.case_state['credibility'] <= 0: return
-        
-        sel = self.get_selected_suspect_name()
-        if sel is None:
-            messagebox.showinfo("Accuse", "Select a suspect from the list first.")
-            return
-            
-        # Accusation uses a turn but has a higher failure cost
-        self.apply_credibility(1) 
-        
-        # Check if the game is over due to max turns or 0 cred, before proceeding with the accusation check
-        if self.case_state['credibility'] <= 0 or self.case_state['turns'] >= MAX_TURNS:
-            return
-
-        correct = self.check_win(sel)
-        
-        if correct:
-            messagebox.showinfo("Case Closed", f"Congratulations! You secured a conviction against {sel}.")
-            self.disable_game_ui()
-        else:
-            if self.case_state['credibility'] <= 0:
-                # Game over message handled by apply_credibility
-                pass
-            else:
-                messagebox.showinfo("Accuse Failed", "Your accusation was too weak or misplaced. Public trust is severely damaged.")
-        
-        self.refresh_ui_after_change()
-
-    def show_notebook(self):
-        if self.case_state is None:
-            return
-        dlg = tk.Toplevel(self.root, bg=self.bg_color)
-        dlg.title("Notebook")
-        
-        txt = scrolledtext.ScrolledText(dlg, width=80, height=25, wrap="word", bg="#1b2c3a", fg="#d3d9df", font=("Consolas", 10))
-        txt.pack(fill="both", expand=True, padx=10, pady=10)
-        
-        txt.insert("end", "--- Collected Evidence ---\n\n", ("Consolas", 12, "bold"))
-        if not self.case_state['found_clues']:
-            txt.insert("end", "- No evidence collected yet.\n\n")
-        else:
-            for c in self.case_state['found_clues']:
-                txt.insert("end", f"• ID {c.id}: {c.brief()}\n")
-                txt.insert("end", f"   Tags: {', '.join(c.tags)}\n\n")
-
-        txt.insert("end", "\n--- Suspect Details ---\n\n", ("Consolas", 12, "bold"))
-        for s in self.case_state['suspects'].values():
-            pres_status = self.case_state['presented'].get(s.name, "none")
-            
-            txt.insert("end", f"• {s.name}\n")
-            txt.insert("end", f"   Motive: {s.motive}\n")
-            txt.insert("end", f"   Alibi Location: {s.alibi}\n")
-            txt.insert("end", f"   Interrogated: {'Yes' if s.interrogated else 'No'}\n")
-            txt.insert("end", f"   Presentation Status: {pres_status.upper()}\n\n")
-            
-        txt.configure(state="disabled")
-
-    # ---------------------
-    # Core logic helpers
-    # ---------------------
-    def apply_credibility(self, cost=1):
-        # Always check if the game is already ending before applying the cost
-        if self.case_state['credibility'] <= 0 or self.case_state['turns'] >= MAX_TURNS:
-            return
-            
-        if cost > 0:
-            self.case_state['credibility'] -= cost
-            
-        self.case_state['turns'] += 1
-        
-        if self.case_state['credibility'] <= 0:
-            self.log_write("Your credibility has reached zero. The case has been reassigned. GAME OVER.", style='error')
-            self.log_write(f"The investigation revealed the true culprit was: {self.case_state['culprit']}", style='error')
-            self.disable_game_ui()
-            
-        if self.case_state['turns'] >= MAX_TURNS:
-            self.log_write("You ran out of allowed turns (time limit exceeded). The case is cold. GAME OVER.", style='error')
-            self.log_write(f"The investigation revealed the true culprit was: {self.case_state['culprit']}", style='error')
-            self.disable_game_ui()
-        
-        self.update_status()
-
-    def get_selected_suspect_name(self):
-        sel = self.suspect_listbox.curselection()
-        if not sel:
-            return None
-        line = self.suspect_listbox.get(sel[0])
-        # Name is before ' (I) ' or ' |'
-        name = line.split(" |")[0].split(" (I)")[0].strip()
-        return name
-
-    def on_suspect_select(self, event=None):
-        name = self.get_selected_suspect_name()
-        if name is None:
-            self.suspect_info.config(text="Select a suspect for details.")
-            return
-            
-        s = self.case_state['suspects'].get(name)
-        if not s: return
-
-        pres = self.case_state['presented'].get(name, "none")
-        info = (f"{s.name}\nMotive: {s.motive}\nAlibi: {s.alibi}\n"
-                f"Interrogated: {'Yes' if s.interrogated else 'No'}\n"
-                f"Presentation Status: {pres.upper()}")
-        self.suspect_info.config(text=info)
-
-    def present_evidence(self, suspect_name):
-        suspect = self.case_state['suspects'].get(suspect_name)
-        if not suspect: 
-            self.log_write("Error: No such suspect.", style='error')
-            return
-            
-        # --- FIX: Prevent Credibility Spamming ---
-        current_status = self.case_state['presented'].get(suspect_name)
-        if current_status == "strong":
-            self.log_write(f"You have already made a strong presentation against {suspect_name}. Further attempts with the current evidence are redundant (0 Credibility change).")
-            return
-        
-        found_clues = self.case_state['found_clues']
-        linking_clues = []
-        
-        # Calculate score using ONLY evidence not previously used for this suspect
-        for c in found_clues:
-            if c.id not in suspect.presented_clues and len(suspect.tags & c.tags) > 0:
-                linking_clues.append(c)
-
-        score = len(linking_clues)
-        
-        if score >= 2:
-            self.log_write(f"You present {score} new pieces of strong, linking evidence against {suspect.name}. Credibility +2.", style='win')
-            self.case_state['credibility'] = min(START_CREDIBILITY, self.case_state['credibility'] + 2) # Cap credibility
-            self.case_state['presented'][suspect.name] = "strong"
-            # Mark the clues as used for scoring against this suspect
-            for c in linking_clues:
-                suspect.presented_clues.add(c.id)
-                
-        elif score == 1:
-            self.log_write(f"Your evidence is suggestive but circumstantial ({score} clue link). Credibility unchanged.")
-            self.case_state['presented'][suspect.name] = "weak"
-        else:
-            self.log_write("No clear or new evidence links this suspect to the crime. You lose 2 credibility for a weak presentation.", style='error')
-            self.case_state['credibility'] -= 2
-            self.case_state['presented'][suspect.name] = "none"
-
-
-    def check_win(self, accused_name):
-        culprit = self.case_state['culprit']
-        
-        if accused_name == culprit:
-            # Win condition: Accuse the right person AND have at least 2 key clues (linking_tag clues)
-            strong_evidence_count = 0
-            for c in self.case_state['found_clues']:
-                if self.case_state['linking_tag'] in c.tags:
-                    strong_evidence_count += 1
-                    
-            if strong_evidence_count >= 2:
-                self.log_write(f"Accusation successful! You proved {accused_name}'s guilt with {strong_evidence_count} key pieces of evidence. Case closed. (+3 Credibility Bonus)", style='win')
-                self.case_state['credibility'] = min(START_CREDIBILITY, self.case_state['credibility'] + 3)
-                return True
-            else:
-                self.log_write(f"You accused the right person ({accused_name}) but only had {strong_evidence_count} key pieces of evidence. The case is dismissed for lack of proof. You lose 2 Credibility.", style='error')
-                self.case_state['credibility'] -= 2
-                return False
-        else:
-            self.log_write(f"Accusation failed. {accused_name} is innocent. Public trust plummets. You lose 5 credibility.", style='error')
-            self.case_state['credibility'] -= 5
-            return False
-
-    # ---------------------
-    # UI refresh wrapper
-    # ---------------------
-    def refresh_ui_after_change(self):
-        if self.case_state is None:
-            return
-        self.update_status()
-        self.refresh_locations()
-        self.refresh_suspects()
-
-# ---------------------
-# Entrypoint
-# ---------------------
-if __name__ == "__main__":
-    random.seed()
-
+HINT_POLL_MS = 5
+# How often a finished daily run checks whether the leaderboard has loaded
+LEADERBOARD_POLL_MS = 50
+LOG_STYLES = ("info", "action", "win", "error")
+# What the allocation profiler wraps when it is switched on
+PROFILED_HANDLERS = (
+    "start_case", "start_daily", "start_tutorial", "resume_case", "move_to", "examine", "search_prompt",
+    "interrogate_prompt", "present_prompt", "accuse_prompt", "show_notebook", "hint_prompt",
+    "run_command", "undo", "redo", "switch_tab", "close_tab",
+)
+
+def player_name():
+    # Name daily challenge results are ranked under
     try:
-        root = tk.Tk()
-        app = DetectiveGameUI(root)
-        root.mainloop()
-    except Exception as e:
-        # Fallback in case of environment issues
-        print(f"An error occurred: {e}")
-       
-tkinter as tk
-from tkinter import messagebox, simpledialog, scrolledtext
-import random
-import textwrap
-
-# ---------------------
-# Config
-# ---------------------
-START_CREDIBILITY = 10
-MAX_TURNS = 50
-WINDOW_TITLE = "The Deductionist: Case File"
+        return getpass.getuser()
+    except (OSError, KeyError, ImportError):
+        return "detective"
 
-LOCATIONS = [
-    "Victim's Penthouse", "Industrial Dock", "Grand Hotel Lobby",
-    "Office Tower", "Local Dive Bar", "City Park",
-    "Security Office", "Rooftop Garden"
-]
-
-SUSPECT_NAMES = [
-    "Avery Collins", "Jordan Blake", "Riley Park",
-    "Morgan Hale", "Casey Lin", "Elias Vance"
-]
-
-MOTIVES = [
-    "Financial", "Revenge", "Jealousy", "Political Cover-Up", "Power Struggle"
-]
-
-CLUE_TYPES = [
-    ("Fingerprint", "links person to a location"),
-    ("Receipt", "shows a recent purchase or expense"),
-    ("Message", "a threatening or revealing text/email"),
-    ("Witness", "eye witness statement placing someone at the scene"),
-    ("Weapon Trace", "residue or tool mark"),
-    ("Photo", "visual evidence or security footage snippet")
-]
-
-# ---------------------
-# Core data classes
-# ---------------------
-class Clue:
-    def __init__(self, id, type_name, desc, tags):
-        self.id = id
-        self.type_name = type_name
-        self.desc = desc
-        self.tags = set(tags)
-        self.found = False
-
-    def brief(self):
-        return f"[{self.type_name}] {self.desc}"
-
-class Suspect:
-    def __init__(self, name, motive, alibi, tags):
-        self.name = name
-        self.motive = motive
-        self.alibi = alibi
-        self.tags = set(tags)
-        self.interrogated = False
-        # Tracks which Clue IDs have been used in a successful presentation against this suspect.
-        self.presented_clues = set()
-
-    def summary(self):
-        return f"{self.name} | Motive: {self.motive} | Alibi: {self.alibi}"
-
-class Location:
-    def __init__(self, name):
-        self.name = name
-        self.clues = []
+class Investigation:
+    # One open case tab. Only the tab in view has live objects (they sit on
+    # DetectiveGameUI); the others keep just `blob`, from savegame.pack_session.
+    __slots__ = ("title", "blob")
 
-# ---------------------
-# Case generation
-# ---------------------
-def generate_case():
-    locs = LOCATIONS[:]
-    random.shuffle(locs)
-    # Use 4 random locations
-    locations = {name: Location(name) for name in locs[:4]}
-
-    # Use 5 random suspects
-    suspects_list = random.sample(SUSPECT_NAMES, 5)
-    culprit_name = random.choice(suspects_list)
-
-    suspects = {}
-    for name in suspects_list:
-        motive = random.choice(MOTIVES)
-        alibi = random.choice(list(locations.keys()))
-        tags = [name.split()[0].lower(), motive.lower().replace(' ', '-')]
-        suspects[name] = Suspect(name, motive, alibi, tags)
-
-    culprit = suspects[culprit_name]
-    linking_tag = culprit.tags.intersection({t.split()[0].lower() for t in SUSPECT_NAMES}).pop()
-
-    # Generate "strong" clues linked to the culprit (3-4 clues)
-    clue_pool = []
-    clue_id = 1
-    
-    num_culprit_clues = random.randint(3, 4)
-    culprit_clues = random.sample(CLUE_TYPES, num_culprit_clues)
-    
-    for tname, tdesc in culprit_clues:
-        c = Clue(clue_id, tname, f"{tdesc} clearly connected to {linking_tag}", {linking_tag, tname.lower()})
-        clue_pool.append(c)
-        clue_id += 1
-
-    # Generate "filler" clues (4-6 clues)
-    num_filler_clues = random.randint(4, 6)
-    all_other_suspects = [s for name, s in suspects.items() if name != culprit_name]
-    
-    for _ in range(num_filler_clues):
-        tname, tdesc = random.choice(CLUE_TYPES)
-        # Link filler clues to other suspects or generic tags
-        filler_tag = random.choice(all_other_suspects).tags.pop() if all_other_suspects and random.random() < 0.5 else random.choice(MOTIVES).lower().replace(' ', '-')
-        tags = {filler_tag, tname.lower()}
-        c = Clue(clue_id, tname, f"Generic {tdesc} related to {filler_tag}", tags)
-        clue_pool.append(c)
-        clue_id += 1
-
-    # Distribute clues across locations
-    loc_names = list(locations.keys())
-    for c in clue_pool:
-        chosen = random.choice(loc_names)
-        locations[chosen].clues.append(c)
-
-    return {
-        "locations": locations,
-        "suspects": suspects,
-        "culprit": culprit_name,
-        "linking_tag": linking_tag
-    }
-
-def generate_tutorial_case():
-    locations = {
-        "Victim's Penthouse": Location("Victim's Penthouse"),
-        "Local Dive Bar": Location("Local Dive Bar"),
-        "Office Tower": Location("Office Tower"),
-        "Rooftop Garden": Location("Rooftop Garden")
-    }
-    suspects_list = ["Avery Collins", "Jordan Blake", "Riley Park", "Morgan Hale"]
-    culprit = "Avery Collins"
-    suspects = {}
-    for name in suspects_list:
-        motive = "Jealousy" if "Avery" in name else random.choice(MOTIVES)
-        alibi = "Local Dive Bar" if name != "Avery Collins" else "Victim's Penthouse"
-        tags = [name.split()[0].lower(), motive.lower()]
-        suspects[name] = Suspect(name, motive, alibi, tags)
-
-    # Clues linking to Avery
-    c1 = Clue(1, "Photo", "A crumpled photo of the victim defaced with the name 'Avery' on the back", {"avery", "photo"})
-    c2 = Clue(2, "Message", "A threatening text referencing a 'financial deal gone sour' sent by a number traced to the Office Tower.", {"avery", "message"})
-    # Distraction clue
-    c3 = Clue(3, "Receipt", "A late-night receipt from a convenience store for someone with an alibi.", {"distraction", "receipt"})
-    # Strongest linking clue
-    c4 = Clue(4, "Fingerprint", "A clear fingerprint match for Avery found on the murder weapon (a broken statue).", {"avery", "fingerprint"})
-
-
-    locations["Victim's Penthouse"].clues.extend([c1, c4])
-    locations["Office Tower"].clues.append(c2)
-    locations["Rooftop Garden"].clues.append(c3)
-
-    return {
-        "locations": locations,
-        "suspects": suspects,
-        "culprit": culprit,
-        "linking_tag": "avery"
-    }
+    def __init__(self, title):
+        self.title = title
+        self.blob = None
 
 # ---------------------
 # Game controller and UI
 # ---------------------
 class DetectiveGameUI:
-    def __init__(self, root):
+    def __init__(self, root, profiler=None):
         self.root = root
         root.title(WINDOW_TITLE)
+        # Optional AllocationProfiler; handlers are wrapped before any widget
+        # takes them as a callback
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self, PROFILED_HANDLERS)
         self.case_state = None
+        self.engine = None
+        self.tracker = None
+        # Open investigations; active_tab indexes the one in view
+        self.tabs = []
+        self.active_tab = None
+        self.cases_opened = 0
+        # Windows that belong to the case in view (go when it hibernates)
+        self.case_windows = []
+        # Snapshots for Undo/Redo; each one shares all unchanged objects
+        self.undo_stack = []
+        self.redo_stack = []
+        # Hint workers are started on first use
+        self.hints = None
+        self.hint_request = None
+        # Real-time credibility decay, off unless the checkbox is ticked
+        self.decay = None
+        self.realtime_var = tk.BooleanVar(value=False)
+        # Neither is needed to play: if one cannot start (say the home folder
+        # is read-only or the database is locked) it stays off this session
+        startup_errors = []
+        try:
+            self.autosave = Autosaver(AUTOSAVE_PATH)
+        except (OSError, RuntimeError) as e:
+            self.autosave = None
+            startup_errors.append(f"Autosave is off for this session: {e}")
+        self.autosave_error = None
+        self.autosave_timer = root.after(AUTOSAVE_POLL_MS, self.autosave_tick)
+        try:
+            self.outcomes = OutcomeStore(OUTCOMES_PATH)
+        except (OSError, sqlite3.Error) as e:
+            self.outcomes = None
+            startup_errors.append(f"Case outcomes are not recorded this session: {e}")
+        self.case_features = None
+        self.game_recorded = False
+        self.actions_taken = 0
+        # Daily challenge standings, loaded in the background from the first
+        # daily run on; results that end before the load finishes wait here
+        self.leaderboard_loader = None
+        self.daily_pending = []
+        # Log search: every entry is indexed as it is written
+        self.log_index = LogIndex()
+        self.search_var = tk.StringVar()
+        self.style_vars = {style: tk.BooleanVar(value=True) for style in LOG_STYLES}
+        self.search_hits = []
+        self.search_pos = -1
+        self.search_stale = False
+        # Entries held back while a batch of actions runs (see log_batch)
+        self.log_buffer = None
+        self.command_var = tk.StringVar()
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Apply a basic style configuration
         self.bg_color = "#2c3e50" # Dark Blue/Grey
@@ -914,8 +146,25 @@ class DetectiveGameUI:
         
         start_btn = tk.Button(btn_frame, text="Start New Case", command=self.start_case, bg=self.accent_color, fg="white", font=default_font)
         start_btn.pack(side="right", padx=4)
+        daily_btn = tk.Button(btn_frame, text="Daily Challenge", command=self.start_daily, bg=self.button_color, fg=self.fg_color, font=default_font)
+        daily_btn.pack(side="right", padx=4)
         tut_btn = tk.Button(btn_frame, text="Tutorial Case", command=self.start_tutorial, bg=self.button_color, fg=self.fg_color, font=default_font)
         tut_btn.pack(side="right", padx=4)
+        resume_btn = tk.Button(btn_frame, text="Resume Autosave", command=self.resume_case, bg=self.button_color, fg=self.fg_color, font=default_font)
+        resume_btn.pack(side="right", padx=4)
+        redo_btn = tk.Button(btn_frame, text="Redo", command=self.redo, bg=self.button_color, fg=self.fg_color, font=default_font)
+        redo_btn.pack(side="right", padx=4)
+        undo_btn = tk.Button(btn_frame, text="Undo", command=self.undo, bg=self.button_color, fg=self.fg_color, font=default_font)
+        undo_btn.pack(side="right", padx=4)
+        realtime_chk = tk.Checkbutton(btn_frame, text="Real-time", variable=self.realtime_var, command=self.toggle_realtime, bg=self.bg_color, fg=self.fg_color, selectcolor=self.button_color, activebackground=self.bg_color, font=default_font)
+        realtime_chk.pack(side="right", padx=4)
+
+        # --- Tab strip: one button per open investigation ---
+        self.tab_bar = tk.Frame(root, bg=self.bg_color)
+        self.tab_bar.pack(fill="x", padx=10)
+        self.tab_buttons = []
+        close_btn = tk.Button(self.tab_bar, text="Close Case", command=self.close_tab, bg=self.button_color, fg=self.fg_color, font=default_font)
+        close_btn.pack(side="right", padx=4, pady=(0, 4))
 
         # --- Main content area ---
         main_content = tk.Frame(root, bg=self.bg_color)
@@ -958,7 +207,8 @@ class DetectiveGameUI:
             ("Interrogate (-1 cred)", self.interrogate_prompt),
             ("Present Evidence (-1 cred)", self.present_prompt),
             ("Accuse (End Case)", self.accuse_prompt),
-            ("Notebook (Clues/Info)", self.show_notebook)
+            ("Notebook (Clues/Info)", self.show_notebook),
+            ("Hint", self.hint_prompt)
         ]
         
         for i, (text, command) in enumerate(action_buttons):
@@ -967,37 +217,182 @@ class DetectiveGameUI:
 
         actions.grid_columnconfigure(5, weight=1) # Ensure Notebook stretches slightly
 
+        # Typed commands, several at once: "move office > dive bar; collect 3,5"
+        command_row = tk.Frame(actions, bg=self.bg_color)
+        command_row.grid(row=1, column=0, columnspan=len(action_buttons), sticky="ew", padx=4, pady=(0, 4))
+        tk.Label(command_row, text="Command:", bg=self.bg_color, fg=self.fg_color, font=default_font).pack(side="left")
+        command_entry = tk.Entry(command_row, textvariable=self.command_var, bg=self.button_color, fg=self.fg_color, insertbackground=self.fg_color, font=default_font)
+        command_entry.pack(side="left", fill="x", expand=True, padx=4)
+        command_entry.bind("<Return>", lambda e: self.run_command())
+        tk.Button(command_row, text="Run", command=self.run_command, bg=self.accent_color, fg="white", font=default_font).pack(side="right")
+
         # Output area
         out_frame = tk.LabelFrame(mid, text="Investigative Log", padx=6, pady=6, bg=self.bg_color, fg=self.fg_color, font=heading_font)
         out_frame.pack(fill="both", expand=True)
+
+        search = tk.Frame(out_frame, bg=self.bg_color)
+        search.pack(fill="x", pady=(0, 4))
+        tk.Label(search, text="Search:", bg=self.bg_color, fg=self.fg_color, font=default_font).pack(side="left")
+        search_entry = tk.Entry(search, textvariable=self.search_var, width=24, bg=self.button_color, fg=self.fg_color, insertbackground=self.fg_color, font=default_font)
+        search_entry.pack(side="left", padx=4)
+        search_entry.bind("<Return>", lambda e: self.search_step(1))
+        search_entry.bind("<Shift-Return>", lambda e: self.search_step(-1))
+        for style in LOG_STYLES:
+            chk = tk.Checkbutton(search, text=style.title(), variable=self.style_vars[style], command=self.run_search, bg=self.bg_color, fg=self.fg_color, selectcolor=self.button_color, activebackground=self.bg_color, font=default_font)
+            chk.pack(side="left")
+        tk.Button(search, text="Next", command=lambda: self.search_step(1), bg=self.button_color, fg=self.fg_color, font=default_font).pack(side="right", padx=2)
+        tk.Button(search, text="Prev", command=lambda: self.search_step(-1), bg=self.button_color, fg=self.fg_color, font=default_font).pack(side="right", padx=2)
+        self.search_label = tk.Label(search, text="", bg=self.bg_color, fg=self.fg_color, font=default_font)
+        self.search_label.pack(side="right", padx=4)
+        self.search_var.trace_add("write", lambda *args: self.run_search())
+
         self.log = scrolledtext.ScrolledText(out_frame, height=18, state="disabled", wrap="word", bg="#1b2c3a", fg="#d3d9df", font=default_font)
         self.log.pack(fill="both", expand=True)
+        self.log.tag_config("search_entry", background="#24394b")
+        self.log.tag_config("search_hit", background="#f1c40f", foreground="#1b2c3a")
+        if profiler is not None:
+            profiler.probe = self.memory_gauges
 
         # initialize disabled state
         self.disable_game_ui()
         self.log_write("Welcome, Detective. The clock is ticking. Click Tutorial or Start New Case to begin your investigation.")
+        for message in startup_errors:
+            self.log_write(message, style='error')
 
     # ---------------------
     # UI helpers
     # ---------------------
     def log_write(self, text, style='info'):
+        if self.log_buffer is not None:
+            self.log_buffer.append((text, style))
+            return
+        self.write_log_entries([(text, style)])
+
+    def write_log_entries(self, entries, wrapped=False):
+        # One insert for all entries: Text.insert takes text, tags, text, tags...
+        # `wrapped` entries are already laid out (e.g. a woken tab's log).
         self.log.configure(state="normal")
-        
-        tag_name = style
-        if tag_name not in self.log.tag_names():
-            if style == 'error':
-                self.log.tag_config(tag_name, foreground="#e74c3c", font=("Consolas", 10, "bold"))
-            elif style == 'win':
-                self.log.tag_config(tag_name, foreground="#2ecc71", font=("Consolas", 10, "bold"))
-            elif style == 'action':
-                self.log.tag_config(tag_name, foreground="#f39c12", font=("Consolas", 10, "italic"))
-            else: # info
-                self.log.tag_config(tag_name, foreground="#ecf0f1")
-        
-        
-        self.log.insert("end", textwrap.fill(text, 80) + "\n\n", tag_name)
+        chunks = []
+        for text, style in entries:
+            tag_name = style
+            if tag_name not in self.log.tag_names():
+                if style == 'error':
+                    self.log.tag_config(tag_name, foreground="#e74c3c", font=("Consolas", 10, "bold"))
+                elif style == 'win':
+                    self.log.tag_config(tag_name, foreground="#2ecc71", font=("Consolas", 10, "bold"))
+                elif style == 'action':
+                    self.log.tag_config(tag_name, foreground="#f39c12", font=("Consolas", 10, "italic"))
+                else: # info
+                    self.log.tag_config(tag_name, foreground="#ecf0f1")
+            text = text if wrapped else textwrap.fill(text, 80)
+            chunks += [text + "\n\n", tag_name]
+            self.log_index.add(text, style)
+
+        self.log.insert("end", *chunks)
+        drop = self.log_index.overflow()
+        if drop:
+            lines = self.log_index.drop_oldest(drop)
+            self.log.delete("1.0", f"{lines + 1}.0")
+            # Entry numbers survive a trim; only the dropped hits go
+            kept = [e for e in self.search_hits if e >= self.log_index.base]
+            self.search_pos = max(self.search_pos - (len(self.search_hits) - len(kept)), 0) if kept else -1
+            self.search_hits = kept
         self.log.see("end")
         self.log.configure(state="disabled")
+        self.search_stale = True
+
+    def memory_gauges(self):
+        # What the allocation profiler records next to each action
+        cs = self.case_state or {}
+        return {
+            "widgets": count_widgets(self.root),
+            "log_lines": int(self.log.index("end-1c").split(".")[0]),
+            "log_entries": len(self.log_index),
+            "found_clues": len(cs.get('found_clues', ())),
+            "undo_depth": len(self.undo_stack),
+            "open_tabs": len(self.tabs),
+            "hibernated_bytes": sum(len(t.blob) for t in self.tabs if t.blob is not None),
+        }
+
+    def clear_log(self):
+        self.log.configure(state="normal")
+        self.log.delete("1.0", "end")
+        self.log.configure(state="disabled")
+        self.log_index = LogIndex()
+        self.search_hits = []
+        self.search_pos = -1
+        self.search_stale = False
+        self.search_label.config(text="")
+
+    @contextmanager
+    def log_batch(self):
+        # Log lines written inside the block reach the widget in one go at the end.
+        if self.log_buffer is not None:
+            yield
+            return
+        self.log_buffer = []
+        try:
+            yield
+        finally:
+            entries, self.log_buffer = self.log_buffer, None
+            if entries:
+                self.write_log_entries(entries)
+
+    # ---------------------
+    # Log search
+    # ---------------------
+    def search_styles(self):
+        # None when every style is ticked, so the index can skip the filter
+        styles = [s for s, var in self.style_vars.items() if var.get()]
+        return None if len(styles) == len(LOG_STYLES) else styles
+
+    def run_search(self, keep_position=False):
+        query = self.search_var.get()
+        styles = self.search_styles()
+        self.search_stale = False
+        if not query.strip() and styles is None:
+            self.search_hits = []
+            self.search_pos = -1
+            self.clear_search_marks()
+            self.search_label.config(text="")
+            return
+        current = self.search_hits[self.search_pos] if keep_position and self.search_hits else None
+        self.search_hits = self.log_index.search(query, styles)
+        if current is not None and current in self.search_hits:
+            self.search_pos = self.search_hits.index(current)
+        else:
+            # Start from the most recent match
+            self.search_pos = len(self.search_hits) - 1
+        self.show_search_hit()
+
+    def search_step(self, delta):
+        if self.search_stale:
+            self.run_search(keep_position=True)
+        if not self.search_hits:
+            return
+        self.search_pos = (self.search_pos + delta) % len(self.search_hits)
+        self.show_search_hit()
+
+    def clear_search_marks(self):
+        self.log.tag_remove("search_entry", "1.0", "end")
+        self.log.tag_remove("search_hit", "1.0", "end")
+
+    def show_search_hit(self):
+        self.clear_search_marks()
+        if not self.search_hits:
+            self.search_label.config(text="No matches")
+            return
+        entry = self.search_hits[self.search_pos]
+        index = self.log_index
+        first = index.line(entry)
+        last = first + index.text(entry).count("\n")
+        self.log.tag_add("search_entry", f"{first}.0", f"{last}.end")
+        for line, start, end in index.spans(entry, self.search_var.get()):
+            self.log.tag_add("search_hit", f"{line}.{start}", f"{line}.{end}")
+        self.log.tag_raise("search_entry")
+        self.log.tag_raise("search_hit")
+        self.log.see(f"{first}.0")
+        self.search_label.config(text=f"{self.search_pos + 1}/{len(self.search_hits)}")
 
     def enable_game_ui(self):
         for b in self.location_buttons.values():
@@ -1014,21 +409,25 @@ class DetectiveGameUI:
     def update_status(self):
         cs = self.case_state
         self.cred_label.config(text=f"Credibility: {max(0, cs['credibility'])}")
-        self.turn_label.config(text=f"Turns: {cs['turns']}/{MAX_TURNS}")
+        max_turns = self.engine.rules.max_turns
+        self.turn_label.config(text=f"Turns: {cs['turns']}/{max_turns}")
         
-        if cs['credibility'] <= 0 or cs['turns'] >= MAX_TURNS:
+        if cs['credibility'] <= 0 or cs['turns'] >= max_turns:
             self.disable_game_ui()
             # If the game is already over due to accusation, don't re-log the loss conditions.
 
-    def refresh_locations(self):
+    def refresh_locations(self, names=None):
+        # names: redraw only these locations' buttons
         loc_names = list(self.case_state['locations'].keys())
         btns = list(self.location_buttons.values())
         for i in range(4):
             name = loc_names[i]
+            if names is not None and name not in names:
+                continue
             btn = btns[i]
             
             # Show number of visible clues
-            clue_count = len(self.case_state['locations'][name].clues)
+            clue_count = self.case_state['locations'][name].clue_count()
             clue_indicator = f" ({clue_count})" if clue_count > 0 else ""
             
             btn.config(text=name + clue_indicator, command=lambda n=name: self.move_to(n))
@@ -1039,9 +438,14 @@ class DetectiveGameUI:
             else:
                 btn.config(relief="raised", bg=self.button_color)
 
-    def refresh_suspects(self):
-        self.suspect_listbox.delete(0, "end")
-        for s in self.case_state['suspects'].values():
+    def refresh_suspects(self, names=None):
+        # names: redraw only these suspects' rows
+        if names is None:
+            self.suspect_listbox.delete(0, "end")
+        odds = self.tracker.sync(self.case_state).probabilities()
+        for i, s in enumerate(self.case_state['suspects'].values()):
+            if names is not None and s.name not in names:
+                continue
             pres = self.case_state['presented'].get(s.name, "none")
             
             # Show if interrogated and if evidence was strong
@@ -1051,8 +455,15 @@ class DetectiveGameUI:
                 pres_mark = " [STRONG EVIDENCE]"
             elif pres == "weak":
                 pres_mark = " [WEAK]"
+            if s.contradictions:
+                pres_mark += f" [{len(s.contradictions)} CONTRADICTED]"
             
-            self.suspect_listbox.insert("end", f"{s.name}{int_mark} | {s.alibi}{pres_mark}")
+            row = f"{s.name}{int_mark} | {s.alibi}{pres_mark} | {odds[s.name]:.0%}"
+            if names is None:
+                self.suspect_listbox.insert("end", row)
+            else:
+                self.suspect_listbox.delete(i)
+                self.suspect_listbox.insert(i, row)
 
     def current_location_obj(self):
         return self.case_state['locations'][self.case_state['current_location']]
@@ -1061,7 +472,9 @@ class DetectiveGameUI:
     # Game lifecycle
     # ---------------------
     def start_case(self):
-        case = generate_case()
+        case = seeded_case(random.getrandbits(32))
+        self.cases_opened += 1
+        self.open_tab(f"Case {self.cases_opened}")
         self.setup_case(case)
         self.log_write("CASE START: A high-profile murder has been committed. The police commissioner has given you a limited budget and only 50 hours of investigation time. Find the culprit and present a watertight case.", style='win')
         self.log_write("Suspects identified:")
@@ -1069,28 +482,140 @@ class DetectiveGameUI:
             self.log_write(f"- {s.summary()}")
         self.refresh_ui_after_change()
 
+    def start_daily(self):
+        # Today's seeded case, ranked on the local leaderboard when it ends
+        seed = daily_seed()
+        self.open_tab(f"Daily {seed}")
+        self.setup_case(seeded_case(seed))
+        self.case_state['daily'] = True
+        self.open_leaderboard()
+        self.log_write(f"DAILY CHALLENGE {seed}: every detective gets this same case today. Win with the most credibility left, in the fewest turns. No undo, redo or hints in a ranked run.", style='win')
+        self.log_write("Suspects identified:")
+        for s in self.case_state['suspects'].values():
+            self.log_write(f"- {s.summary()}")
+        self.refresh_ui_after_change()
+
     def start_tutorial(self):
         case = generate_tutorial_case()
+        self.open_tab("Tutorial")
         self.setup_case(case)
         self.log_write("TUTORIAL CASE LOADED. Welcome to the case of the Defaced Photo. Start by clicking EXAMINE SCENE.", style='win')
         self.case_state['tutorial_step'] = 1
         self.refresh_ui_after_change()
 
-    def setup_case(self, case):
-        self.case_state = {
-            "locations": case['locations'],
-            "suspects": case['suspects'],
-            "culprit": case['culprit'],
-            "linking_tag": case['linking_tag'],
-            "current_location": list(case['locations'].keys())[0],
-            "credibility": START_CREDIBILITY,
-            "turns": 0,
-            "found_clues": [],
-            "presented": {}
-        }
-        self.enable_game_ui()
+    def resume_case(self):
+        try:
+            state = load_game(AUTOSAVE_PATH)
+        except FileNotFoundError:
+            messagebox.showinfo("Resume", "No autosave found.")
+            return
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Resume", f"The autosave could not be read: {e}")
+            return
+        self.open_tab("Resumed")
+        self.setup_case(state=state)
+        self.log_write("CASE RESUMED from the last autosave.", style='win')
+        self.refresh_ui_after_change()
+
+    def setup_case(self, case=None, state=None, history=None):
+        # history: (undo stack, redo stack, case features, recorded, actions) of a woken tab
+        self.engine = GameEngine(case, log=self.log_write, state=state)
+        self.case_state = self.engine.state
+        self.tracker = CulpritTracker(self.case_state['suspects'])
+        if self.decay is not None:
+            self.decay.stop()
+        self.decay = DecayScheduler(self.engine, self.root.after, self.root.after_cancel, on_decay=self.on_decay)
+        self.toggle_realtime()
+        if history is None:
+            self.undo_stack = []
+            self.redo_stack = []
+            self.case_features = case_features(self.case_state)
+            self.game_recorded = False
+            self.actions_taken = 0
+        else:
+            (self.undo_stack, self.redo_stack, self.case_features,
+             self.game_recorded, self.actions_taken) = history
+        if self.engine.is_over():
+            self.disable_game_ui()
+        else:
+            self.enable_game_ui()
         self.refresh_ui_after_change()
 
+    # ---------------------
+    # Tabs
+    # ---------------------
+    def open_tab(self, title):
+        # A new case gets a tab of its own; the one in view hibernates.
+        self.hibernate()
+        self.tabs.append(Investigation(title))
+        self.active_tab = len(self.tabs) - 1
+        self.refresh_tabs()
+
+    def hibernate(self, keep=True):
+        # Packs the case in view into its tab's blob (dropped if not `keep`),
+        # destroys its windows and empties the view.
+        if self.active_tab is None:
+            return
+        # Stopped first so the blob has the case time reached
+        if self.decay is not None:
+            self.decay.stop()
+            self.decay = None
+        if keep and self.engine is not None:
+            self.tabs[self.active_tab].blob = pack_session(
+                self.case_state, self.undo_stack, self.redo_stack,
+                zip(self.log_index.texts, self.log_index.styles),
+                features=self.case_features, recorded=self.game_recorded,
+                actions=self.actions_taken)
+        for w in self.case_windows:
+            if w.winfo_exists():
+                w.destroy()
+        self.case_windows = []
+        self.hint_request = None
+        self.engine = self.case_state = self.tracker = None
+        self.undo_stack = []
+        self.redo_stack = []
+        self.active_tab = None
+        self.clear_log()
+        self.disable_game_ui()
+
+    def switch_tab(self, index):
+        if index == self.active_tab:
+            return
+        self.hibernate()
+        tab = self.tabs[index]
+        session = unpack_session(tab.blob)
+        tab.blob = None
+        self.active_tab = index
+        self.write_log_entries(session["log"], wrapped=True)
+        extra = session["extra"]
+        self.setup_case(state=session["state"],
+                        history=(session["undo"], session["redo"], extra["features"],
+                                 extra["recorded"], extra["actions"]))
+        self.refresh_tabs()
+
+    def close_tab(self):
+        if self.active_tab is None:
+            return
+        index = self.active_tab
+        self.hibernate(keep=False)
+        del self.tabs[index]
+        if self.tabs:
+            self.switch_tab(min(index, len(self.tabs) - 1))
+        else:
+            self.refresh_tabs()
+
+    def refresh_tabs(self):
+        for b in self.tab_buttons:
+            b.destroy()
+        self.tab_buttons = []
+        for i, tab in enumerate(self.tabs):
+            active = i == self.active_tab
+            b = tk.Button(self.tab_bar, text=tab.title, command=lambda i=i: self.switch_tab(i),
+                          relief="sunken" if active else "raised",
+                          bg=self.accent_color if active else self.button_color, fg=self.fg_color, font=("Consolas", 10))
+            b.pack(side="left", padx=2, pady=(0, 4))
+            self.tab_buttons.append(b)
+
     # ---------------------
     # Action handlers
     # ---------------------
@@ -1100,30 +625,18 @@ class DetectiveGameUI:
         if loc_name not in self.case_state['locations']:
             messagebox.showinfo("Move", "Unknown location.")
             return
-            
-        # Cost is only applied if moving to a *new* location
-        if loc_name != self.case_state['current_location']:
-            self.apply_credibility(1)
-            self.case_state['current_location'] = loc_name
-            self.log_write(f"You travel to {loc_name}. (-1 Credibility)", style='action')
-        else:
-            self.log_write(f"You are already at {loc_name}.")
 
-        self.refresh_ui_after_change()
+        snap = self.engine.snapshot()
+        self.engine.move_to(loc_name)
+        self.remember(snap)
+        self.refresh_ui_after_change(self.engine.patch_since(snap))
 
     def examine(self):
         if self.case_state is None:
             return
-        
-        # Examine is a free action
-        loc = self.current_location_obj()
-        if not loc.clues:
-            self.log_write("You see nothing of obvious interest in this area.")
-        else:
-            self.log_write(f"Visible items and clues at {loc.name}:")
-            for c in loc.clues:
-                self.log_write(f" • id {c.id}: {c.brief()}")
-        
+
+        self.engine.examine()
+
         # tutorial guidance
         if self.case_state.get('tutorial_step') == 1:
             self.log_write("Tutorial hint: Click Search/Collect and enter clue ID 1 to secure this piece of evidence. This costs 1 Credibility.", style='win')
@@ -1141,37 +654,27 @@ class DetectiveGameUI:
         default = ids[0]
         
         val = simpledialog.askstring("Search / Collect Evidence", 
-                                     f"Enter the ID of the clue you wish to collect (visible IDs: {', '.join(ids)})", 
+                                     f"Enter the ID(s) of the clue(s) you wish to collect, e.g. 3,5 (visible IDs: {', '.join(ids)})", 
                                      initialvalue=default)
         if val is None:
             return
         
         try:
-            cid = int(val.strip())
+            cids = [int(v) for v in val.replace(",", " ").split()]
         except ValueError:
             messagebox.showerror("Search", "Clue ID must be a number.")
             return
-        
-        found = next((c for c in loc.clues if c.id == cid), None)
-
-        if not found:
+        if not cids or any(cid not in (c.id for c in loc.clues) for cid in cids):
             messagebox.showinfo("Search", "No such clue here.")
             return
-
-        # Perform the action and apply cost
-        self.apply_credibility(1)
-        found.found = True
-        self.case_state['found_clues'].append(found)
-        loc.clues.remove(found)
-        
-        self.log_write(f"You collected the evidence: {found.brief()} (-1 Credibility)", style='action')
         
+        if self.apply_actions([("collect", cid) for cid in cids]) is None:
+            return
+
         # tutorial guidance
         if self.case_state.get('tutorial_step') == 2:
             self.log_write("Tutorial hint: Open your Notebook to see the collected clue and its tags. Then, select a suspect (e.g., Avery Collins) and click Interrogate.", style='win')
             self.case_state['tutorial_step'] = 3
-        
-        self.refresh_ui_after_change()
 
     def interrogate_prompt(self):
         if self.case_state is None or self.case_state['credibility'] <= 0: return
@@ -1180,41 +683,48 @@ class DetectiveGameUI:
         if sel is None:
             messagebox.showinfo("Interrogate", "Select a suspect from the list first.")
             return
+        if self.case_state['suspects'][sel].interrogated:
+            # Later rounds: put collected evidence to them
+            self.confront_prompt(sel)
+            return
         
-        suspect = self.case_state['suspects'][sel]
-        
-        # Only pay cost if not already interrogated
-        cost = 0
-        if not suspect.interrogated:
-            cost = 1
-            self.apply_credibility(cost)
-            suspect.interrogated = True
-            
-            self.log_write(f"You interrogate {suspect.name}. (-{cost} Credibility)", style='action')
-        else:
-            self.log_write(f"You re-interrogate {suspect.name}. The suspect is cooperative but offers no new information.")
+        snap = self.engine.snapshot()
+        interrogated = self.engine.interrogate(sel)
+        self.remember(snap)
+        if not interrogated:
             return
 
-        # Reveal a lead if matching tags exist in uncollected clues (20% chance if tags match)
-        reveal = False
-        for locname, loc in self.case_state['locations'].items():
-            for c in loc.clues:
-                if suspect.tags & c.tags and random.random() < 0.2:
-                    self.log_write(f"During questioning, {suspect.name} mentions a detail that points to a lead at: {locname}")
-                    reveal = True
-                    break
-            if reveal:
-                break
-                
-        if not reveal:
-            self.log_write(f"{suspect.name} maintains their alibi: {suspect.alibi}. They don't budge.")
-            
         # tutorial guidance
         if self.case_state.get('tutorial_step') == 3:
             self.log_write("Tutorial hint: Did you notice the clue you found was linked to 'avery'? Now try to Present Evidence against 'Avery Collins'.", style='win')
             self.case_state['tutorial_step'] = 4
             
-        self.refresh_ui_after_change()
+        self.refresh_ui_after_change(self.engine.patch_since(snap))
+
+    def confront_prompt(self, name):
+        s = self.case_state['suspects'][name]
+        ids = [str(c.id) for c in self.case_state['found_clues'] if c.id not in s.confronted]
+        if not ids:
+            messagebox.showinfo("Interrogate", f"{name} has already been confronted with all your evidence.")
+            return
+
+        val = simpledialog.askstring("Confront Suspect",
+                                     f"Enter the ID(s) of the clue(s) to confront {name} with, e.g. 3,5 "
+                                     f"(not yet shown to them: {', '.join(ids)})",
+                                     initialvalue=ids[0])
+        if val is None:
+            return
+
+        try:
+            cids = [int(v) for v in val.replace(",", " ").split()]
+        except ValueError:
+            messagebox.showerror("Confront", "Clue ID must be a number.")
+            return
+        if not cids or any(str(cid) not in ids for cid in cids):
+            messagebox.showinfo("Confront", "That clue is not in your evidence, or they have already seen it.")
+            return
+
+        self.apply_actions([("confront", (name, cid)) for cid in cids])
 
     def present_prompt(self):
         if self.case_state is None or self.case_state['credibility'] <= 0: return
@@ -1224,16 +734,16 @@ class DetectiveGameUI:
             messagebox.showinfo("Present", "Select a suspect from the list first.")
             return
         
-        self.apply_credibility(1) # Apply cost regardless of outcome
-        self.log_write(f"Preparing to present evidence against {sel}...", style='action')
-        self.present_evidence(sel)
+        snap = self.engine.snapshot()
+        self.engine.present(sel)
+        self.remember(snap)
         
         # tutorial guidance
         if self.case_state.get('tutorial_step') == 4:
             self.log_write("Tutorial hint: You gained credibility! Use Accuse to close the case on 'Avery Collins'.", style='win')
             self.case_state['tutorial_step'] = 5
             
-        self.refresh_ui_after_change()
+        self.refresh_ui_after_change(self.engine.patch_since(snap))
 
     def accuse_prompt(self):
         if self.case_state is None or self.case_state['credibility'] <= 0: return
@@ -1242,33 +752,81 @@ class DetectiveGameUI:
         if sel is None:
             messagebox.showinfo("Accuse", "Select a suspect from the list first.")
             return
-            
-        # Accusation uses a turn but has a higher failure cost
-        self.apply_credibility(1) 
-        
-        # Check if the game is over due to max turns or 0 cred, before proceeding with the accusation check
-        if self.case_state['credibility'] <= 0 or self.case_state['turns'] >= MAX_TURNS:
-            return
 
-        correct = self.check_win(sel)
+        snap = self.engine.snapshot()
+        correct = self.engine.accuse(sel)
+        self.remember(snap)
         
         if correct:
             messagebox.showinfo("Case Closed", f"Congratulations! You secured a conviction against {sel}.")
             self.disable_game_ui()
+        elif self.engine.is_over():
+            # Game over message handled by apply_credibility
+            pass
         else:
-            if self.case_state['credibility'] <= 0:
-                # Game over message handled by apply_credibility
-                pass
-            else:
-                messagebox.showinfo("Accuse Failed", "Your accusation was too weak or misplaced. Public trust is severely damaged.")
+            messagebox.showinfo("Accuse Failed", "Your accusation was too weak or misplaced. Public trust is severely damaged.")
         
-        self.refresh_ui_after_change()
+        self.refresh_ui_after_change(self.engine.patch_since(snap))
+
+    def apply_actions(self, actions):
+        # Runs several actions as one: all or none of them happen, the log is
+        # written once, and they make a single undo step. Returns the engine
+        # results, or None if the batch was rejected.
+        if self.case_state is None:
+            return None
+        snap = self.engine.snapshot()
+        with self.log_batch():
+            try:
+                results = self.engine.run(actions)
+            except ValueError as e:
+                messagebox.showerror("Command", str(e))
+                return None
+        self.remember(snap)
+        self.refresh_ui_after_change(self.engine.patch_since(snap))
+        return results
+
+    def run_command(self):
+        if self.case_state is None:
+            return
+        try:
+            actions = parse_actions(self.command_var.get(), self.case_state)
+        except ValueError as e:
+            messagebox.showerror("Command", str(e))
+            return
+        if actions and self.apply_actions(actions) is not None:
+            self.command_var.set("")
+
+    def hint_prompt(self):
+        if self.case_state is None or self.engine.is_over() or self.locked_in_daily("hints"):
+            return
+        if self.hint_request is not None and not self.hint_request.done:
+            return
+        if self.hints is None:
+            self.hints = HintEngine()
+        self.hint_request = self.hints.request(self.engine.snapshot(), self.engine.rules)
+        self.root.after(HINT_POLL_MS, self._poll_hint, self.hint_request)
+
+    def _poll_hint(self, req):
+        # Polls the worker processes so the event loop is never blocked on the search.
+        self.hints.poll(req)
+        if not req.done:
+            self.root.after(HINT_POLL_MS, self._poll_hint, req)
+            return
+        if req is not self.hint_request:
+            # Asked for in a tab that has since hibernated
+            return
+        if req.result is None:
+            self.log_write("Hint: there is nothing left to do in this case.")
+        else:
+            self.log_write(f"Hint: {describe_action(req.result)}.", style='action')
 
     def show_notebook(self):
         if self.case_state is None:
             return
         dlg = tk.Toplevel(self.root, bg=self.bg_color)
         dlg.title("Notebook")
+        self.case_windows = [w for w in self.case_windows if w.winfo_exists()]
+        self.case_windows.append(dlg)
         
         txt = scrolledtext.ScrolledText(dlg, width=80, height=25, wrap="word", bg="#1b2c3a", fg="#d3d9df", font=("Consolas", 10))
         txt.pack(fill="both", expand=True, padx=10, pady=10)
@@ -1289,6 +847,9 @@ class DetectiveGameUI:
             txt.insert("end", f"   Motive: {s.motive}\n")
             txt.insert("end", f"   Alibi Location: {s.alibi}\n")
             txt.insert("end", f"   Interrogated: {'Yes' if s.interrogated else 'No'}\n")
+            if s.confronted:
+                txt.insert("end", f"   Confronted With Clues: {', '.join(map(str, sorted(s.confronted)))}\n")
+                txt.insert("end", f"   Contradictions: {', '.join(map(str, sorted(s.contradictions))) or 'None'}\n")
             txt.insert("end", f"   Presentation Status: {pres_status.upper()}\n\n")
             
         txt.configure(state="disabled")
@@ -1296,28 +857,6 @@ class DetectiveGameUI:
     # ---------------------
     # Core logic helpers
     # ---------------------
-    def apply_credibility(self, cost=1):
-        # Always check if the game is already ending before applying the cost
-        if self.case_state['credibility'] <= 0 or self.case_state['turns'] >= MAX_TURNS:
-            return
-            
-        if cost > 0:
-            self.case_state['credibility'] -= cost
-            
-        self.case_state['turns'] += 1
-        
-        if self.case_state['credibility'] <= 0:
-            self.log_write("Your credibility has reached zero. The case has been reassigned. GAME OVER.", style='error')
-            self.log_write(f"The investigation revealed the true culprit was: {self.case_state['culprit']}", style='error')
-            self.disable_game_ui()
-            
-        if self.case_state['turns'] >= MAX_TURNS:
-            self.log_write("You ran out of allowed turns (time limit exceeded). The case is cold. GAME OVER.", style='error')
-            self.log_write(f"The investigation revealed the true culprit was: {self.case_state['culprit']}", style='error')
-            self.disable_game_ui()
-        
-        self.update_status()
-
     def get_selected_suspect_name(self):
         sel = self.suspect_listbox.curselection()
         if not sel:
@@ -1339,80 +878,190 @@ class DetectiveGameUI:
         pres = self.case_state['presented'].get(name, "none")
         info = (f"{s.name}\nMotive: {s.motive}\nAlibi: {s.alibi}\n"
                 f"Interrogated: {'Yes' if s.interrogated else 'No'}\n"
-                f"Presentation Status: {pres.upper()}")
+                f"Contradictions: {', '.join(map(str, sorted(s.contradictions))) or 'None'}\n"
+                f"Presentation Status: {pres.upper()}\n"
+                f"Culprit Probability: {self.tracker.probabilities()[name]:.0%}")
         self.suspect_info.config(text=info)
 
-    def present_evidence(self, suspect_name):
-        suspect = self.case_state['suspects'].get(suspect_name)
-        if not suspect: 
-            self.log_write("Error: No such suspect.", style='error')
+    # ---------------------
+    # Undo / redo
+    # ---------------------
+    def remember(self, snap):
+        # Actions replace every object they change, so an unchanged case
+        # compares equal to the snapshot taken before the action.
+        if snap != self.case_state:
+            self.undo_stack.append(snap)
+            if len(self.undo_stack) > MAX_UNDO:
+                del self.undo_stack[0]
+            self.redo_stack.clear()
+            self.actions_taken += 1
+            self.autosave_record()
+
+    def locked_in_daily(self, what):
+        # Ranked daily runs are played without undo, redo or hints
+        if not self.case_state.get('daily'):
+            return False
+        self.log_write(f"No {what} in the daily challenge: it is a ranked run.", style='error')
+        return True
+
+    def undo(self):
+        if self.case_state is None or not self.undo_stack or self.locked_in_daily("undo"):
             return
-            
-        # --- FIX: Prevent Credibility Spamming ---
-        current_status = self.case_state['presented'].get(suspect_name)
-        if current_status == "strong":
-            self.log_write(f"You have already made a strong presentation against {suspect_name}. Further attempts with the current evidence are redundant (0 Credibility change).")
+        current = self.engine.snapshot()
+        self.redo_stack.append(current)
+        self.engine.restore(self.undo_stack.pop())
+        self.after_history_change("You retrace your steps. (Undo)", diff_states(current, self.case_state))
+
+    def redo(self):
+        if self.case_state is None or not self.redo_stack or self.locked_in_daily("redo"):
             return
-        
-        found_clues = self.case_state['found_clues']
-        linking_clues = []
-        
-        # Calculate score using ONLY evidence not previously used for this suspect
-        for c in found_clues:
-            if c.id not in suspect.presented_clues and len(suspect.tags & c.tags) > 0:
-                linking_clues.append(c)
+        current = self.engine.snapshot()
+        self.undo_stack.append(current)
+        self.engine.restore(self.redo_stack.pop())
+        self.after_history_change("You replay your last step. (Redo)", diff_states(current, self.case_state))
+
+    def after_history_change(self, message, patch):
+        self.autosave_record()
+        self.tracker = CulpritTracker(self.case_state['suspects'])
+        self.decay.reschedule()
+        if self.engine.is_over():
+            self.disable_game_ui()
+        else:
+            self.enable_game_ui()
+        self.log_write(message, style='action')
+        self.refresh_ui_after_change(patch)
 
-        score = len(linking_clues)
-        
-        if score >= 2:
-            self.log_write(f"You present {score} new pieces of strong, linking evidence against {suspect.name}. Credibility +2.", style='win')
-            self.case_state['credibility'] = min(START_CREDIBILITY, self.case_state['credibility'] + 2) # Cap credibility
-            self.case_state['presented'][suspect.name] = "strong"
-            # Mark the clues as used for scoring against this suspect
-            for c in linking_clues:
-                suspect.presented_clues.add(c.id)
-                
-        elif score == 1:
-            self.log_write(f"Your evidence is suggestive but circumstantial ({score} clue link). Credibility unchanged.")
-            self.case_state['presented'][suspect.name] = "weak"
+    # ---------------------
+    # Real-time mode
+    # ---------------------
+    def toggle_realtime(self):
+        if self.engine is None:
+            return
+        if self.realtime_var.get():
+            self.engine.decay_period = DECAY_PERIOD_S
+            self.decay.start()
         else:
-            self.log_write("No clear or new evidence links this suspect to the crime. You lose 2 credibility for a weak presentation.", style='error')
-            self.case_state['credibility'] -= 2
-            self.case_state['presented'][suspect.name] = "none"
+            self.decay.stop()
+            self.engine.decay_period = None
 
+    def on_decay(self, points):
+        # Lost credibility is progress too, as far as the autosave goes
+        self.autosave_record()
+        self.refresh_ui_after_change()
 
-    def check_win(self, accused_name):
-        culprit = self.case_state['culprit']
-        
-        if accused_name == culprit:
-            # Win condition: Accuse the right person AND have at least 2 key clues (linking_tag clues)
-            strong_evidence_count = 0
-            for c in self.case_state['found_clues']:
-                if self.case_state['linking_tag'] in c.tags:
-                    strong_evidence_count += 1
-                    
-            if strong_evidence_count >= 2:
-                self.log_write(f"Accusation successful! You proved {accused_name}'s guilt with {strong_evidence_count} key pieces of evidence. Case closed. (+3 Credibility Bonus)", style='win')
-                self.case_state['credibility'] = min(START_CREDIBILITY, self.case_state['credibility'] + 3)
-                return True
-            else:
-                self.log_write(f"You accused the right person ({accused_name}) but only had {strong_evidence_count} key pieces of evidence. The case is dismissed for lack of proof. You lose 2 Credibility.", style='error')
-                self.case_state['credibility'] -= 2
-                return False
-        else:
-            self.log_write(f"Accusation failed. {accused_name} is innocent. Public trust plummets. You lose 5 credibility.", style='error')
-            self.case_state['credibility'] -= 5
-            return False
+    # ---------------------
+    # Autosave timer
+    # ---------------------
+    def autosave_record(self):
+        if self.autosave is not None:
+            self.autosave.record(self.engine.snapshot)
+
+    def autosave_tick(self):
+        if self.autosave is not None:
+            if self.engine is not None:
+                self.autosave.poll(self.engine.snapshot)
+            # Writes fail on the saver's thread; say so once per new failure
+            error = self.autosave.last_error
+            if error is not None and error is not self.autosave_error:
+                self.autosave_error = error
+                self.log_write(f"Autosave failed: {error}", style='error')
+        self.autosave_timer = self.root.after(AUTOSAVE_POLL_MS, self.autosave_tick)
+
+    def on_close(self):
+        self.root.after_cancel(self.autosave_timer)
+        if self.decay is not None:
+            self.decay.stop()
+        if self.hints is not None:
+            self.hints.shutdown()
+        if self.autosave is not None:
+            if self.engine is not None:
+                self.autosave.save(self.engine.snapshot())
+            self.autosave.close()
+        if self.outcomes is not None:
+            self.outcomes.close()
+        if self.leaderboard_loader is not None and self.leaderboard_loader.wait(5.0):
+            self.post_daily()
+            if self.leaderboard_loader is not None and self.leaderboard_loader.board is not None:
+                self.leaderboard_loader.board.close()
+        if self.profiler is not None:
+            self.profiler.export()
+        self.root.destroy()
 
     # ---------------------
     # UI refresh wrapper
     # ---------------------
-    def refresh_ui_after_change(self):
+    def refresh_ui_after_change(self, patch=None):
+        # Given the engine's patch for an action only the widgets it touches
+        # are redrawn; without one (a new case, a woken tab) everything is.
         if self.case_state is None:
             return
-        self.update_status()
-        self.refresh_locations()
-        self.refresh_suspects()
+        if patch is None:
+            self.update_status()
+            self.refresh_locations()
+            self.refresh_suspects()
+        else:
+            kinds = {op[0] for op in patch}
+            if kinds & {"credibility", "turns"}:
+                self.update_status()
+            # The last two fields of a move or a clue op are where from and to
+            places = {name for op in patch if op[0] in ("current_location", "clue") for name in op[-2:]}
+            if places:
+                self.refresh_locations(places)
+            if kinds & {"clue", "accusations"}:
+                # New evidence or a ruled-out suspect shifts everyone's odds
+                self.refresh_suspects()
+            else:
+                names = {op[1] for op in patch if op[0] in ("interrogated", "presented", "confronted", "contradictions")}
+                if names:
+                    self.refresh_suspects(names)
+        self.record_outcome()
+
+    def record_outcome(self):
+        # Tutorial runs are not real cases and are kept out of the statistics.
+        if self.game_recorded or 'tutorial_step' in self.case_state or not self.engine.is_over():
+            return
+        self.game_recorded = True
+        if self.outcomes is not None:
+            self.outcomes.record(game_row(self.case_features, self.case_state, self.actions_taken, self.engine.rules))
+        if self.case_state.get('daily'):
+            self.rank_daily()
+
+    def open_leaderboard(self):
+        if self.leaderboard_loader is None:
+            self.leaderboard_loader = LeaderboardLoader(LEADERBOARD_PATH)
+
+    def rank_daily(self):
+        cs = self.case_state
+        self.daily_pending.append((cs['seed'], cs['outcome'] == "won", cs['credibility'], cs['turns']))
+        self.open_leaderboard()
+        self.post_daily()
+
+    def post_daily(self):
+        # Submits the waiting daily results once the leaderboard is loaded
+        loader = self.leaderboard_loader
+        if not loader.done:
+            self.root.after(LEADERBOARD_POLL_MS, self.post_daily)
+            return
+        pending, self.daily_pending = self.daily_pending, []
+        if not pending:
+            return
+        if loader.error is not None:
+            # Tried again on the next daily result
+            self.leaderboard_loader = None
+            self.log_write(f"The daily leaderboard could not be opened ({loader.error}); this result is not ranked.", style='error')
+            return
+        board = loader.board
+        if board.skipped:
+            self.log_write(f"The daily leaderboard skipped {board.skipped} unreadable entries.", style='error')
+        for seed, won, credibility, turns in pending:
+            try:
+                rank = board.submit(seed, player_name(), won, credibility, turns)
+            except (OSError, ValueError) as e:
+                self.log_write(f"Daily challenge {seed}: the result could not be ranked ({e}).", style='error')
+                continue
+            self.log_write(f"Daily challenge {seed}: you are #{rank} of {board.players(seed)}.", style='win')
+            for r, player, won, credibility, turns in board.top(seed, 5):
+                self.log_write(f"  #{r} {player}: {'won' if won else 'lost'}, {credibility} credibility, {turns} turns")
 
 # ---------------------
 # Entrypoint
@@ -1421,9 +1070,15 @@ if __name__ == "__main__":
     random.seed()
 
     try:
+        # Optional content pack: python detective_game.py my_pack.json
+        if len(sys.argv) > 1:
+            use_content(load_pack(sys.argv[1]))
+        # Allocation profiling: DEDUCTIONIST_PROFILE=report.json python detective_game.py
+        profile_path = os.environ.get(PROFILE_ENV)
+        profiler = AllocationProfiler(profile_path).start() if profile_path else None
         root = tk.Tk()
-        app = DetectiveGameUI(root)
+        app = DetectiveGameUI(root, profiler)
         root.mainloop()
     except Exception as e:
         # Fallback in case of environment issues
-        print(f"An error occurred: {e}")
\ No newline at end of file
+        print(f"An error occurred: {e}")
@@ -0,0 +1,97 @@
+from functools import lru_cache
+
+# ---------------------
+# Config
+# ---------------------
+# Score ranges accepted by generate_case(difficulty=...), roughly thirds of
+# what free generation deals.
+DIFFICULTY_BANDS = {
+    "easy": (0.0, 0.41),
+    "medium": (0.41, 0.51),
+    "hard": (0.51, 1.01),
+}
+# generate_case gives up on a band after this many candidates
+MAX_DIFFICULTY_TRIES = 1000
+
+def difficulty_band(difficulty):
+    if isinstance(difficulty, str):
+        if difficulty not in DIFFICULTY_BANDS:
+            raise ValueError(f"Unknown difficulty: {difficulty}")
+        return DIFFICULTY_BANDS[difficulty]
+    lo, hi = difficulty
+    return lo, hi
+
+def band_filter(difficulty):
+    lo, hi = difficulty_band(difficulty)
+    def accept(layout):
+        base = layout_base_score(layout)
+        # Skip the filler scan when no filler outcome can reach the band
+        if base >= hi or base + MAX_EVIDENCE_SCORE < lo:
+            return False
+        return lo <= base + layout_evidence_score(layout) < hi
+    return accept
+
+# ---------------------
+# Lookup tables
+# ---------------------
+@lru_cache(maxsize=None)
+def culprit_route(culprit_locs):
+    # culprit_locs: sorted location indices of the culprit clues (0 = start).
+    # Returns (locations holding culprit clues, cheapest turns to collect two of them).
+    counts = [culprit_locs.count(i) for i in range(max(culprit_locs) + 1)]
+    spread = sum(1 for c in counts if c)
+    if counts[0] >= 2:
+        cost = 2
+    elif counts[0] == 1 or any(c >= 2 for c in counts):
+        # one move plus two collections
+        cost = 3
+    else:
+        cost = 4
+    return spread, cost
+
+@lru_cache(maxsize=None)
+def base_score(culprit_locs, alibi_covered):
+    # The part of the score fixed by where the culprit clues are.
+    #   alibi_covered - a culprit clue sits at the culprit's alibi location
+    spread, cost = culprit_route(culprit_locs)
+    return (0.25 * (spread - 1) / 3
+            + 0.2 * (cost - 2) / 2
+            + 0.15 * (len(culprit_locs) <= 3)
+            + 0.1 * (not alibi_covered))
+
+# Indexed [herrings][decoys], capped at 3 and 2:
+#   herrings - filler clues carrying an innocent suspect's name
+#   decoys - innocent suspects that at least two filler clues link to
+EVIDENCE_SCORE = [[0.2 * h / 3 + 0.1 * d / 2 for d in range(3)] for h in range(4)]
+MAX_EVIDENCE_SCORE = EVIDENCE_SCORE[3][2]
+
+# ---------------------
+# Scoring
+# ---------------------
+def layout_base_score(layout):
+    n_culprit = len(layout.clue_locs) - len(layout.filler_sources)
+    culprit_locs = tuple(sorted(layout.clue_locs[:n_culprit]))
+    return base_score(culprit_locs, layout.alibis[layout.culprit] in culprit_locs)
+
+def layout_evidence_score(layout):
+    motives = layout.motives
+    links = [0] * len(motives)
+    herrings = 0
+    for source in layout.filler_sources:
+        if source >= 0 and not source & 1:
+            links[source >> 1] += 1
+            herrings += 1
+            continue
+        # A motive tag links everyone with that motive
+        m = motives[source >> 1] if source >= 0 else -1 - source
+        for j, sm in enumerate(motives):
+            if sm == m:
+                links[j] += 1
+    links[layout.culprit] = 0
+    decoys = sum(1 for n in links if n >= 2)
+    return EVIDENCE_SCORE[min(herrings, 3)][min(decoys, 2)]
+
+def layout_difficulty(layout):
+    # 0 = trivial, 1 = hardest. Works on the structural draws of a CaseLayout,
+    # before any objects exist.
+    return layout_base_score(layout) + layout_evidence_score(layout)
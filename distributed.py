@@ -0,0 +1,368 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+
+from outcomes import COLUMNS
+from simulate import POLICIES, simulate
+
+# ---------------------
+# Config
+# ---------------------
+DEFAULT_PORT = 7341
+# Seeds per range handed to a worker
+CHUNK_SIZE = 2000
+# Idle workers re-run a range already out with someone else (work stealing),
+# but never more than this many copies of it at once
+MAX_COPIES = 2
+# How long a worker with nothing to do waits before asking again
+WAIT_S = 0.2
+
+# ---------------------
+# Statistics
+# ---------------------
+# Results travel as aggregates, not rows: one entry per
+# (culprit_motive, culprit_clues, culprit_spread, outcome) holding
+# [games, total turns, total credibility]. Aggregates from different ranges
+# are merged by adding them up.
+STAT_KEY = tuple(COLUMNS.index(c) for c in ("culprit_motive", "culprit_clues", "culprit_spread", "outcome"))
+TURNS = COLUMNS.index("turns")
+CREDIBILITY = COLUMNS.index("credibility")
+STAT_FIELDS = ("culprit_motive", "culprit_clues", "culprit_spread")
+
+def aggregate(rows, stats=None):
+    # rows: outcomes.game_row tuples
+    stats = {} if stats is None else stats
+    for row in rows:
+        key = tuple(row[i] for i in STAT_KEY)
+        entry = stats.get(key)
+        if entry is None:
+            entry = stats[key] = [0, 0, 0]
+        entry[0] += 1
+        entry[1] += row[TURNS]
+        entry[2] += row[CREDIBILITY]
+    return stats
+
+def encode_stats(stats):
+    return [list(key) + entry for key, entry in stats.items()]
+
+def merge_stats(stats, encoded):
+    for item in encoded:
+        key = tuple(item[:4])
+        entry = stats.get(key)
+        if entry is None:
+            stats[key] = list(item[4:])
+        else:
+            for i, v in enumerate(item[4:]):
+                entry[i] += v
+    return stats
+
+def check_stats(encoded):
+    # Raises ValueError unless `encoded` is shaped like encode_stats() output;
+    # results come off the network and are checked before any is merged
+    if not isinstance(encoded, list):
+        raise ValueError("stats must be a list")
+    for item in encoded:
+        if not isinstance(item, list) or len(item) != len(STAT_KEY) + 3:
+            raise ValueError(f"Bad stats entry: {item!r}")
+        if not all(v is None or isinstance(v, (str, int, float)) for v in item[:4]):
+            raise ValueError(f"Bad stats key: {item!r}")
+        if (not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in item[4:])
+                or not isinstance(item[4], int) or item[4] <= 0):
+            raise ValueError(f"Bad stats counts: {item!r}")
+    return encoded
+
+def win_rate_by(stats, field):
+    # Same columns as outcomes.QUERIES["win_rate_by_..."]: value, games, win_rate, avg_turns
+    i = STAT_FIELDS.index(field)
+    groups = {}
+    for key, (games, turns, _) in stats.items():
+        g = groups.setdefault(key[i], [0, 0, 0])
+        g[0] += games
+        g[1] += games if key[3] == "won" else 0
+        g[2] += turns
+    return [(value, games, wins / games, turns / games) for value, (games, wins, turns) in sorted(groups.items())]
+
+def outcome_totals(stats):
+    groups = {}
+    for key, (games, turns, credibility) in stats.items():
+        g = groups.setdefault(key[3], [0, 0, 0])
+        g[0] += games
+        g[1] += credibility
+        g[2] += turns
+    rows = [(outcome, games, cred / games, turns / games) for outcome, (games, cred, turns) in groups.items()]
+    return sorted(rows, key=lambda r: -r[1])
+
+# ---------------------
+# Wire protocol
+# ---------------------
+# One JSON object per line. The worker speaks first:
+#   {"op": "hello", "worker": name}
+#   {"op": "next"}  ->  {"op": "range", "id", "start", "stop", "policy"}
+#                     | {"op": "wait", "seconds"} | {"op": "done"}
+#   {"op": "result", "id", "stats": encode_stats(...)}  (no reply)
+def send(f, msg):
+    f.write(json.dumps(msg) + "\n")
+    f.flush()
+
+def receive(f):
+    line = f.readline()
+    return json.loads(line) if line else None
+
+# ---------------------
+# Coordinator
+# ---------------------
+class _Lease:
+    __slots__ = ("name", "ranges")
+
+    def __init__(self, name):
+        self.name = name
+        self.ranges = set()
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        coord = self.server.coordinator
+        lease = _Lease(f"{self.client_address[0]}:{self.client_address[1]}")
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        f = self.request.makefile("rw", encoding="utf-8", newline="\n")
+        try:
+            while True:
+                msg = receive(f)
+                if msg is None:
+                    return
+                if not isinstance(msg, dict):
+                    raise ValueError(f"Not a message: {msg!r}")
+                op = msg.get("op")
+                if op == "hello":
+                    lease.name = str(msg.get("worker", lease.name))
+                elif op == "next":
+                    send(f, coord.next_range(lease))
+                elif op == "result":
+                    coord.submit(lease, msg["id"], msg["stats"])
+        except Exception:
+            # A broken or malformed connection is dropped, whatever the error
+            pass
+        finally:
+            # A worker that drops its connection gives back what it was running
+            coord.release(lease)
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, coordinator):
+        self.coordinator = coordinator
+        super().__init__(address, _Handler)
+
+class Coordinator:
+    # Splits seeds [start, start + games) into ranges and hands them to
+    # workers that ask. Results are keyed by range id and only the first one
+    # for a range is merged, so re-run, stolen or resent ranges are harmless.
+    def __init__(self, start, games, chunk=CHUNK_SIZE, policy="greedy",
+                 host="127.0.0.1", port=DEFAULT_PORT):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy: {policy}")
+        self.policy = policy
+        self.ranges = [(a, min(a + chunk, start + games)) for a in range(start, start + games, chunk)]
+        self.pending = deque(range(len(self.ranges)))
+        # range id -> {lease: time it was handed out}
+        self.running = {}
+        # range id -> name of the worker whose result was merged
+        self.completed = {}
+        self.stats = {}
+        self.duplicates = 0
+        self.retried = 0
+        self.stolen = 0
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        if not self.ranges:
+            self.finished.set()
+        self.server = _Server((host, port), self)
+        self.address = self.server.server_address
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="coordinator", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run(self, timeout=None):
+        # Serves until every range has a result; returns the merged stats.
+        self.start()
+        try:
+            if not self.wait(timeout):
+                raise TimeoutError(f"{len(self.ranges) - len(self.completed)} ranges still unfinished")
+        finally:
+            self.close()
+        return self.stats
+
+    def next_range(self, lease):
+        with self.lock:
+            while self.pending:
+                rid = self.pending.popleft()
+                if rid not in self.completed:
+                    return self._hand_out(rid, lease)
+            if self.finished.is_set():
+                return {"op": "done"}
+            # Nothing queued: steal the range that has been out the longest
+            # from someone else
+            best = None
+            for rid, holders in self.running.items():
+                if lease in holders or len(holders) >= MAX_COPIES:
+                    continue
+                started = min(holders.values())
+                if best is None or started < best[0]:
+                    best = (started, rid)
+            if best is None:
+                return {"op": "wait", "seconds": WAIT_S}
+            self.stolen += 1
+            return self._hand_out(best[1], lease)
+
+    def _hand_out(self, rid, lease):
+        self.running.setdefault(rid, {})[lease] = time.monotonic()
+        lease.ranges.add(rid)
+        start, stop = self.ranges[rid]
+        return {"op": "range", "id": rid, "start": start, "stop": stop, "policy": self.policy}
+
+    def submit(self, lease, rid, encoded):
+        # A bad result raises ValueError before anything changes, so the range
+        # stays on the lease and is retried when the connection is dropped
+        if not isinstance(rid, int) or isinstance(rid, bool) or not 0 <= rid < len(self.ranges):
+            raise ValueError(f"Bad range id: {rid!r}")
+        check_stats(encoded)
+        with self.lock:
+            lease.ranges.discard(rid)
+            holders = self.running.get(rid)
+            if holders is not None:
+                holders.pop(lease, None)
+            if rid in self.completed:
+                self.duplicates += 1
+                return
+            self.completed[rid] = lease.name
+            self.running.pop(rid, None)
+            merge_stats(self.stats, encoded)
+            if len(self.completed) == len(self.ranges):
+                self.finished.set()
+
+    def release(self, lease):
+        with self.lock:
+            for rid in lease.ranges:
+                holders = self.running.get(rid)
+                if holders is None:
+                    continue
+                holders.pop(lease, None)
+                if not holders:
+                    # Nobody else is on it: retry it next
+                    del self.running[rid]
+                    if rid not in self.completed:
+                        self.pending.appendleft(rid)
+                        self.retried += 1
+            lease.ranges.clear()
+
+# ---------------------
+# Worker
+# ---------------------
+def run_worker(host="127.0.0.1", port=DEFAULT_PORT, name=None):
+    # Plays whatever ranges the coordinator hands out until it says done.
+    # Returns the number of games played.
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    played = 0
+    with socket.create_connection((host, port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        f = sock.makefile("rw", encoding="utf-8", newline="\n")
+        send(f, {"op": "hello", "worker": name})
+        while True:
+            send(f, {"op": "next"})
+            msg = receive(f)
+            if msg is None or msg["op"] == "done":
+                return played
+            if msg["op"] == "wait":
+                time.sleep(msg["seconds"])
+                continue
+            stats = aggregate(simulate(range(msg["start"], msg["stop"]), POLICIES[msg["policy"]]))
+            played += msg["stop"] - msg["start"]
+            send(f, {"op": "result", "id": msg["id"], "stats": encode_stats(stats)})
+
+def start_local_workers(port, count):
+    procs = [multiprocessing.Process(target=run_worker, args=("127.0.0.1", port, f"local-{i}"), daemon=True)
+             for i in range(count)]
+    for p in procs:
+        p.start()
+    return procs
+
+def run_local(games, workers=None, start=0, chunk=CHUNK_SIZE, policy="greedy", port=0, timeout=None):
+    # Coordinator plus `workers` worker processes on localhost; returns the
+    # finished Coordinator.
+    coord = Coordinator(start, games, chunk, policy, port=port).start()
+    procs = start_local_workers(coord.address[1], workers or os.cpu_count() or 1)
+    try:
+        if not coord.wait(timeout):
+            raise TimeoutError(f"{len(coord.ranges) - len(coord.completed)} ranges still unfinished")
+    finally:
+        coord.close()
+        for p in procs:
+            p.join(5)
+            if p.is_alive():
+                p.terminate()
+    return coord
+
+# ---------------------
+# Command line
+# ---------------------
+def print_stats(stats):
+    for field in STAT_FIELDS:
+        print(f"\nwin_rate_by_{field.removeprefix('culprit_')}")
+        for row in win_rate_by(stats, field):
+            print("  " + " | ".join(f"{v:.3f}" if isinstance(v, float) else str(v) for v in row))
+    print("\noutcomes")
+    for row in outcome_totals(stats):
+        print("  " + " | ".join(f"{v:.3f}" if isinstance(v, float) else str(v) for v in row))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless games across machines.")
+    sub = parser.add_subparsers(dest="role", required=True)
+    co = sub.add_parser("coordinator", help="hand out seed ranges and merge the results")
+    co.add_argument("--games", type=int, default=1000000)
+    co.add_argument("--seed", type=int, default=0, help="first seed; games use consecutive seeds")
+    co.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    co.add_argument("--policy", choices=sorted(POLICIES), default="greedy")
+    co.add_argument("--host", default="0.0.0.0")
+    co.add_argument("--port", type=int, default=DEFAULT_PORT)
+    co.add_argument("--local-workers", type=int, default=0, help="also start this many workers here")
+    wo = sub.add_parser("worker", help="play ranges for a coordinator")
+    wo.add_argument("--host", default="127.0.0.1")
+    wo.add_argument("--port", type=int, default=DEFAULT_PORT)
+    wo.add_argument("--name")
+    args = parser.parse_args(argv)
+
+    if args.role == "worker":
+        print(f"played {run_worker(args.host, args.port, args.name)} games")
+        return
+
+    started = time.perf_counter()
+    coord = Coordinator(args.seed, args.games, args.chunk, args.policy, args.host, args.port).start()
+    print(f"coordinator on {coord.address[0]}:{coord.address[1]}, {len(coord.ranges)} ranges")
+    start_local_workers(coord.address[1], args.local_workers)
+    try:
+        coord.wait()
+    finally:
+        coord.close()
+    elapsed = time.perf_counter() - started
+    print(f"{args.games} games in {elapsed:.1f}s ({args.games / elapsed * 3600:,.0f} games/hour); "
+          f"{coord.retried} ranges retried, {coord.stolen} stolen, {coord.duplicates} duplicate results dropped")
+    print_stats(coord.stats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,972 @@
+import itertools
+import random
+
+from content import ContentPack
+
+# ---------------------
+# Config
+# ---------------------
+START_CREDIBILITY = 10
+MAX_TURNS = 50
+# Real-time mode: seconds of investigation per point of credibility lost
+DECAY_PERIOD_S = 30
+
+DEFAULT_PROOF_CLUES = 2
+
+class RuleProfile:
+    # The numbers the rules are balanced with. Credibility never rises above
+    # start_credibility.
+    #   action_cost - credibility each move, collection, interrogation,
+    #       presentation and accusation costs
+    #   proof_clues - linking clues needed for a strong presentation and
+    #       for an accusation to stick
+    #   present_bonus / present_penalty - strong presentation / no links
+    #   win_bonus, unproven_penalty, wrong_accusation_penalty - accusations
+    FIELDS = ("start_credibility", "max_turns", "action_cost", "proof_clues", "present_bonus",
+              "present_penalty", "win_bonus", "unproven_penalty", "wrong_accusation_penalty")
+
+    def __init__(self, start_credibility=START_CREDIBILITY, max_turns=MAX_TURNS, action_cost=1,
+                 proof_clues=DEFAULT_PROOF_CLUES, present_bonus=2, present_penalty=2, win_bonus=3,
+                 unproven_penalty=2, wrong_accusation_penalty=5):
+        self.start_credibility = start_credibility
+        self.max_turns = max_turns
+        self.action_cost = action_cost
+        self.proof_clues = proof_clues
+        self.present_bonus = present_bonus
+        self.present_penalty = present_penalty
+        self.win_bonus = win_bonus
+        self.unproven_penalty = unproven_penalty
+        self.wrong_accusation_penalty = wrong_accusation_penalty
+
+    def as_dict(self):
+        return {f: getattr(self, f) for f in self.FIELDS}
+
+    def replace(self, **changes):
+        return RuleProfile(**{**self.as_dict(), **changes})
+
+    def __repr__(self):
+        return "RuleProfile(" + ", ".join(f"{k}={v!r}" for k, v in self.as_dict().items()) + ")"
+
+DEFAULT_RULES = RuleProfile()
+
+LOCATIONS = [
+    "Victim's Penthouse", "Industrial Dock", "Grand Hotel Lobby",
+    "Office Tower", "Local Dive Bar", "City Park",
+    "Security Office", "Rooftop Garden"
+]
+
+SUSPECT_NAMES = [
+    "Avery Collins", "Jordan Blake", "Riley Park",
+    "Morgan Hale", "Casey Lin", "Elias Vance"
+]
+
+MOTIVES = [
+    "Financial", "Revenge", "Jealousy", "Political Cover-Up", "Power Struggle"
+]
+
+CLUE_TYPES = [
+    ("Fingerprint", "links person to a location"),
+    ("Receipt", "shows a recent purchase or expense"),
+    ("Message", "a threatening or revealing text/email"),
+    ("Witness", "eye witness statement placing someone at the scene"),
+    ("Weapon Trace", "residue or tool mark"),
+    ("Photo", "visual evidence or security footage snippet")
+]
+
+# The pack cases are dealt from; the lists above are the built-in one
+CONTENT = ContentPack(LOCATIONS, SUSPECT_NAMES, MOTIVES, CLUE_TYPES).validate()
+
+def use_content(pack):
+    # Switches generation to another pack (see content.load_pack). The lists
+    # above are updated in place so modules that imported them follow along.
+    global CONTENT
+    CONTENT = pack.validate()
+    LOCATIONS[:] = pack.locations
+    SUSPECT_NAMES[:] = pack.suspect_names
+    MOTIVES[:] = pack.motives
+    CLUE_TYPES[:] = pack.clue_types
+
+# ---------------------
+# Core data classes
+# ---------------------
+class Clue:
+    def __init__(self, id, type_name, desc, tags):
+        self.id = id
+        self.type_name = type_name
+        self.desc = desc
+        self.tags = set(tags)
+        self.found = False
+
+    def brief(self):
+        return f"[{self.type_name}] {self.desc}"
+
+class Suspect:
+    def __init__(self, name, motive, alibi, tags):
+        self.name = name
+        self.motive = motive
+        self.alibi = alibi
+        self.tags = set(tags)
+        self.interrogated = False
+        # Tracks which Clue IDs have been used in a successful presentation against this suspect.
+        self.presented_clues = set()
+        # Found clues put to them in later rounds of questioning, and those of
+        # them that tie them to somewhere other than their alibi
+        self.confronted = set()
+        self.contradictions = set()
+
+    def summary(self):
+        return f"{self.name} | Motive: {self.motive} | Alibi: {self.alibi}"
+
+class Location:
+    def __init__(self, name):
+        self.name = name
+        self.clues = []
+
+    def copy(self):
+        # One the engine may change; the original stays with the snapshots
+        loc = Location(self.name)
+        loc.clues = list(self.clues)
+        return loc
+
+    def clue_count(self):
+        return len(self.clues)
+
+    def count_matching(self, tags):
+        # Clues here sharing at least one of `tags`
+        return sum(1 for c in self.clues if tags & c.tags)
+
+def name_tag(suspect_name):
+    # The first-name tag that culprit clues carry (e.g. "Avery Collins" -> "avery")
+    return suspect_name.split()[0].lower()
+
+def motive_tag(motive):
+    return motive.lower().replace(' ', '-')
+
+# ---------------------
+# Answer keys
+# ---------------------
+class AnswerKey:
+    # Which clues link to whom, worked out once when a case is dealt so the
+    # rules can keep counters instead of rescanning the evidence.
+    #   suspects_by_clue - clue id -> the suspects it links to
+    #   named_by_clue - clue id -> the suspects whose name tag it carries (a
+    #       shared motive tag links a clue but does not place anyone)
+    #   conviction - ids of a cheapest set of culprit clues that makes an
+    #       accusation stick, or None where the culprit must stay hidden
+    #   location_by_clue - clue id -> the location it lay at (None where a
+    #       restored save did not record it)
+    __slots__ = ("suspects_by_clue", "named_by_clue", "conviction", "location_by_clue")
+
+    def __init__(self, suspects_by_clue, named_by_clue, conviction, location_by_clue):
+        self.suspects_by_clue = suspects_by_clue
+        self.named_by_clue = named_by_clue
+        self.conviction = conviction
+        self.location_by_clue = location_by_clue
+
+    def hidden(self):
+        return AnswerKey(self.suspects_by_clue, self.named_by_clue, None, self.location_by_clue)
+
+def make_answer_key(case, proof_clues=DEFAULT_PROOF_CLUES):
+    linking_tag = case['linking_tag']
+    owners = {}
+    for name, s in case['suspects'].items():
+        for t in s.tags:
+            owners.setdefault(t, []).append(name)
+    names = {name_tag(name): name for name, s in case['suspects'].items() if name_tag(name) in s.tags}
+    suspects_by_clue = {}
+    named_by_clue = {}
+    location_by_clue = {}
+    culprit_clues = []
+    for loc in case['locations'].values():
+        here = []
+        for c in loc.clues:
+            location_by_clue[c.id] = loc.name
+            linked = [n for t in c.tags if t in owners for n in owners[t]]
+            if len(linked) > 1:
+                linked = list(dict.fromkeys(linked))
+            suspects_by_clue[c.id] = linked
+            named_by_clue[c.id] = [names[t] for t in c.tags if t in names]
+            if linking_tag in c.tags:
+                here.append(c.id)
+        culprit_clues.append(here)
+    # Fewest moves: everything at the starting location, then the locations
+    # holding the most culprit clues first
+    ordered = culprit_clues[:1] + sorted(culprit_clues[1:], key=len, reverse=True)
+    conviction = tuple(cid for here in ordered for cid in here)[:proof_clues]
+    return AnswerKey(suspects_by_clue, named_by_clue, conviction, location_by_clue)
+
+# ---------------------
+# Case generation
+# ---------------------
+class CaseLayout:
+    # The raw draws behind a case, as plain indices (names, motives and clue
+    # types index into the active content pack). Cheap to produce and to
+    # score, so candidates can be rejected before any objects are built.
+    __slots__ = ("culprit", "motives", "alibis", "filler_sources", "clue_locs",
+                 "location_ids", "tag_ids", "suspect_ids", "culprit_types", "filler_types")
+
+def draw_layout(rng=random, accept=None):
+    # Draws everything that shapes the puzzle first; if `accept` rejects that,
+    # returns None before paying for the names and clue types.
+    r = rng.random
+    content = CONTENT
+    n_motives = len(content.motives)
+    layout = CaseLayout()
+    layout.culprit = int(r() * 5)
+    layout.motives = [int(r() * n_motives) for _ in range(5)]
+    layout.alibis = [int(r() * 4) for _ in range(5)]
+
+    # "Strong" clues linked to the culprit (3-4 clues), "filler" clues (4-6 clues)
+    num_culprit_clues = 3 + (r() < 0.5)
+    num_filler_clues = 4 + int(r() * 3)
+
+    # Link filler clues to other suspects or generic tags. A source >= 0 is
+    # suspect*2 + (0 for their name tag, 1 for their motive tag); a source < 0
+    # is the generic motive -1-source.
+    others = [j for j in range(5) if j != layout.culprit]
+    layout.filler_sources = []
+    for _ in range(num_filler_clues):
+        if r() < 0.5:
+            layout.filler_sources.append(others[int(r() * 4)] * 2 + (r() < 0.5))
+        else:
+            layout.filler_sources.append(-1 - int(r() * n_motives))
+
+    # Distribute clues across locations (culprit clues first)
+    layout.clue_locs = [int(r() * 4) for _ in range(num_culprit_clues + num_filler_clues)]
+
+    if accept is not None and not accept(layout):
+        return None
+
+    # Use 4 random locations and 5 random suspects; suspects are drawn by first
+    # name so no two share the tag that links clues to them
+    layout.location_ids = rng.sample(range(len(content.locations)), 4)
+    layout.tag_ids, layout.suspect_ids = content.draw_suspect_ids(rng, 5)
+    n_types = len(content.clue_types)
+    layout.culprit_types = rng.sample(range(n_types), num_culprit_clues)
+    layout.filler_types = [int(r() * n_types) for _ in range(num_filler_clues)]
+    return layout
+
+def build_case(layout):
+    # Tags come from the pack's precomputed tables rather than being derived
+    # from the names again.
+    content = CONTENT
+    loc_names = [content.locations[i] for i in layout.location_ids]
+    locations = {name: Location(name) for name in loc_names}
+
+    suspects = {}
+    names = [content.suspect_names[i] for i in layout.suspect_ids]
+    name_tags = [content.first_names[i] for i in layout.tag_ids]
+    for name, tag, m, a in zip(names, name_tags, layout.motives, layout.alibis):
+        suspects[name] = Suspect(name, content.motives[m], loc_names[a], [tag, content.motive_tags[m]])
+
+    culprit_name = names[layout.culprit]
+    linking_tag = name_tags[layout.culprit]
+
+    clue_pool = []
+    clue_id = 1
+    for t in layout.culprit_types:
+        tname, tdesc = content.clue_types[t]
+        c = Clue(clue_id, tname, f"{tdesc} clearly connected to {linking_tag}", {linking_tag, content.clue_tags[t]})
+        clue_pool.append(c)
+        clue_id += 1
+
+    for t, source in zip(layout.filler_types, layout.filler_sources):
+        tname, tdesc = content.clue_types[t]
+        if source >= 0:
+            i = source >> 1
+            filler_tag = name_tags[i] if source & 1 == 0 else content.motive_tags[layout.motives[i]]
+        else:
+            filler_tag = content.motive_tags[-1 - source]
+        tags = {filler_tag, content.clue_tags[t]}
+        c = Clue(clue_id, tname, f"Generic {tdesc} related to {filler_tag}", tags)
+        clue_pool.append(c)
+        clue_id += 1
+
+    for c, li in zip(clue_pool, layout.clue_locs):
+        locations[loc_names[li]].clues.append(c)
+
+    case = {
+        "locations": locations,
+        "suspects": suspects,
+        "culprit": culprit_name,
+        "linking_tag": linking_tag
+    }
+    case['answer_key'] = make_answer_key(case)
+    return case
+
+def generate_case(difficulty=None, rng=None, spec=None):
+    # difficulty: a name from difficulty.DIFFICULTY_BANDS or a (low, high) score range.
+    # spec: a casespec.CaseSpec; the case is built to it directly, without retries.
+    rng = rng or random
+    if spec is not None:
+        if difficulty is not None:
+            raise ValueError("difficulty and spec cannot be combined")
+        from casespec import generate_from_spec
+        return generate_from_spec(spec, rng)
+    if difficulty is None:
+        return build_case(draw_layout(rng))
+
+    from difficulty import MAX_DIFFICULTY_TRIES, band_filter
+    accept = band_filter(difficulty)
+    for _ in range(MAX_DIFFICULTY_TRIES):
+        layout = draw_layout(rng, accept)
+        if layout is not None:
+            return build_case(layout)
+    raise ValueError(f"No case found for difficulty {difficulty!r}")
+
+def seeded_case(seed, **kwargs):
+    # The same seed (and arguments) always deals the same case.
+    case = generate_case(rng=random.Random(seed), **kwargs)
+    case['seed'] = seed
+    return case
+
+def iter_cases(seed=0, n=None, spec=None):
+    # seeded_case(seed), seeded_case(seed + 1), ... dealt one at a time, n of
+    # them (endlessly if n is None); nothing is kept once a case is consumed.
+    seeds = itertools.count(seed) if n is None else range(seed, seed + n)
+    for s in seeds:
+        yield seeded_case(s, spec=spec)
+
+def generate_tutorial_case():
+    locations = {
+        "Victim's Penthouse": Location("Victim's Penthouse"),
+        "Local Dive Bar": Location("Local Dive Bar"),
+        "Office Tower": Location("Office Tower"),
+        "Rooftop Garden": Location("Rooftop Garden")
+    }
+    suspects_list = ["Avery Collins", "Jordan Blake", "Riley Park", "Morgan Hale"]
+    culprit = "Avery Collins"
+    suspects = {}
+    for name in suspects_list:
+        motive = "Jealousy" if "Avery" in name else random.choice(MOTIVES)
+        alibi = "Local Dive Bar" if name != "Avery Collins" else "Victim's Penthouse"
+        tags = [name.split()[0].lower(), motive.lower()]
+        suspects[name] = Suspect(name, motive, alibi, tags)
+
+    # Clues linking to Avery
+    c1 = Clue(1, "Photo", "A crumpled photo of the victim defaced with the name 'Avery' on the back", {"avery", "photo"})
+    c2 = Clue(2, "Message", "A threatening text referencing a 'financial deal gone sour' sent by a number traced to the Office Tower.", {"avery", "message"})
+    # Distraction clue
+    c3 = Clue(3, "Receipt", "A late-night receipt from a convenience store for someone with an alibi.", {"distraction", "receipt"})
+    # Strongest linking clue
+    c4 = Clue(4, "Fingerprint", "A clear fingerprint match for Avery found on the murder weapon (a broken statue).", {"avery", "fingerprint"})
+
+
+    locations["Victim's Penthouse"].clues.extend([c1, c4])
+    locations["Office Tower"].clues.append(c2)
+    locations["Rooftop Garden"].clues.append(c3)
+
+    case = {
+        "locations": locations,
+        "suspects": suspects,
+        "culprit": culprit,
+        "linking_tag": "avery"
+    }
+    case['answer_key'] = make_answer_key(case)
+    return case
+
+# ---------------------
+# Case state
+# ---------------------
+# Worked out from the rest of the state; savegame leaves them out
+DERIVED_STATE_KEYS = ("answer_key", "tag_counts", "link_counts")
+
+def index_state(state):
+    # Adds the answer key and the evidence counters to a state that lacks
+    # them (e.g. one loaded from a save).
+    #   tag_counts - tag -> found clues carrying it
+    #   link_counts - suspect -> found clues linking to them
+    # Where the found clues lay, as recorded by savegame
+    found_at = state.pop('found_at', None) or {}
+    if 'answer_key' not in state:
+        # Clues already found go first, as if they lay at the start
+        found = Location(None)
+        found.clues = list(state['found_clues'])
+        state['answer_key'] = make_answer_key(dict(state, locations={None: found, **state['locations']}))
+        state['answer_key'].location_by_clue.update((int(cid), name) for cid, name in found_at.items())
+    tag_counts = {}
+    link_counts = {}
+    by_clue = state['answer_key'].suspects_by_clue
+    for c in state['found_clues']:
+        for t in c.tags:
+            tag_counts[t] = tag_counts.get(t, 0) + 1
+        for name in by_clue.get(c.id, ()):
+            link_counts[name] = link_counts.get(name, 0) + 1
+    state['tag_counts'] = tag_counts
+    state['link_counts'] = link_counts
+    return state
+
+def new_case_state(case, rules=DEFAULT_RULES):
+    return {
+        "locations": case['locations'],
+        "suspects": case['suspects'],
+        "culprit": case['culprit'],
+        "linking_tag": case['linking_tag'],
+        "seed": case.get('seed'),
+        "current_location": list(case['locations'].keys())[0],
+        "credibility": rules.start_credibility,
+        "turns": 0,
+        "found_clues": [],
+        "presented": {},
+        # Accused suspects that were not convicted: name -> "innocent" / "unproven"
+        "accusations": {},
+        # None while the case is open, "won" after a conviction
+        "outcome": None,
+        # Real-time mode: case clock in seconds and decay points charged so far
+        "clock": 0.0,
+        "decay_ticks": 0,
+        "answer_key": case.get('answer_key') or make_answer_key(case),
+        "tag_counts": {},
+        "link_counts": {}
+    }
+
+# ---------------------
+# State patches
+# ---------------------
+# Keys diffed entry by entry; every other key is a plain value
+PATCH_ITEM_KEYS = ("locations", "suspects", "found_clues", "presented", "accusations")
+# Suspect fields holding sets of clue ids
+SUSPECT_CLUE_SETS = ("presented_clues", "confronted", "contradictions")
+
+def _list_delta(old, new):
+    # (appended, dropped): what `new` adds to / drops from the end of `old`.
+    # Found clues are only ever appended, and each found Clue object is made
+    # once, so a shared last common item means a shared prefix; lists from
+    # elsewhere (e.g. a save) are compared by clue id instead.
+    n = min(len(old), len(new))
+    if n == 0 or old[n - 1] is new[n - 1]:
+        return new[n:], old[n:]
+    old_ids = {c.id for c in old}
+    new_ids = {c.id for c in new}
+    return [c for c in new if c.id not in old_ids], [c for c in old if c.id not in new_ids]
+
+def diff_states(before, after):
+    # The changes from `before` to `after` as a list of small JSON-able ops:
+    #   (key, old, new) - a plain value, e.g. ("credibility", 7, 6)
+    #   ("clue", id, from, to) - a clue moved between a location and the
+    #       found clues (None), e.g. ("clue", 4, "Kitchen", None)
+    #   ("interrogated", suspect, old, new)
+    #   (field, suspect, added_ids, removed_ids) - for SUSPECT_CLUE_SETS
+    #   ("presented", suspect, old, new), ("accusations", suspect, old, new)
+    # Actions replace every object they change, so whatever the two states
+    # share is skipped and the cost follows the change, not the case.
+    patch = []
+    for key, new in after.items():
+        if key in PATCH_ITEM_KEYS or key in DERIVED_STATE_KEYS:
+            continue
+        old = before.get(key)
+        if old is not new and old != new:
+            patch.append((key, old, new))
+
+    if before['found_clues'] is not after['found_clues']:
+        found, returned = _list_delta(before['found_clues'], after['found_clues'])
+        # Only the locations that were copied can have lost or regained a
+        # clue; with just one of them (the usual case) it needs no search
+        old_locs = before['locations']
+        changed = [(old_locs[name], loc) for name, loc in after['locations'].items()
+                   if old_locs.get(name) not in (loc, None)]
+        if len(changed) == 1:
+            name = changed[0][1].name
+            source = dict.fromkeys((c.id for c in found), name)
+            target = dict.fromkeys((c.id for c in returned), name)
+        else:
+            moved = {c.id for c in found}
+            back = {c.id for c in returned}
+            source, target = {}, {}
+            for old, loc in changed:
+                for c in old.clues:
+                    if c.id in moved:
+                        source[c.id] = loc.name
+                for c in loc.clues:
+                    if c.id in back:
+                        target[c.id] = loc.name
+        patch += [("clue", c.id, None, target.get(c.id)) for c in reversed(returned)]
+        patch += [("clue", c.id, source.get(c.id), None) for c in found]
+
+    if before['suspects'] is not after['suspects']:
+        old_suspects = before['suspects']
+        for name, s in after['suspects'].items():
+            old = old_suspects.get(name)
+            if old is s or old is None:
+                continue
+            if old.interrogated != s.interrogated:
+                patch.append(("interrogated", name, old.interrogated, s.interrogated))
+            for field in SUSPECT_CLUE_SETS:
+                was, now = getattr(old, field), getattr(s, field)
+                if was != now:
+                    patch.append((field, name, sorted(now - was), sorted(was - now)))
+
+    for key in ("presented", "accusations"):
+        old, new = before[key], after[key]
+        if old is not new:
+            for name in list(new) + [n for n in old if n not in new]:
+                if old.get(name) != new.get(name):
+                    patch.append((key, name, old.get(name), new.get(name)))
+    return patch
+
+# ---------------------
+# Headless game engine
+# ---------------------
+def _no_log(text, style='info'):
+    pass
+
+class GameEngine:
+    # Owns the game rules. The UI, bots and search code all drive the same
+    # case_state dict through these methods; log output goes to `log`.
+    #
+    # The state is copy-on-write: objects inside it may be shared with
+    # snapshots or other engines, so the engine copies a container, Location
+    # or Suspect the first time it changes it and only mutates its own copies.
+    # A snapshot is then just a shallow copy of the top-level dict.
+    def __init__(self, case=None, log=None, rng=None, state=None, rules=None):
+        self.rules = rules or DEFAULT_RULES
+        self.state = state if state is not None else new_case_state(case, self.rules)
+        if 'link_counts' not in self.state:
+            index_state(self.state)
+        self.log_write = log or _no_log
+        self.rng = rng or random
+        # Seconds per credibility point lost to time; None outside real-time mode
+        self.decay_period = None
+        self._owned = set()
+
+    @classmethod
+    def from_state(cls, state, log=None, rng=None, rules=None):
+        # The engine plays on a fresh top-level dict; `state` is left untouched.
+        return cls(log=log, rng=rng, state=dict(state), rules=rules)
+
+    # ---------------------
+    # Snapshots
+    # ---------------------
+    def snapshot(self):
+        # O(1): everything reachable from the returned dict is frozen from now on.
+        self._owned = set()
+        return dict(self.state)
+
+    def restore(self, snap):
+        # The live dict is updated in place so references to it stay valid.
+        self.state.clear()
+        self.state.update(snap)
+        self._owned = set()
+
+    def patch_since(self, snap):
+        # What changed since `snap` was taken, as a diff_states patch; front
+        # ends redraw (or send) just that.
+        return diff_states(snap, self.state)
+
+    def _own(self, key):
+        if key not in self._owned:
+            value = self.state[key]
+            self.state[key] = list(value) if isinstance(value, list) else dict(value)
+            self._owned.add(key)
+        return self.state[key]
+
+    def _own_location(self, name):
+        if ('location', name) not in self._owned:
+            self._own('locations')[name] = self.state['locations'][name].copy()
+            self._owned.add(('location', name))
+        return self.state['locations'][name]
+
+    def _own_suspect(self, name):
+        if ('suspect', name) not in self._owned:
+            old = self.state['suspects'][name]
+            s = Suspect(old.name, old.motive, old.alibi, old.tags)
+            s.interrogated = old.interrogated
+            s.presented_clues = set(old.presented_clues)
+            s.confronted = set(old.confronted)
+            s.contradictions = set(old.contradictions)
+            self._own('suspects')[name] = s
+            self._owned.add(('suspect', name))
+        return self.state['suspects'][name]
+
+    def current_location_obj(self):
+        return self.state['locations'][self.state['current_location']]
+
+    def is_over(self):
+        cs = self.state
+        return cs['outcome'] is not None or cs['credibility'] <= 0 or cs['turns'] >= self.rules.max_turns
+
+    # ---------------------
+    # Actions
+    # ---------------------
+    def move_to(self, loc_name):
+        # Cost is only applied if moving to a *new* location
+        if loc_name != self.state['current_location']:
+            self.apply_credibility(self.rules.action_cost)
+            self.state['current_location'] = loc_name
+            self.log_write(f"You travel to {loc_name}. (-{self.rules.action_cost} Credibility)", style='action')
+            return True
+        self.log_write(f"You are already at {loc_name}.")
+        return False
+
+    def examine(self):
+        # Examine is a free action
+        loc = self.current_location_obj()
+        if not loc.clues:
+            self.log_write("You see nothing of obvious interest in this area.")
+        else:
+            self.log_write(f"Visible items and clues at {loc.name}:")
+            for c in loc.clues:
+                self.log_write(f" • id {c.id}: {c.brief()}")
+
+    def collect(self, cid):
+        loc = self.current_location_obj()
+        found = next((c for c in loc.clues if c.id == cid), None)
+        if not found:
+            return None
+
+        # Perform the action and apply cost
+        self.apply_credibility(self.rules.action_cost)
+        loc = self._own_location(loc.name)
+        loc.clues.remove(found)
+        found = Clue(found.id, found.type_name, found.desc, found.tags)
+        found.found = True
+        self._own('found_clues').append(found)
+        tag_counts = self._own('tag_counts')
+        for t in found.tags:
+            tag_counts[t] = tag_counts.get(t, 0) + 1
+        link_counts = self._own('link_counts')
+        for name in self.state['answer_key'].suspects_by_clue.get(found.id, ()):
+            link_counts[name] = link_counts.get(name, 0) + 1
+
+        self.log_write(f"You collected the evidence: {found.brief()} (-{self.rules.action_cost} Credibility)", style='action')
+        return found
+
+    def interrogate(self, suspect_name):
+        suspect = self.state['suspects'][suspect_name]
+
+        # Only pay cost if not already interrogated
+        if suspect.interrogated:
+            self.log_write(f"You re-interrogate {suspect.name}. The suspect is cooperative but offers no new information.")
+            return False
+
+        cost = self.rules.action_cost
+        self.apply_credibility(cost)
+        suspect = self._own_suspect(suspect_name)
+        suspect.interrogated = True
+        self.log_write(f"You interrogate {suspect.name}. (-{cost} Credibility)", style='action')
+
+        # Reveal a lead if matching tags exist in uncollected clues (20% chance if tags match)
+        reveal = False
+        for locname, loc in self.state['locations'].items():
+            for _ in range(loc.count_matching(suspect.tags)):
+                if self.rng.random() < 0.2:
+                    self.log_write(f"During questioning, {suspect.name} mentions a detail that points to a lead at: {locname}")
+                    reveal = True
+                    break
+            if reveal:
+                break
+
+        if not reveal:
+            self.log_write(f"{suspect.name} maintains their alibi: {suspect.alibi}. They don't budge.")
+        return True
+
+    def confront(self, suspect_name, cid):
+        # A later round of questioning: the suspect is shown one found clue.
+        # One carrying their name that lay anywhere but their alibi is a
+        # contradiction, and counts when evidence is presented against them.
+        # A clue sharing only their motive does not place them anywhere.
+        # Raises ValueError, with nothing charged, for a clue not yet found or
+        # a suspect not yet interrogated.
+        suspect = self.state['suspects'].get(suspect_name)
+        if suspect is None:
+            raise ValueError(f"Unknown suspect: {suspect_name!r}")
+        if not suspect.interrogated:
+            raise ValueError(f"Interrogate {suspect_name} before confronting them")
+        if not any(c.id == cid for c in self.state['found_clues']):
+            raise ValueError(f"Clue {cid} has not been found")
+        self.apply_credibility(self.rules.action_cost)
+        if self.state['credibility'] <= 0 or self.state['turns'] >= self.rules.max_turns:
+            return False
+
+        key = self.state['answer_key']
+        suspect = self._own_suspect(suspect_name)
+        suspect.confronted.add(cid)
+        where = key.location_by_clue.get(cid)
+        named = suspect_name in key.named_by_clue.get(cid, ())
+        contradiction = named and where is not None and where != suspect.alibi
+        if contradiction:
+            suspect.contradictions.add(cid)
+            self.log_write(f"You confront {suspect_name} with clue {cid}. They claim they were at {suspect.alibi}, "
+                           f"but the clue ties them to {where}. Contradiction! (-{self.rules.action_cost} Credibility)", style='win')
+        elif named:
+            self.log_write(f"You confront {suspect_name} with clue {cid}. It was found at {where}, which fits their story. "
+                           f"(-{self.rules.action_cost} Credibility)", style='action')
+        else:
+            self.log_write(f"You confront {suspect_name} with clue {cid}. They shrug; nothing ties them to it. "
+                           f"(-{self.rules.action_cost} Credibility)", style='action')
+        return contradiction
+
+    def present(self, suspect_name):
+        self.apply_credibility(self.rules.action_cost) # Apply cost regardless of outcome
+
+        # A cost that ended the case leaves nothing to present to
+        if self.state['credibility'] <= 0 or self.state['turns'] >= self.rules.max_turns:
+            return
+        self.log_write(f"Preparing to present evidence against {suspect_name}...", style='action')
+        self.present_evidence(suspect_name)
+
+    def accuse(self, suspect_name):
+        # Accusation uses a turn but has a higher failure cost
+        self.apply_credibility(self.rules.action_cost)
+
+        # Check if the game is over due to max turns or 0 cred, before proceeding with the accusation check
+        if self.state['credibility'] <= 0 or self.state['turns'] >= self.rules.max_turns:
+            return False
+
+        correct = self.check_win(suspect_name)
+        if correct:
+            self.state['outcome'] = "won"
+        elif suspect_name == self.state['culprit']:
+            self._own('accusations')[suspect_name] = "unproven"
+        else:
+            self._own('accusations')[suspect_name] = "innocent"
+        return correct
+
+    # ---------------------
+    # Case clock
+    # ---------------------
+    def next_decay_at(self):
+        return (self.state['decay_ticks'] + 1) * self.decay_period
+
+    def advance_clock(self, now):
+        # `now` is the case time in seconds, from the wall clock or a virtual one.
+        # Charges every decay point due by then, so a late call catches up in one
+        # step; returns how many points were charged.
+        self.state['clock'] = now
+        if self.decay_period is None or self.is_over():
+            return 0
+        due = int(now // self.decay_period) - self.state['decay_ticks']
+        if due <= 0:
+            return 0
+
+        self.state['decay_ticks'] += due
+        self.log_write(f"Time passes and the commissioner grows impatient. (-{due} Credibility)", style='action')
+        self.lose_credibility(due)
+        return due
+
+    # ---------------------
+    # Rules
+    # ---------------------
+    def apply_credibility(self, cost=1):
+        # Always check if the game is already ending before applying the cost
+        if self.state['credibility'] <= 0 or self.state['turns'] >= self.rules.max_turns:
+            return
+
+        if cost > 0:
+            self.lose_credibility(cost)
+
+        self.state['turns'] += 1
+
+        if self.state['turns'] >= self.rules.max_turns:
+            self.log_write("You ran out of allowed turns (time limit exceeded). The case is cold. GAME OVER.", style='error')
+            self.log_write(f"The investigation revealed the true culprit was: {self.state['culprit']}", style='error')
+
+    def lose_credibility(self, points):
+        # Every loss goes through here, so a case lost to credibility always
+        # says so, whichever penalty ended it
+        self.state['credibility'] -= points
+        if self.state['credibility'] <= 0 < self.state['credibility'] + points:
+            self.log_write("Your credibility has reached zero. The case has been reassigned. GAME OVER.", style='error')
+            self.log_write(f"The investigation revealed the true culprit was: {self.state['culprit']}", style='error')
+
+    def present_evidence(self, suspect_name):
+        suspect = self.state['suspects'].get(suspect_name)
+        if not suspect:
+            self.log_write("Error: No such suspect.", style='error')
+            return
+
+        # --- FIX: Prevent Credibility Spamming ---
+        current_status = self.state['presented'].get(suspect_name)
+        if current_status == "strong":
+            self.log_write(f"You have already made a strong presentation against {suspect_name}. Further attempts with the current evidence are redundant (0 Credibility change).")
+            return
+
+        score, caught = self.presentation_score(suspect)
+        rules = self.rules
+
+        if score >= rules.proof_clues:
+            extra = f" ({caught} of them from contradictions)" if caught else ""
+            self.log_write(f"You present {score} new pieces of strong, linking evidence{extra} against {suspect.name}. Credibility +{rules.present_bonus}.", style='win')
+            self.state['credibility'] = min(rules.start_credibility, self.state['credibility'] + rules.present_bonus) # Cap credibility
+            self._own('presented')[suspect.name] = "strong"
+            # Mark the clues as used for scoring against this suspect
+            by_clue = self.state['answer_key'].suspects_by_clue
+            suspect = self._own_suspect(suspect_name)
+            for c in self.state['found_clues']:
+                if suspect_name in by_clue.get(c.id, ()):
+                    suspect.presented_clues.add(c.id)
+
+        elif score >= 1:
+            self.log_write(f"Your evidence is suggestive but circumstantial ({score} clue link). Credibility unchanged.")
+            self._own('presented')[suspect.name] = "weak"
+        else:
+            self.log_write(f"No clear or new evidence links this suspect to the crime. You lose {rules.present_penalty} credibility for a weak presentation.", style='error')
+            self.lose_credibility(rules.present_penalty)
+            self._own('presented')[suspect.name] = "none"
+
+    def presentation_score(self, suspect):
+        # Score using ONLY evidence not previously used for this suspect; every
+        # clue in presented_clues is a found clue linking to them. A caught
+        # contradiction counts on top of its clue until a strong presentation
+        # uses it up. Returns (score, caught contradictions in it).
+        caught = len(suspect.contradictions - suspect.presented_clues) if suspect.contradictions else 0
+        return self.state['link_counts'].get(suspect.name, 0) - len(suspect.presented_clues) + caught, caught
+
+    def proof_count(self):
+        # Found clues carrying the culprit's tag
+        return self.state['tag_counts'].get(self.state['linking_tag'], 0)
+
+    def check_win(self, accused_name):
+        culprit = self.state['culprit']
+        rules = self.rules
+
+        if accused_name == culprit:
+            # Win condition: Accuse the right person AND have at least 2 key clues (linking_tag clues)
+            strong_evidence_count = self.proof_count()
+
+            if strong_evidence_count >= rules.proof_clues:
+                self.log_write(f"Accusation successful! You proved {accused_name}'s guilt with {strong_evidence_count} key pieces of evidence. Case closed. (+{rules.win_bonus} Credibility Bonus)", style='win')
+                self.state['credibility'] = min(rules.start_credibility, self.state['credibility'] + rules.win_bonus)
+                return True
+            else:
+                self.log_write(f"You accused the right person ({accused_name}) but only had {strong_evidence_count} key pieces of evidence. The case is dismissed for lack of proof. You lose {rules.unproven_penalty} Credibility.", style='error')
+                self.lose_credibility(rules.unproven_penalty)
+                return False
+        else:
+            self.log_write(f"Accusation failed. {accused_name} is innocent. Public trust plummets. You lose {rules.wrong_accusation_penalty} credibility.", style='error')
+            self.lose_credibility(rules.wrong_accusation_penalty)
+            return False
+
+    # ---------------------
+    # Generic action interface (bots, hint search)
+    # ---------------------
+    # Actions are tuples: ("move", location), ("collect", clue_id),
+    # ("interrogate", suspect), ("present", suspect), ("accuse", suspect),
+    # ("confront", (suspect, clue_id)).
+    def legal_actions(self):
+        cs = self.state
+        if self.is_over():
+            return []
+        actions = [("move", name) for name in cs['locations'] if name != cs['current_location']]
+        actions += [("collect", c.id) for c in self.current_location_obj().clues]
+        for name, s in cs['suspects'].items():
+            if not s.interrogated:
+                actions.append(("interrogate", name))
+            if cs['presented'].get(name) != "strong":
+                actions.append(("present", name))
+            actions.append(("accuse", name))
+        for name, s in cs['suspects'].items():
+            if s.interrogated:
+                actions += [("confront", (name, c.id)) for c in cs['found_clues'] if c.id not in s.confronted]
+        return actions
+
+    def step(self, action):
+        kind, arg = action
+        if kind == "examine":
+            return self.examine()
+        if kind == "move":
+            return self.move_to(arg)
+        if kind == "collect":
+            return self.collect(arg)
+        if kind == "interrogate":
+            return self.interrogate(arg)
+        if kind == "present":
+            return self.present(arg)
+        if kind == "accuse":
+            return self.accuse(arg)
+        if kind == "confront":
+            return self.confront(*arg)
+        raise ValueError(f"Unknown action: {kind}")
+
+    def run(self, actions):
+        # Applies a list of actions as one step. If any of them is illegal the
+        # state is put back and ValueError raised, with nothing logged;
+        # otherwise the log lines are passed on together at the end. Actions
+        # left over once the case is over are skipped. Returns the results of
+        # the actions that ran.
+        snap = self.snapshot()
+        log, lines = self.log_write, []
+        self.log_write = lambda text, style='info': lines.append((text, style))
+        results = []
+        try:
+            for action in actions:
+                if self.is_over():
+                    break
+                if action[0] != "examine" and action not in self.legal_actions():
+                    raise ValueError(f"Not possible at that point: {describe_action(action)}")
+                results.append(self.step(action))
+        except Exception:
+            self.restore(snap)
+            raise
+        finally:
+            self.log_write = log
+        for text, style in lines:
+            log(text, style)
+        return results
+
+def describe_action(action):
+    kind, arg = action
+    if kind == "examine":
+        return "Examine the scene"
+    if kind == "move":
+        return f"Travel to {arg}"
+    if kind == "collect":
+        return f"Collect clue {arg}"
+    if kind == "interrogate":
+        return f"Interrogate {arg}"
+    if kind == "present":
+        return f"Present evidence against {arg}"
+    if kind == "accuse":
+        return f"Accuse {arg}"
+    if kind == "confront":
+        return f"Confront {arg[0]} with clue {arg[1]}"
+    return str(action)
+
+def _match(word, names, what):
+    # Case-insensitive: an exact name, else the only name starting with `word`.
+    word = word.strip().lower()
+    if not word:
+        raise ValueError(f"Missing {what}")
+    exact = [n for n in names if n.lower() == word]
+    if exact:
+        return exact[0]
+    found = [n for n in names if n.lower().startswith(word)]
+    if len(found) != 1:
+        raise ValueError(f"{'Ambiguous' if found else 'Unknown'} {what}: {word!r}")
+    return found[0]
+
+def parse_actions(text, state):
+    # Turns typed commands into action tuples, e.g.
+    #   "move office > dive bar; examine; collect 3,5,7; present jordan; accuse jordan"
+    #   "confront jordan with 3,5"
+    # Commands are separated by ';' or newlines; "move" takes a '>' route.
+    actions = []
+    for command in text.replace("\n", ";").split(";"):
+        verb, _, rest = command.strip().partition(" ")
+        verb = verb.lower()
+        if not verb:
+            continue
+        if verb == "examine":
+            actions.append(("examine", None))
+        elif verb in ("move", "go"):
+            for stop in rest.split(">"):
+                actions.append(("move", _match(stop, state['locations'], "location")))
+        elif verb == "collect":
+            try:
+                actions += [("collect", int(cid)) for cid in rest.replace(",", " ").split()]
+            except ValueError:
+                raise ValueError(f"Clue IDs must be numbers: {rest!r}") from None
+        elif verb in ("interrogate", "present", "accuse"):
+            actions.append((verb, _match(rest, state['suspects'], "suspect")))
+        elif verb == "confront":
+            who, _, ids = rest.lower().partition(" with ")
+            name = _match(who, state['suspects'], "suspect")
+            if not ids.strip():
+                raise ValueError(f"Confront {name} with which clues? e.g. confront {who.strip()} with 3")
+            try:
+                actions += [("confront", (name, int(cid))) for cid in ids.replace(",", " ").split()]
+            except ValueError:
+                raise ValueError(f"Clue IDs must be numbers: {ids!r}") from None
+        else:
+            raise ValueError(f"Unknown command: {verb!r}")
+    return actions
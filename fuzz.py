@@ -0,0 +1,460 @@
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from casespec import CaseSpec, generate_from_spec
+from engine import GameEngine, RuleProfile, describe_action, name_tag, seeded_case
+
+# ---------------------
+# Config
+# ---------------------
+FUZZ_GAMES = 20000
+# Share of steps that undo instead of acting, and that examine (free)
+UNDO_RATE = 0.05
+EXAMINE_RATE = 0.02
+# Fuzzing runs the full state checks (the clue and counter scans) and
+# fingerprints an undo snapshot on every this many actions; the cheap checks
+# run on all of them. A failure is replayed checking every action, so the
+# trace still stops where the invariant first broke.
+FULL_CHECK_EVERY = 8
+# Rule values games are played under: the defaults half the time, otherwise
+# every field drawn from its range, so that odd combinations (free actions,
+# one-turn games, penalties bigger than the pool) get exercised
+RULE_RANGES = {
+    "start_credibility": (1, 15),
+    "max_turns": (1, 60),
+    "action_cost": (0, 3),
+    "proof_clues": (0, 4),
+    "present_bonus": (0, 6),
+    "present_penalty": (0, 6),
+    "win_bonus": (0, 6),
+    "unproven_penalty": (0, 6),
+    "wrong_accusation_penalty": (0, 8),
+}
+
+# Cases are dealt in turn by seeded_case and from these specs, the kind
+# following from the seed so that a trace replays on the same case
+CASE_SPECS = {
+    "spec": CaseSpec(locations=5, suspects=6, culprit_clues=5, filler_clues=12, max_herrings_per_suspect=2),
+    "lazy": CaseSpec(locations=5, suspects=6, culprit_clues=5, filler_clues=12, max_herrings_per_suspect=2,
+                     lazy=True),
+}
+CASE_KINDS = ("seeded",) + tuple(CASE_SPECS)
+
+def case_kind(seed):
+    return CASE_KINDS[seed % len(CASE_KINDS)]
+
+def deal_case(seed):
+    kind = case_kind(seed)
+    if kind == "seeded":
+        return seeded_case(seed)
+    return generate_from_spec(CASE_SPECS[kind], random.Random(seed))
+
+def draw_rules(rng):
+    if rng.random() < 0.5:
+        return RuleProfile()
+    return RuleProfile(**{f: rng.randint(lo, hi) for f, (lo, hi) in RULE_RANGES.items()})
+
+# ---------------------
+# Invariants
+# ---------------------
+def fingerprint(state):
+    # Everything the rules read from a state; clues compare by identity, as
+    # the engine never changes a Clue once it is in a state
+    return (
+        state['credibility'], state['turns'], state['current_location'], state['outcome'],
+        [tuple(loc.clues) for loc in state['locations'].values()],
+        tuple(state['found_clues']),
+        [(s.interrogated, frozenset(s.presented_clues), frozenset(s.tags), frozenset(s.confronted),
+          frozenset(s.contradictions)) for s in state['suspects'].values()],
+        tuple(state['presented'].items()), tuple(state['accusations'].items()),
+        tuple(state['tag_counts'].items()), tuple(state['link_counts'].items()),
+    )
+
+def check_bounds(engine):
+    # The checks on single values, cheap enough for every action
+    cs = engine.state
+    rules = engine.rules
+    if cs['credibility'] > rules.start_credibility:
+        return "credibility above the cap"
+    if not 0 <= cs['turns'] <= rules.max_turns:
+        return "turns out of bounds"
+    if cs['outcome'] not in (None, "won"):
+        return "unknown outcome"
+    if cs['outcome'] == "won" and cs['tag_counts'].get(cs['linking_tag'], 0) < rules.proof_clues:
+        return "won without proof"
+    return None
+
+def check_state(engine, clue_ids, before=None):
+    # The invariants any single state must hold; returns the first broken
+    # one as a message, or None. `clue_ids` is every clue id of the case.
+    # Given a state `before` that was checked, checks that only read
+    # containers left in place since are skipped: those still hold what was
+    # checked then (the snapshot fingerprints prove it).
+    broken = check_bounds(engine)
+    if broken is not None:
+        return broken
+    cs = engine.state
+
+    def changed(*keys):
+        return before is None or any(cs[k] is not before[k] for k in keys)
+
+    found = cs['found_clues']
+    if changed("locations", "found_clues"):
+        # Every clue is either lying somewhere or found, exactly once
+        seen = set()
+        count = len(found)
+        for loc in cs['locations'].values():
+            for c in loc.clues:
+                if c.found:
+                    return "found flag disagrees with where a clue is"
+                seen.add(c.id)
+            count += len(loc.clues)
+        for c in found:
+            if not c.found:
+                return "found flag disagrees with where a clue is"
+            seen.add(c.id)
+        if count != len(clue_ids) or seen != clue_ids:
+            return "clues were lost, duplicated or invented"
+
+    if changed("found_clues", "tag_counts", "link_counts", "suspects"):
+        # The evidence counters match a recount of the found clues
+        tag_counts = {}
+        link_counts = {}
+        linked = {}
+        found_by_id = {}
+        key = cs['answer_key']
+        by_clue = key.suspects_by_clue
+        for c in found:
+            found_by_id[c.id] = c
+            for t in c.tags:
+                tag_counts[t] = tag_counts.get(t, 0) + 1
+            for name in by_clue.get(c.id, ()):
+                link_counts[name] = link_counts.get(name, 0) + 1
+                linked.setdefault(name, set()).add(c.id)
+        if tag_counts != cs['tag_counts'] or link_counts != cs['link_counts']:
+            return "evidence counters out of step with the found clues"
+        # The counter-based scores give what the scans over found_clues they
+        # replaced gave
+        linking_tag = cs['linking_tag']
+        if engine.proof_count() != sum(1 for c in found if linking_tag in c.tags):
+            return "accusation proof differs from a scan of the found clues"
+        for s in cs['suspects'].values():
+            score, caught = engine.presentation_score(s)
+            if score - caught != sum(1 for c in found if c.id not in s.presented_clues and s.tags & c.tags):
+                return "presentation score differs from a scan of the found clues"
+        for name, s in cs['suspects'].items():
+            if s.presented_clues and not s.presented_clues <= linked.get(name, set()):
+                return "presented clues that are not found clues linking to the suspect"
+            if s.confronted and not s.confronted <= {c.id for c in found}:
+                return "confronted with a clue that was not found"
+            # Only a clue carrying the suspect's own name places them
+            tag = name_tag(name)
+            caught = {cid for cid in s.confronted & linked.get(name, set())
+                      if tag in found_by_id[cid].tags and key.location_by_clue.get(cid, s.alibi) != s.alibi}
+            if s.contradictions != caught:
+                return "contradictions out of step with the confronted clues"
+    return None
+
+def check_step(engine, before, lines, action):
+    # Invariants that relate a state to the one before it.
+    cs = engine.state
+    step = cs['turns'] - before['turns']
+    if action[0] == "examine":
+        if step or cs['credibility'] != before['credibility']:
+            return "examine is not free"
+        return None
+    if step != 1:
+        return "an action did not take exactly one turn"
+    announced = any("GAME OVER" in text for text in lines)
+    over = engine.is_over()
+    if announced and not over:
+        return "game over was announced but the case goes on"
+    if over and cs['outcome'] is None and not announced:
+        return "the case ended without a game-over message"
+    return None
+
+# ---------------------
+# Games
+# ---------------------
+class Trace:
+    # A replayable fuzz case: the seed its case is dealt from, the rules and
+    # the actions, with ("undo", None) for a step back.
+    def __init__(self, seed, rules, actions, violation=None):
+        self.seed = seed
+        self.rules = rules
+        self.actions = actions
+        self.violation = violation
+
+    def as_dict(self):
+        return {"seed": self.seed, "rules": self.rules.as_dict(),
+                "actions": [list(a) for a in self.actions], "violation": self.violation}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["seed"], RuleProfile(**data["rules"]),
+                   [(a[0], tuple(a[1])) if isinstance(a[1], list) else tuple(a) for a in data["actions"]],
+                   data.get("violation"))
+
+    def describe(self):
+        return [describe_action(a) if a[0] != "undo" else "undo" for a in self.actions]
+
+class FuzzRun:
+    # One case played action by action with the invariants checked after
+    # each, in full on every `check_every`-th; an undo snapshot is kept per
+    # action, those taken on a full check with a fingerprint to prove later
+    # actions left them alone.
+    def __init__(self, seed, rules, check_every=1):
+        self.lines = []
+        self.engine = GameEngine(deal_case(seed), log=lambda text, style='info': self.lines.append(text),
+                                 rng=random.Random(seed), rules=rules)
+        self.clue_ids = {c.id for loc in self.engine.state['locations'].values() for c in loc.clues}
+        self.history = []
+        self.check_every = check_every
+        self.steps = 0
+        self.violation = check_state(self.engine, self.clue_ids)
+        # The state as of the last full check
+        self.checked = self.engine.snapshot()
+
+    def can(self, action):
+        if action[0] == "undo":
+            return bool(self.history)
+        return action[0] == "examine" or action in self.engine.legal_actions()
+
+    def apply(self, action):
+        # Runs a possible action; returns the violation it caused, if any.
+        engine = self.engine
+        if action[0] == "undo":
+            snap, print_ = self.history.pop()
+            if print_ is not None and fingerprint(snap) != print_:
+                self.violation = "an action changed an earlier snapshot"
+                return self.violation
+            engine.restore(snap)
+            return None
+        self.steps += 1
+        full = self.steps % self.check_every == 0
+        snap = engine.snapshot()
+        self.history.append((snap, fingerprint(snap) if full else None))
+        del self.lines[:]
+        engine.step(action)
+        self.violation = check_step(engine, snap, self.lines, action)
+        if self.violation is None:
+            self.violation = self.check() if full else check_bounds(engine)
+        return self.violation
+
+    def check(self):
+        violation = check_state(self.engine, self.clue_ids, self.checked)
+        self.checked = self.engine.snapshot()
+        return violation
+
+    def finish(self):
+        # The last state and the snapshots never undone must be intact too
+        if self.violation is None:
+            self.violation = self.check()
+        if self.violation is None and any(p is not None and fingerprint(s) != p for s, p in self.history):
+            self.violation = "an action changed an earlier snapshot"
+        return self.violation
+
+def run_trace(trace, log=None):
+    # Replays a trace, skipping actions that are not possible at their point
+    # (the shrinker leaves those behind). Returns (actions run, violation or
+    # None); stops at the first violation.
+    run = FuzzRun(trace.seed, trace.rules)
+    ran = []
+    for action in trace.actions:
+        if run.violation is not None:
+            break
+        if not run.can(action):
+            continue
+        run.apply(action)
+        ran.append(action)
+        if log is not None:
+            log(action, run.lines if action[0] != "undo" else [])
+    return ran, run.finish()
+
+def fuzz_game(seed, max_actions=None):
+    # Plays random actions (and undos) on one case under random rules;
+    # returns (actions played, failing Trace or None).
+    rng = random.Random(seed)
+    rules = draw_rules(rng)
+    run = FuzzRun(seed, rules, FULL_CHECK_EVERY)
+    max_actions = max_actions or 2 * rules.max_turns + 10
+    actions = []
+    while run.violation is None and len(actions) < max_actions:
+        legal = run.engine.legal_actions()
+        r = rng.random()
+        if run.history and (r < UNDO_RATE or not legal):
+            action = ("undo", None)
+        elif not legal:
+            break
+        elif r < UNDO_RATE + EXAMINE_RATE:
+            action = ("examine", None)
+        else:
+            action = rng.choice(legal)
+        actions.append(action)
+        run.apply(action)
+    violation = run.finish()
+    if violation is None:
+        return len(actions), None
+    # Checking every action finds the first one that broke something
+    ran, first = run_trace(Trace(seed, rules, actions))
+    if first is None:
+        return len(actions), Trace(seed, rules, actions, violation)
+    return len(actions), Trace(seed, rules, ran, first)
+
+# ---------------------
+# Regressions
+# ---------------------
+# Traces of bugs since fixed, replayed before every fuzz run; each must play
+# through without a violation.
+REGRESSIONS = [
+    # A filler clue sharing only an innocent's motive, found away from their
+    # alibi, once counted as a contradiction
+    Trace(0, RuleProfile(), [("interrogate", "Avery Collins"), ("move", "Office Tower"), ("collect", 4),
+                             ("confront", ("Avery Collins", 4))]),
+]
+
+def check_regressions():
+    # Returns [(trace, violation)] for the regressions that broke again;
+    # an action the trace can no longer take counts as broken too.
+    broken = []
+    for trace in REGRESSIONS:
+        ran, violation = run_trace(trace)
+        if violation is None and len(ran) != len(trace.actions):
+            violation = "the regression trace no longer replays"
+        if violation is not None:
+            broken.append((trace, violation))
+    return broken
+
+# ---------------------
+# Shrinking
+# ---------------------
+def shrink(trace):
+    # Delta debugging: drops ever smaller runs of actions while the same
+    # invariant still breaks, then keeps only the actions that actually ran,
+    # so the result replays as it stands.
+    def fails(actions):
+        ran, violation = run_trace(Trace(trace.seed, trace.rules, actions))
+        return ran if violation == trace.violation else None
+
+    actions = fails(trace.actions)
+    if actions is None:
+        raise ValueError("The trace does not reproduce its violation")
+    size = max(1, len(actions) // 2)
+    while size >= 1:
+        i = 0
+        shrunk = False
+        while i < len(actions):
+            candidate = fails(actions[:i] + actions[i + size:])
+            if candidate is not None and len(candidate) < len(actions):
+                actions = candidate
+                shrunk = True
+            else:
+                i += size
+        if not shrunk:
+            size //= 2
+
+    # Then bring every rule as close to the default as still fails
+    rules = trace.rules
+    for field, default in RuleProfile().as_dict().items():
+        value = getattr(rules, field)
+        while value != default:
+            step = value + (1 if default > value else -1)
+            candidate = Trace(trace.seed, rules.replace(**{field: step}), actions)
+            ran, violation = run_trace(candidate)
+            if violation != trace.violation:
+                break
+            rules, actions, value = candidate.rules, ran, step
+    return Trace(trace.seed, rules, actions, trace.violation)
+
+# ---------------------
+# Workers
+# ---------------------
+def fuzz_range(start, stop):
+    # Returns (games, actions, {violation: shortest failing trace dict}).
+    played = 0
+    failures = {}
+    for seed in range(start, stop):
+        n, trace = fuzz_game(seed)
+        played += n
+        if trace is not None:
+            best = failures.get(trace.violation)
+            if best is None or len(trace.actions) < len(best["actions"]):
+                failures[trace.violation] = trace.as_dict()
+    return stop - start, played, failures
+
+def fuzz(seeds, workers=None, chunk=1000):
+    # Fuzzes one game per seed across worker processes; returns (games,
+    # actions, {violation: shrunk Trace}).
+    starts = range(seeds.start, seeds.stop, chunk)
+    stops = [min(a + chunk, seeds.stop) for a in starts]
+    games = actions = 0
+    failures = {}
+    with ProcessPoolExecutor(workers) as pool:
+        for g, a, found in pool.map(fuzz_range, starts, stops):
+            games += g
+            actions += a
+            for violation, trace in found.items():
+                best = failures.get(violation)
+                if best is None or len(trace["actions"]) < len(best["actions"]):
+                    failures[violation] = trace
+    return games, actions, {v: shrink(Trace.from_dict(t)) for v, t in failures.items()}
+
+# ---------------------
+# Command line
+# ---------------------
+def print_trace(trace):
+    print(f"  seed {trace.seed} ({case_kind(trace.seed)} case), rules {trace.rules}")
+    for i, text in enumerate(trace.describe(), 1):
+        print(f"  {i:3d}. {text}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzz the game rules with random actions and check invariants.")
+    parser.add_argument("--games", type=int, default=FUZZ_GAMES)
+    parser.add_argument("--seed", type=int, default=0, help="first seed; games use consecutive seeds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--out", help="write the shrunk failing traces here (JSON)")
+    parser.add_argument("--replay", help="replay a trace file written by --out and show its log")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        with open(args.replay, encoding="utf-8") as f:
+            traces = [Trace.from_dict(d) for d in json.load(f)]
+        for trace in traces:
+            print(f"{trace.violation}:")
+            print_trace(trace)
+
+            def show(action, lines):
+                print(f"  > {describe_action(action) if action[0] != 'undo' else 'undo'}")
+                for text in lines:
+                    print(f"      {text}")
+            _, violation = run_trace(trace, show)
+            print(f"  replayed: {violation or 'no violation'}\n")
+        return
+
+    broken = check_regressions()
+    for trace, violation in broken:
+        print(f"regression broke again, {violation}:")
+        print_trace(trace)
+    if broken:
+        raise SystemExit(1)
+
+    started = time.perf_counter()
+    games, actions, failures = fuzz(range(args.seed, args.seed + args.games), args.workers, args.chunk)
+    elapsed = time.perf_counter() - started
+    print(f"{games} games, {actions} actions in {elapsed:.1f}s ({actions / elapsed:,.0f} actions/s)")
+    for violation, trace in failures.items():
+        print(f"\n{violation} ({len(trace.actions)} actions):")
+        print_trace(trace)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump([t.as_dict() for t in failures.values()], f, indent=1)
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import DEFAULT_RULES, GameEngine, name_tag
+from tracker import posterior
+
+# ---------------------
+# Config
+# ---------------------
+HINT_BUDGET_MS = 50
+ROLLOUT_DEPTH = 30
+UCT_C = 1.4
+# Workers stop searching a little early so their results arrive within the budget
+WORKER_BUDGET_SHARE = 0.7
+# Tree size before it is thrown away, and how many cases' trees a process keeps
+MAX_TREE_NODES = 200_000
+MAX_CASE_TREES = 4
+
+# ---------------------
+# Information-set MCTS
+# ---------------------
+# Nodes are keyed by what the player can observe, never by the hidden culprit,
+# so the same tree serves every determinization. Each process keeps its trees
+# between searches: after the player moves, the new position is usually
+# already a node and its statistics carry over. HintEngine sends every
+# request to each of its worker processes, so every one of them sees each
+# move of a case. Observed keys from another case (or other rules) can look
+# the same, so there is one tree per case and rules, the least recently
+# searched dropped past MAX_CASE_TREES.
+_trees = {}
+
+def case_key(state, rules):
+    # What stays fixed for the whole of a case, hidden answer aside
+    return (
+        state.get('seed'),
+        tuple((name, s.motive, s.alibi) for name, s in state['suspects'].items()),
+        tuple(state['locations']),
+        tuple(rules.as_dict().values()),
+    )
+
+def observed_key(state):
+    suspects = tuple(
+        (name, s.interrogated, state['presented'].get(name), frozenset(s.presented_clues), frozenset(s.confronted))
+        for name, s in state['suspects'].items()
+    )
+    return (
+        state['current_location'], state['credibility'], state['turns'], state['outcome'],
+        frozenset(c.id for c in state['found_clues']),
+        suspects,
+        frozenset(state['accusations'].items()),
+    )
+
+def culprit_weights(state):
+    # Plausibility of each suspect from public information only.
+    return {name: p for name, p in posterior(state).items() if p > 0}
+
+def determinize(state, weights, rng):
+    # A shallow copy is enough: the engine that plays on it copies on write
+    world = dict(state)
+    names = list(weights)
+    culprit = rng.choices(names, weights=[weights[n] for n in names])[0]
+    world['culprit'] = culprit
+    world['linking_tag'] = name_tag(culprit)
+    return world
+
+def reward(state, rules=DEFAULT_RULES):
+    if state['outcome'] == "won":
+        return 0.5 + 0.5 * state['credibility'] / max(1, rules.start_credibility)
+    return 0.0
+
+def rollout_action(engine, actions, rng, epsilon=0.2):
+    # Cheap playout policy that only looks at observable state.
+    if epsilon and rng.random() < epsilon:
+        return rng.choice(actions)
+    cs = engine.state
+    best, best_links = None, 1
+    for name in cs['suspects']:
+        if name in cs['accusations']:
+            continue
+        links = cs['tag_counts'].get(name_tag(name), 0)
+        if links > best_links:
+            best, best_links = name, links
+    if best is not None:
+        return ("accuse", best)
+    collect = [a for a in actions if a[0] == "collect"]
+    if collect:
+        return rng.choice(collect)
+    moves = [a for a in actions if a[0] == "move" and cs['locations'][a[1]].clue_count()]
+    if moves:
+        return rng.choice(moves)
+    return rng.choice(actions)
+
+def search(state, budget, rng=None, rules=DEFAULT_RULES):
+    # Runs MCTS from `state` for `budget` seconds; returns {action: (visits, total_reward)}.
+    rng = rng or random.Random()
+    deadline = time.perf_counter() + budget
+    case = case_key(state, rules)
+    tree = _trees.pop(case, None)
+    if tree is None or len(tree) > MAX_TREE_NODES:
+        tree = {}
+    _trees[case] = tree
+    while len(_trees) > MAX_CASE_TREES:
+        del _trees[next(iter(_trees))]
+
+    root_key = observed_key(state)
+    weights = culprit_weights(state)
+    if not weights or GameEngine.from_state(state, rules=rules).is_over():
+        return {}
+
+    while time.perf_counter() < deadline:
+        engine = GameEngine.from_state(determinize(state, weights, rng), rng=rng, rules=rules)
+        path = []
+
+        # Selection and expansion
+        while not engine.is_over():
+            key = observed_key(engine.state)
+            node = tree.get(key)
+            actions = engine.legal_actions()
+            if node is None:
+                node = tree[key] = {}
+            untried = [a for a in actions if a not in node]
+            if untried:
+                action = rng.choice(untried)
+                node[action] = [0, 0.0]
+                path.append(node[action])
+                engine.step(action)
+                break
+            total = sum(node[a][0] for a in actions)
+            log_total = math.log(total + 1)
+            action = max(actions, key=lambda a: node[a][1] / node[a][0] + UCT_C * math.sqrt(log_total / node[a][0]))
+            path.append(node[action])
+            engine.step(action)
+
+        # Playout
+        depth = 0
+        while not engine.is_over() and depth < ROLLOUT_DEPTH:
+            engine.step(rollout_action(engine, engine.legal_actions(), rng))
+            depth += 1
+
+        value = reward(engine.state, rules)
+        for stats in path:
+            stats[0] += 1
+            stats[1] += value
+
+    return {a: (s[0], s[1]) for a, s in tree.get(root_key, {}).items()}
+
+def _warm_up():
+    return os.getpid()
+
+def _worker_search(state, budget, seed, rules):
+    return search(state, budget, random.Random(seed), rules)
+
+def merge_stats(results):
+    merged = {}
+    for stats in results:
+        for action, (visits, total) in stats.items():
+            v, t = merged.get(action, (0, 0.0))
+            merged[action] = (v + visits, t + total)
+    return merged
+
+def best_action(stats):
+    if not stats:
+        return None
+    return max(stats, key=lambda a: (stats[a][0], stats[a][1]))
+
+def quick_hint(state, rng=None, rules=DEFAULT_RULES):
+    # Fallback when no search finished in time.
+    engine = GameEngine.from_state(state, rules=rules)
+    actions = engine.legal_actions()
+    if not actions:
+        return None
+    return rollout_action(engine, actions, rng or random.Random(0), epsilon=0)
+
+# ---------------------
+# Hint service
+# ---------------------
+class HintRequest:
+    def __init__(self, state, futures, deadline, rules=DEFAULT_RULES):
+        self.state = state
+        self.futures = futures
+        self.deadline = deadline
+        self.rules = rules
+        self.done = False
+        self.result = None
+
+class HintEngine:
+    # Recommends the next move within a fixed budget. Searches run in worker
+    # processes so the Tk event loop only ever polls for the answer. Each
+    # worker is a pool of one, so a request puts one search on every worker
+    # rather than wherever a shared pool happens to run it.
+    def __init__(self, budget_ms=HINT_BUDGET_MS, workers=None):
+        self.budget = budget_ms / 1000.0
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+        self.workers = workers
+        self._pools = []
+        self._rng = random.Random()
+        for _ in range(workers):
+            # Start the processes now so the first hint is not paying for spawn
+            pool = ProcessPoolExecutor(max_workers=1)
+            pool.submit(_warm_up)
+            self._pools.append(pool)
+
+    def request(self, snapshot, rules=DEFAULT_RULES):
+        # `snapshot` must come from GameEngine.snapshot() so the player can keep
+        # acting while the workers search; `rules` are the engine's.
+        snapshot = dict(snapshot)
+        # The search must not peek at the answer
+        snapshot['culprit'] = snapshot['linking_tag'] = None
+        snapshot['answer_key'] = snapshot['answer_key'].hidden()
+        deadline = time.perf_counter() + self.budget
+        worker_budget = self.budget * WORKER_BUDGET_SHARE
+        if not self._pools:
+            req = HintRequest(snapshot, [], deadline, rules)
+            req.result = (best_action(search(snapshot, worker_budget, self._rng, rules))
+                          or quick_hint(snapshot, rules=rules))
+            req.done = True
+            return req
+        futures = [
+            pool.submit(_worker_search, snapshot, worker_budget, self._rng.getrandbits(32), rules)
+            for pool in self._pools
+        ]
+        return HintRequest(snapshot, futures, deadline, rules)
+
+    def poll(self, req):
+        # Sets req.done once the workers finished or the budget ran out;
+        # the recommendation (None if the case is over) is then in req.result.
+        if req.done:
+            return req.result
+        if not all(f.done() for f in req.futures) and time.perf_counter() < req.deadline:
+            return None
+        finished = [f.result() for f in req.futures if f.done() and not f.cancelled() and f.exception() is None]
+        for f in req.futures:
+            f.cancel()
+        req.result = best_action(merge_stats(finished)) or quick_hint(req.state, rules=req.rules)
+        req.done = True
+        return req.result
+
+    def recommend(self, snapshot, rules=DEFAULT_RULES):
+        # Blocking variant for bots and scripts.
+        req = self.request(snapshot, rules)
+        while not req.done:
+            self.poll(req)
+            if not req.done:
+                time.sleep(0.001)
+        return req.result
+
+    def shutdown(self):
+        for pool in self._pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools = []
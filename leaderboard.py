@@ -0,0 +1,338 @@
+import argparse
+import bisect
+import datetime
+import os
+import random
+import tempfile
+import threading
+import time
+
+# ---------------------
+# Config
+# ---------------------
+LEADERBOARD_PATH = os.path.join(os.path.expanduser("~"), ".deductionist_leaderboard.tsv")
+JOURNAL_HEADER = "deductionist-leaderboard 1\n"
+# Keys per chunk of a RankedList before it splits
+CHUNK_LOAD = 512
+
+def daily_seed(day=None):
+    # Everyone playing on the same date gets the same case, e.g. 20261019.
+    day = day or datetime.date.today()
+    return day.year * 10000 + day.month * 100 + day.day
+
+# ---------------------
+# Order statistics
+# ---------------------
+class RankedList:
+    # Sorted set of distinct keys with rank and select in O(log n): a
+    # two-level B+ tree (sorted chunks of at most 2 * CHUNK_LOAD keys plus
+    # their maxima) and a Fenwick tree over the chunk sizes for positions.
+    def __init__(self):
+        self._chunks = []
+        self._maxes = []
+        self._tree = []
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def _rebuild(self):
+        # Fenwick tree (1-based) over len(chunk)
+        tree = [0] + [len(c) for c in self._chunks]
+        for i in range(1, len(tree)):
+            j = i + (i & -i)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _bump(self, i, delta):
+        tree = self._tree
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _before(self, i):
+        # Keys in chunks [0, i)
+        tree = self._tree
+        total = 0
+        while i:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def add(self, key):
+        self._len += 1
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._rebuild()
+            return
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._chunks[i].append(key)
+            self._maxes[i] = key
+        else:
+            bisect.insort(self._chunks[i], key)
+        chunk = self._chunks[i]
+        if len(chunk) > 2 * CHUNK_LOAD:
+            self._chunks[i:i + 1] = [chunk[:CHUNK_LOAD], chunk[CHUNK_LOAD:]]
+            self._maxes[i:i + 1] = [chunk[CHUNK_LOAD - 1], chunk[-1]]
+            self._rebuild()
+        else:
+            self._bump(i, 1)
+
+    def remove(self, key):
+        i = bisect.bisect_left(self._maxes, key)
+        chunk = self._chunks[i] if i < len(self._chunks) else None
+        j = bisect.bisect_left(chunk, key) if chunk else 0
+        if chunk is None or j == len(chunk) or chunk[j] != key:
+            raise KeyError(key)
+        del chunk[j]
+        self._len -= 1
+        if not chunk:
+            del self._chunks[i], self._maxes[i]
+            self._rebuild()
+            return
+        self._maxes[i] = chunk[-1]
+        self._bump(i, -1)
+
+    def rank(self, key):
+        # Keys smaller than `key`
+        i = bisect.bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._before(i) + bisect.bisect_left(self._chunks[i], key)
+
+    def _locate(self, index):
+        # (chunk, offset) of the key at position `index`, by Fenwick descent
+        tree = self._tree
+        pos = 0
+        step = 1 << (len(tree).bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                pos = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return pos, index
+
+    def select(self, index):
+        if not 0 <= index < self._len:
+            raise IndexError(index)
+        i, j = self._locate(index)
+        return self._chunks[i][j]
+
+    def islice(self, start, stop):
+        # Keys at positions [start, stop), in order
+        start, stop = max(0, start), min(stop, self._len)
+        if start >= stop:
+            return
+        i, j = self._locate(start)
+        left = stop - start
+        while left:
+            part = self._chunks[i][j:j + left]
+            yield from part
+            left -= len(part)
+            i, j = i + 1, 0
+
+# ---------------------
+# Leaderboard
+# ---------------------
+# Scores order by win first, then more credibility left, then fewer turns,
+# then who got there first; packed into one int so keys compare cheaply.
+CRED_OFFSET = 1 << 15
+FIELD_SPAN = 1 << 16
+SEQ_SPAN = 1 << 32
+
+def score_key(won, credibility, turns, seq):
+    cred = min(max(credibility, -CRED_OFFSET), CRED_OFFSET - 1)
+    turns = min(max(turns, 0), FIELD_SPAN - 1)
+    return (((0 if won else 1) * FIELD_SPAN + (CRED_OFFSET - 1 - cred)) * FIELD_SPAN + turns) * SEQ_SPAN + seq
+
+def key_score(key):
+    # (won, credibility, turns) back out of a score_key
+    rest, seq = divmod(key, SEQ_SPAN)
+    rest, turns = divmod(rest, FIELD_SPAN)
+    lost, cred = divmod(rest, FIELD_SPAN)
+    return lost == 0, CRED_OFFSET - 1 - cred, turns
+
+class SeedBoard:
+    # One seed's standings; each player keeps their best score.
+    __slots__ = ("keys", "best", "names")
+
+    def __init__(self):
+        self.keys = RankedList()
+        self.best = {}
+        # Submission number (the low bits of a key) -> player
+        self.names = []
+
+    def submit(self, player, won, credibility, turns):
+        key = score_key(won, credibility, turns, len(self.names))
+        self.names.append(player)
+        old = self.best.get(player)
+        if old is not None:
+            if old <= key:
+                return False
+            self.keys.remove(old)
+        self.best[player] = key
+        self.keys.add(key)
+        return True
+
+    def entry(self, rank, key):
+        return (rank, self.names[key % SEQ_SPAN]) + key_score(key)
+
+class Leaderboard:
+    # Per-seed standings kept in memory and persisted as an append-only
+    # journal of submissions (one tab-separated line each), replayed on
+    # open. rank_of and top(k) are O(log n) (+ k) per query.
+    def __init__(self, path=LEADERBOARD_PATH):
+        self.path = path
+        self.boards = {}
+        # Complete journal lines that could not be read, skipped on replay
+        self.skipped = 0
+        self._replay()
+        self._journal = open(path, "a", encoding="utf-8", newline="\n")
+        if self._journal.tell() == 0:
+            self._journal.write(JOURNAL_HEADER)
+            self._journal.flush()
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r+", encoding="utf-8", newline="\n") as f:
+            header = f.readline()
+            if header and header != JOURNAL_HEADER:
+                raise ValueError(f"{self.path} is not a leaderboard journal")
+            good = f.tell()
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                good += len(line.encode("utf-8"))
+                try:
+                    seed, player, won, credibility, turns = line[:-1].split("\t")
+                    seed, credibility, turns = int(seed), int(credibility), int(turns)
+                except ValueError:
+                    # A garbled line costs only itself
+                    self.skipped += 1
+                    continue
+                self._board(seed).submit(player, won == "1", credibility, turns)
+            # A last line cut short by a crash is dropped so appends start clean
+            f.truncate(good)
+
+    def _board(self, seed):
+        board = self.boards.get(seed)
+        if board is None:
+            board = self.boards[seed] = SeedBoard()
+        return board
+
+    def submit(self, seed, player, won, credibility, turns):
+        # Records a finished game; returns the player's (1-based) rank.
+        if not player or any(ch in player for ch in "\t\r\n"):
+            raise ValueError(f"Invalid player name: {player!r}")
+        self._journal.write(f"{seed}\t{player}\t{int(bool(won))}\t{credibility}\t{turns}\n")
+        self._journal.flush()
+        self._board(seed).submit(player, won, credibility, turns)
+        return self.rank_of(seed, player)
+
+    def rank_of(self, seed, player):
+        board = self.boards.get(seed)
+        key = board.best.get(player) if board else None
+        return None if key is None else board.keys.rank(key) + 1
+
+    def players(self, seed):
+        board = self.boards.get(seed)
+        return len(board.keys) if board else 0
+
+    def top(self, seed, k=10, start=0):
+        # [(rank, player, won, credibility, turns)] from rank start + 1 on
+        board = self.boards.get(seed)
+        if board is None:
+            return []
+        return [board.entry(start + i + 1, key) for i, key in enumerate(board.keys.islice(start, start + k))]
+
+    def close(self):
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal.close()
+
+class LeaderboardLoader:
+    # Opens a Leaderboard on a daemon thread, since replaying a long journal
+    # takes seconds. Once `done`, either `board` or `error` is set; nothing
+    # else touches the board until then.
+    def __init__(self, path=LEADERBOARD_PATH):
+        self.path = path
+        self.board = None
+        self.error = None
+        self._done = threading.Event()
+        threading.Thread(target=self._run, name="leaderboard", daemon=True).start()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _run(self):
+        try:
+            self.board = Leaderboard(self.path)
+        except (OSError, ValueError) as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+# ---------------------
+# Benchmark
+# ---------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time leaderboard submissions and queries on one seed.")
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    day = daily_seed()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "board.tsv")
+        board = Leaderboard(path)
+        started = time.perf_counter()
+        for i in range(args.entries):
+            won = rng.random() < 0.4
+            board.submit(day, f"player{i}", won, rng.randint(1, 10) if won else rng.randint(-5, 0), rng.randint(4, 50))
+        submit_s = time.perf_counter() - started
+        board.close()
+        size = os.path.getsize(path)
+
+        started = time.perf_counter()
+        board = Leaderboard(path)
+        replay_s = time.perf_counter() - started
+
+        names = [f"player{rng.randrange(args.entries)}" for _ in range(args.queries)]
+        started = time.perf_counter()
+        for name in names:
+            board.rank_of(day, name)
+        rank_s = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(args.queries):
+            board.top(day, 10, rng.randrange(args.entries))
+        top_s = time.perf_counter() - started
+
+        # Baseline: ranking by sorting all scores, as a plain table would
+        keys = list(board.boards[day].best.values())
+        started = time.perf_counter()
+        ordered = sorted(keys)
+        sort_s = time.perf_counter() - started
+        board.close()
+
+    print(f"{args.entries} entries on one seed, journal {size / 2**20:.1f} MiB")
+    print(f"  submit:  {args.entries / submit_s:,.0f}/s (journal write included)")
+    print(f"  replay:  {replay_s:.2f}s")
+    print(f"  rank_of: {rank_s / args.queries * 1e6:.1f} us/query")
+    print(f"  top 10:  {top_s / args.queries * 1e6:.1f} us/query (any offset)")
+    print(f"  one full sort instead: {sort_s * 1e3:.0f} ms ({len(ordered)} keys)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import bisect
+import re
+
+# ---------------------
+# Config
+# ---------------------
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+# Entries the log keeps (well past the 100k it must stay searchable at);
+# past that the oldest are dropped, LOG_TRIM_ENTRIES more than needed so the
+# trim is not redone on every write
+MAX_LOG_ENTRIES = 250000
+LOG_TRIM_ENTRIES = 25000
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+# ---------------------
+# Index
+# ---------------------
+class LogIndex:
+    # Inverted index over the Investigative Log, kept up to date one entry at
+    # a time. Entries are numbered in the order they were written, so every
+    # posting list is already sorted and adding an entry only appends.
+    #
+    # Entries are stored as displayed (already wrapped), given that log_write
+    # separates entries with a blank line. Dropping the oldest entries does
+    # not renumber the rest: `base` entries and `line_base` lines are gone
+    # from the front, and texts, styles and first_line (each entry's line
+    # counted from the very first) hold the entries from `base` on.
+    def __init__(self):
+        self.texts = []
+        self.styles = []
+        self.first_line = []
+        self.postings = {}
+        self.by_style = {}
+        # Sorted vocabulary, for prefix matches on the word being typed
+        self.vocab = []
+        self.base = 0
+        self.line_base = 0
+        self._next_line = 1
+
+    def __len__(self):
+        return len(self.texts)
+
+    def text(self, entry):
+        return self.texts[entry - self.base]
+
+    def line(self, entry):
+        # The Text widget line the entry starts on
+        return self.first_line[entry - self.base] - self.line_base
+
+    def add(self, text, style='info'):
+        entry = self.base + len(self.texts)
+        self.texts.append(text)
+        self.styles.append(style)
+        self.first_line.append(self._next_line)
+        self._next_line += text.count("\n") + 2
+        for token in set(tokenize(text)):
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = []
+                bisect.insort(self.vocab, token)
+            postings.append(entry)
+        self.by_style.setdefault(style, []).append(entry)
+        return entry
+
+    def overflow(self):
+        # How many of the oldest entries to drop to get back under the cap (0 while under it)
+        if len(self.texts) <= MAX_LOG_ENTRIES:
+            return 0
+        return len(self.texts) - MAX_LOG_ENTRIES + LOG_TRIM_ENTRIES
+
+    def drop_oldest(self, n):
+        # Forgets the oldest n entries, at a cost in what is dropped rather
+        # than what is kept. Returns how many widget lines they took up.
+        n = min(n, len(self.texts))
+        if not n:
+            return 0
+        texts, styles = self.texts[:n], self.styles[:n]
+        line_base = self.first_line[n] - 1 if n < len(self.texts) else self._next_line - 1
+        del self.texts[:n], self.styles[:n], self.first_line[:n]
+        self.base += n
+        # Posting lists are sorted, so the dropped entries are a prefix of each
+        gone = False
+        for token in set(t for text in texts for t in tokenize(text)):
+            postings = self.postings[token]
+            del postings[:bisect.bisect_left(postings, self.base)]
+            if not postings:
+                del self.postings[token]
+                gone = True
+        if gone:
+            self.vocab = [w for w in self.vocab if w in self.postings]
+        for style in set(styles):
+            entries = self.by_style[style]
+            del entries[:bisect.bisect_left(entries, self.base)]
+        lines, self.line_base = line_base - self.line_base, line_base
+        return lines
+
+    def _prefix_postings(self, prefix):
+        # Union of the postings of every word starting with `prefix`
+        lo = bisect.bisect_left(self.vocab, prefix)
+        hi = bisect.bisect_left(self.vocab, prefix + "\uffff")
+        words = self.vocab[lo:hi]
+        if len(words) == 1:
+            return self.postings[words[0]]
+        merged = set()
+        for word in words:
+            merged.update(self.postings[word])
+        return sorted(merged)
+
+    def search(self, query, styles=None):
+        # Entries containing every word of `query` (the last word may be
+        # unfinished and matches as a prefix), optionally limited to entries
+        # written with one of `styles`. Returns entry numbers in log order.
+        tokens = tokenize(query)
+        lists = [self.postings.get(t, []) for t in tokens[:-1]]
+        if tokens:
+            lists.append(self._prefix_postings(tokens[-1]))
+        if styles is not None:
+            chosen = [self.by_style.get(s, []) for s in styles]
+            lists.append(chosen[0] if len(chosen) == 1 else sorted(e for c in chosen for e in c))
+        if not lists:
+            return list(range(self.base, self.base + len(self.texts)))
+        # Walk the shortest list and check membership in the others
+        lists.sort(key=len)
+        others = [set(lst) for lst in lists[1:]]
+        return [e for e in lists[0] if all(e in s for s in others)]
+
+    def spans(self, entry, query):
+        # (line, start column, end column) of each query word in one entry,
+        # in Text widget coordinates, for highlighting.
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        words = [re.escape(t) + r"\b" for t in tokens[:-1]] + [re.escape(tokens[-1])]
+        pattern = re.compile(r"\b(?:" + "|".join(words) + ")", re.IGNORECASE)
+        first = self.line(entry)
+        return [(first + i, m.start(), m.end())
+                for i, line in enumerate(self.text(entry).split("\n"))
+                for m in pattern.finditer(line)]
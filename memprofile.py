@@ -0,0 +1,213 @@
+import argparse
+import functools
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from engine import GameEngine, RuleProfile, seeded_case
+from logindex import MAX_LOG_ENTRIES, LogIndex
+from savegame import MAX_UNDO
+from tracker import CulpritTracker
+
+# ---------------------
+# Config
+# ---------------------
+# Set to a file path to profile a play session; the report is written there
+# when the window closes
+PROFILE_ENV = "DEDUCTIONIST_PROFILE"
+# Growth sites kept per action and for the whole session
+ACTION_SITES = 3
+TOP_SITES = 15
+SOAK_ACTIONS = 100000
+SOAK_WARMUP = 5000
+SOAK_BOUND_KB = 512
+# Cases long enough for the undo stack to reach its cap
+SOAK_RULES = RuleProfile(start_credibility=4 * MAX_UNDO, max_turns=2 * MAX_UNDO)
+
+def count_widgets(widget):
+    # The widget and everything below it, Toplevels included
+    return 1 + sum(count_widgets(w) for w in widget.winfo_children())
+
+def _sites(snapshot, since, limit):
+    stats = snapshot.compare_to(since, "lineno")
+    stats = [s for s in stats if s.size_diff > 0][:limit]
+    return [{"file": s.traceback[0].filename, "line": s.traceback[0].lineno,
+             "size_diff": s.size_diff, "count_diff": s.count_diff} for s in stats]
+
+# ---------------------
+# Profiler
+# ---------------------
+class AllocationProfiler:
+    # Opt-in allocation tracking around action handlers. For every handler
+    # call it records the change in traced memory, the allocation sites that
+    # grew the most during the call (sites=0 skips the snapshots, which are
+    # the expensive part) and whatever `probe()` reports, e.g. live widgets
+    # and log size. Handlers called from inside another count toward the
+    # outer one.
+    def __init__(self, path=None, sites=ACTION_SITES, probe=None):
+        self.path = path
+        self.sites = sites
+        self.probe = probe
+        self.records = []
+        self.baseline = None
+        self._depth = 0
+        # Leave out the profiler's own bookkeeping
+        self._filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.baseline = self._snapshot()
+        return self
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    def wrap(self, name, fn):
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            if self._depth or self.baseline is None:
+                return fn(*args, **kwargs)
+            self._depth += 1
+            before = self._snapshot() if self.sites else None
+            size = tracemalloc.get_traced_memory()[0]
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._depth -= 1
+                self._record(name, time.perf_counter() - started, size, before)
+        return profiled
+
+    def instrument(self, obj, names):
+        # Replaces obj.<name> with a profiled version; do it before the
+        # methods are handed out as callbacks.
+        for name in names:
+            setattr(obj, name, self.wrap(name, getattr(obj, name)))
+        return obj
+
+    def _record(self, name, seconds, size_before, before):
+        size = tracemalloc.get_traced_memory()[0]
+        record = {"action": name, "seconds": seconds, "delta_bytes": size - size_before, "traced_bytes": size}
+        if self.probe is not None:
+            record.update(self.probe())
+        if before is not None:
+            record["sites"] = _sites(self._snapshot(), before, self.sites)
+        self.records.append(record)
+
+    def by_action(self):
+        # action -> calls, total and largest allocation change
+        out = {}
+        for r in self.records:
+            a = out.setdefault(r["action"], {"calls": 0, "delta_bytes": 0, "max_delta_bytes": 0})
+            a["calls"] += 1
+            a["delta_bytes"] += r["delta_bytes"]
+            a["max_delta_bytes"] = max(a["max_delta_bytes"], r["delta_bytes"])
+        return out
+
+    def top_growth(self, limit=TOP_SITES):
+        # Sites holding the most memory allocated since start()
+        return _sites(self._snapshot(), self.baseline, limit)
+
+    def report(self):
+        return {
+            "records": self.records,
+            "by_action": self.by_action(),
+            "top_growth": self.top_growth(),
+            "final": self.probe() if self.probe is not None else {},
+        }
+
+    def export(self, path=None):
+        with open(path or self.path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=1)
+
+# ---------------------
+# Soak test
+# ---------------------
+def soak(actions=SOAK_ACTIONS, seed=0, warmup=SOAK_WARMUP):
+    # Plays `actions` scripted actions headlessly the way a session does:
+    # one engine per case, an undo snapshot before every action (some of
+    # them undone, the oldest dropped past MAX_UNDO), the culprit tracker
+    # kept in sync and every log line indexed and trimmed as the log widget
+    # does, with a fresh log per case as a new case tab gets. Returns the
+    # traced memory growth in bytes between the end of the warm-up and the
+    # end, the sites that grew the most, and the largest undo stack and log
+    # seen.
+    rng = random.Random(seed)
+    logs = [None]
+    peaks = {"undo_depth": 0, "log_entries": 0}
+
+    def log(text, style='info'):
+        index = logs[0]
+        index.add(text, style)
+        drop = index.overflow()
+        if drop:
+            index.drop_oldest(drop)
+        peaks["log_entries"] = max(peaks["log_entries"], len(index))
+
+    tracemalloc.start()
+    try:
+        engine = undo = tracker = None
+        warm = None
+        for n in range(actions):
+            if n == warmup:
+                gc.collect()
+                warm = tracemalloc.take_snapshot()
+            if engine is None or engine.is_over():
+                logs[0] = LogIndex()
+                engine = GameEngine(seeded_case(rng.getrandbits(32)), log=log, rng=rng, rules=SOAK_RULES)
+                undo = []
+                tracker = CulpritTracker(engine.state['suspects'])
+            if undo and rng.random() < 0.1:
+                engine.restore(undo.pop())
+                tracker = CulpritTracker(engine.state['suspects'])
+            else:
+                undo.append(engine.snapshot())
+                if len(undo) > MAX_UNDO:
+                    del undo[0]
+                peaks["undo_depth"] = max(peaks["undo_depth"], len(undo))
+                engine.step(rng.choice(engine.legal_actions()))
+            tracker.sync(engine.state)
+        # The last case is still open; drop it so only what outlives a case counts
+        engine = undo = tracker = logs[0] = None
+        gc.collect()
+        end = tracemalloc.take_snapshot()
+        if warm is None:
+            warm = end
+        growth = sum(s.size_diff for s in end.compare_to(warm, "filename"))
+        return growth, _sites(end, warm, TOP_SITES), peaks
+    finally:
+        tracemalloc.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play scripted actions headlessly and check memory stays flat.")
+    parser.add_argument("--actions", type=int, default=SOAK_ACTIONS)
+    parser.add_argument("--warmup", type=int, default=SOAK_WARMUP)
+    parser.add_argument("--bound-kb", type=int, default=SOAK_BOUND_KB, help="allowed growth after the warm-up")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    growth, sites, peaks = soak(args.actions, args.seed, args.warmup)
+    elapsed = time.perf_counter() - started
+    print(f"{args.actions} actions in {elapsed:.1f}s; memory growth after warm-up: {growth / 1024:.1f} KiB "
+          f"(bound {args.bound_kb} KiB)")
+    print(f"largest undo stack {peaks['undo_depth']} (cap {MAX_UNDO}), "
+          f"largest log {peaks['log_entries']} entries (cap {MAX_LOG_ENTRIES})")
+    failed = False
+    if growth > args.bound_kb * 1024:
+        print("top growth sites:")
+        for s in sites:
+            print(f"  {s['file']}:{s['line']}  +{s['size_diff'] / 1024:.1f} KiB ({s['count_diff']:+d} blocks)")
+        failed = True
+    if peaks["undo_depth"] > MAX_UNDO or peaks["log_entries"] > MAX_LOG_ENTRIES:
+        print("the undo stack or the log outgrew its cap")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
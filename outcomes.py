@@ -0,0 +1,171 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from difficulty import culprit_route
+from engine import DEFAULT_RULES, MAX_TURNS
+
+# ---------------------
+# Config
+# ---------------------
+OUTCOMES_PATH = os.path.join(os.path.expanduser("~"), ".deductionist_outcomes.sqlite")
+# Rows per transaction; the writer also commits whenever its queue runs dry
+BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    seed INTEGER,
+    culprit TEXT NOT NULL,
+    culprit_motive TEXT NOT NULL,
+    motives TEXT NOT NULL,
+    culprit_clues INTEGER NOT NULL,
+    filler_clues INTEGER NOT NULL,
+    culprit_spread INTEGER NOT NULL,
+    actions INTEGER NOT NULL,
+    credibility INTEGER NOT NULL,
+    turns INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_motive ON games (culprit_motive, outcome);
+CREATE INDEX IF NOT EXISTS games_by_culprit_clues ON games (culprit_clues, outcome);
+CREATE INDEX IF NOT EXISTS games_by_spread ON games (culprit_spread, outcome);
+CREATE INDEX IF NOT EXISTS games_by_seed ON games (seed);
+"""
+
+COLUMNS = ("seed", "culprit", "culprit_motive", "motives", "culprit_clues", "filler_clues",
+           "culprit_spread", "actions", "credibility", "turns", "outcome", "finished_at")
+
+INSERT = f"INSERT INTO games ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+def _win_rate_by(column):
+    return (f"SELECT {column}, COUNT(*) AS games, AVG(outcome = 'won') AS win_rate, "
+            f"AVG(turns) AS avg_turns FROM games GROUP BY {column} ORDER BY {column}")
+
+# culprit_spread is the number of locations the culprit clues are spread over
+QUERIES = {
+    "win_rate_by_motive": _win_rate_by("culprit_motive"),
+    "win_rate_by_culprit_clues": _win_rate_by("culprit_clues"),
+    "win_rate_by_spread": _win_rate_by("culprit_spread"),
+    "outcomes": "SELECT outcome, COUNT(*) AS games, AVG(credibility) AS avg_credibility, "
+                "AVG(turns) AS avg_turns FROM games GROUP BY outcome ORDER BY games DESC",
+}
+
+# ---------------------
+# Rows
+# ---------------------
+def case_features(state):
+    # Call on the state at the start of the case, before clues are collected.
+    linking_tag = state['linking_tag']
+    culprit_locs = []
+    filler = 0
+    for i, loc in enumerate(state['locations'].values()):
+        here = loc.count_matching({linking_tag})
+        culprit_locs += [i] * here
+        filler += loc.clue_count() - here
+    spread = culprit_route(tuple(sorted(culprit_locs)))[0] if culprit_locs else 0
+    suspects = state['suspects']
+    return {
+        "seed": state.get('seed'),
+        "culprit": state['culprit'],
+        "culprit_motive": suspects[state['culprit']].motive,
+        "motives": ",".join(s.motive for s in suspects.values()),
+        "culprit_clues": len(culprit_locs),
+        "filler_clues": filler,
+        "culprit_spread": spread,
+    }
+
+def outcome_of(state, max_turns=MAX_TURNS):
+    if state['outcome'] == "won":
+        return "won"
+    if state['credibility'] <= 0:
+        return "credibility"
+    if state['turns'] >= max_turns:
+        return "timeout"
+    return "open"
+
+def game_row(features, state, actions, rules=DEFAULT_RULES):
+    return (features["seed"], features["culprit"], features["culprit_motive"], features["motives"],
+            features["culprit_clues"], features["filler_clues"], features["culprit_spread"],
+            actions, state['credibility'], state['turns'], outcome_of(state, rules.max_turns), time.time())
+
+# ---------------------
+# Store
+# ---------------------
+class OutcomeStore:
+    # record() only enqueues; a writer thread owns the connection and inserts
+    # whatever has queued up in one transaction per batch.
+    def __init__(self, path=OUTCOMES_PATH, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.last_error = None
+        self._queue = queue.Queue()
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+        db.close()
+        self._thread = threading.Thread(target=self._run, name="outcomes", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def record(self, row):
+        self._queue.put(row)
+
+    def record_many(self, rows):
+        # One queue item for a whole batch, e.g. from a simulator worker.
+        self._queue.put(list(rows))
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def query(self, name_or_sql, params=()):
+        self.flush()
+        sql = QUERIES.get(name_or_sql, name_or_sql)
+        db = sqlite3.connect(self.path)
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def _run(self):
+        db = self._connect()
+        done = False
+        while not done:
+            items = [self._queue.get()]
+            rows = []
+            # Drain what is already queued, up to one batch
+            while True:
+                item = items[-1]
+                if item is None:
+                    done = True
+                elif isinstance(item, list):
+                    rows.extend(item)
+                else:
+                    rows.append(item)
+                if done or len(rows) >= self.batch_size:
+                    break
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if rows:
+                    with db:
+                        db.executemany(INSERT, rows)
+            except sqlite3.Error as e:
+                self.last_error = e
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+        db.close()
@@ -0,0 +1,111 @@
+import heapq
+import itertools
+import math
+import time
+
+# ---------------------
+# Credibility decay scheduler
+# ---------------------
+class DecayScheduler:
+    # Keeps exactly one timer pending: the one for the next decay boundary.
+    # Boundaries are computed from a fixed start on a monotonic clock, so late
+    # timers never push later ones back, and a stalled event loop is caught
+    # up by GameEngine.advance_clock on the next firing. The case time reached
+    # is kept in the state's 'clock', so stopping and starting again (the
+    # checkbox, a tab put to sleep and woken) carries on mid-period.
+    #
+    # `after`/`cancel`/`clock` are root.after, root.after_cancel and
+    # time.monotonic in the UI, or the methods of a VirtualTimer headless.
+    def __init__(self, engine, after, cancel, clock=time.monotonic, on_decay=None):
+        self.engine = engine
+        self.after = after
+        self.cancel = cancel
+        self.clock = clock
+        self.on_decay = on_decay
+        self._start = None
+        self._pending = None
+
+    @property
+    def running(self):
+        return self._start is not None
+
+    def start(self):
+        self.stop()
+        # Resume from the case time reached, so time spent stopped is free
+        self._start = self.clock() - self.engine.state['clock']
+        self._schedule()
+
+    def stop(self):
+        if self.running:
+            self.engine.state['clock'] = self.elapsed()
+        if self._pending is not None:
+            self.cancel(self._pending)
+            self._pending = None
+        self._start = None
+
+    def reschedule(self):
+        # Call after the state changed under the scheduler (undo, redo, new case).
+        if self.running:
+            if self._pending is not None:
+                self.cancel(self._pending)
+                self._pending = None
+            self._fire()
+
+    def elapsed(self):
+        return self.clock() - self._start
+
+    def _schedule(self):
+        if self.engine.is_over():
+            return
+        delay = self.engine.next_decay_at() - self.elapsed()
+        self._pending = self.after(max(0, math.ceil(delay * 1000)), self._fire)
+
+    def _fire(self):
+        self._pending = None
+        charged = self.engine.advance_clock(self.elapsed())
+        if charged and self.on_decay is not None:
+            self.on_decay(charged)
+        self._schedule()
+
+# ---------------------
+# Headless clock
+# ---------------------
+class VirtualTimer:
+    # Stands in for Tk's root.after and time.monotonic in tests and simulations.
+    # Time only moves when advance() is called.
+    def __init__(self):
+        self.time = 0.0
+        self._queue = []
+        self._ids = itertools.count()
+        # Ids queued and neither run nor cancelled
+        self._live = set()
+
+    def now(self):
+        return self.time
+
+    def after(self, ms, func, *args):
+        ident = next(self._ids)
+        heapq.heappush(self._queue, (self.time + ms / 1000.0, ident, func, args))
+        self._live.add(ident)
+        return ident
+
+    def after_cancel(self, ident):
+        self._live.discard(ident)
+
+    def pending(self):
+        return len(self._live)
+
+    def advance(self, seconds, stall=False):
+        # Runs every callback due within `seconds`. With stall=True the clock
+        # jumps first and the callbacks then run late, like a blocked event loop.
+        end = self.time + seconds
+        if stall:
+            self.time = end
+        while self._queue and self._queue[0][0] <= end:
+            due, ident, func, args = heapq.heappop(self._queue)
+            if ident not in self._live:
+                continue
+            self._live.discard(ident)
+            self.time = max(self.time, due)
+            func(*args)
+        self.time = end
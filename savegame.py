@@ -0,0 +1,281 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+from casespec import LazyLocation, restored_answer_key
+from engine import DERIVED_STATE_KEYS, SUSPECT_CLUE_SETS, Clue, Location, Suspect, index_state
+
+# ---------------------
+# Config
+# ---------------------
+SAVE_VERSION = 1
+SESSION_VERSION = 1
+AUTOSAVE_PATH = os.path.join(os.path.expanduser("~"), ".deductionist_autosave.json")
+AUTOSAVE_EVERY_ACTIONS = 5
+AUTOSAVE_EVERY_SECONDS = 60.0
+# How often the UI asks the autosaver whether a time-based save is due
+AUTOSAVE_POLL_MS = 1000
+# Undo snapshots kept per case; the oldest go first
+MAX_UNDO = 200
+
+# ---------------------
+# Encoding
+# ---------------------
+def _clue_to_dict(c):
+    return {"id": c.id, "type": c.type_name, "desc": c.desc, "tags": sorted(c.tags), "found": c.found}
+
+def _clue_from_dict(d):
+    c = Clue(d["id"], d["type"], d["desc"], d["tags"])
+    c.found = d["found"]
+    return c
+
+def _location_to_dict(name, loc):
+    # A lazy location is saved as its summary and the ids taken from it, so
+    # saving never deals it
+    if isinstance(loc, LazyLocation):
+        return {"name": name, "lazy": loc.summary()}
+    return {"name": name, "clues": [_clue_to_dict(c) for c in loc.clues]}
+
+def _location_from_dict(entry):
+    if "lazy" in entry:
+        return LazyLocation.from_summary(entry["name"], entry["lazy"])
+    loc = Location(entry["name"])
+    loc.clues = [_clue_from_dict(c) for c in entry["clues"]]
+    return loc
+
+def state_to_dict(state):
+    out = {k: v for k, v in state.items()
+           if k not in ("locations", "suspects", "found_clues", "presented", "accusations")
+           and k not in DERIVED_STATE_KEYS}
+    out["version"] = SAVE_VERSION
+    out["locations"] = [_location_to_dict(name, loc) for name, loc in state['locations'].items()]
+    out["suspects"] = [
+        {"name": s.name, "motive": s.motive, "alibi": s.alibi, "tags": sorted(s.tags),
+         "interrogated": s.interrogated, "presented_clues": sorted(s.presented_clues),
+         "confronted": sorted(s.confronted), "contradictions": sorted(s.contradictions)}
+        for s in state['suspects'].values()
+    ]
+    out["found_clues"] = [_clue_to_dict(c) for c in state['found_clues']]
+    # Where the found clues lay; the rest of the answer key is rebuilt on load
+    where = state['answer_key'].location_by_clue
+    out["found_at"] = {str(c.id): where.get(c.id) for c in state['found_clues']}
+    out["presented"] = dict(state['presented'])
+    out["accusations"] = dict(state['accusations'])
+    return out
+
+def state_from_dict(data):
+    if data.get("version") != SAVE_VERSION:
+        raise ValueError(f"Unsupported save version: {data.get('version')}")
+    state = {k: v for k, v in data.items() if k != "version"}
+    locations = {}
+    for entry in data["locations"]:
+        loc = _location_from_dict(entry)
+        locations[loc.name] = loc
+    suspects = {}
+    for entry in data["suspects"]:
+        s = Suspect(entry["name"], entry["motive"], entry["alibi"], entry["tags"])
+        s.interrogated = entry["interrogated"]
+        s.presented_clues = set(entry["presented_clues"])
+        s.confronted = set(entry.get("confronted", ()))
+        s.contradictions = set(entry.get("contradictions", ()))
+        suspects[s.name] = s
+    state["locations"] = locations
+    state["suspects"] = suspects
+    state["found_clues"] = [_clue_from_dict(c) for c in data["found_clues"]]
+    if any(isinstance(loc, LazyLocation) for loc in locations.values()):
+        # make_answer_key would deal every location; index_state keeps this one
+        state["answer_key"] = restored_answer_key(state, data.get("found_at", {}))
+    return state
+
+# ---------------------
+# Patches
+# ---------------------
+# A viewer (a terminal, a remote client) holds the state_to_dict() form of a
+# case once and then keeps it current with the engine.diff_states patch of
+# each action, which is a few ops long however big the case is.
+def encode_patch(patch):
+    return json.dumps(patch, separators=(",", ":"))
+
+def decode_patch(text):
+    return [tuple(op) for op in json.loads(text)]
+
+def _clue_index(clues, cid):
+    # Searched from the end: undo hands back the most recently found clue
+    for i in range(len(clues) - 1, -1, -1):
+        if clues[i]["id"] == cid:
+            return i
+    raise ValueError(f"Patch moves clue {cid}, which is not where it says")
+
+def _entry_clues(entry):
+    # A location saved undealt is dealt the first time a patch moves its clues
+    if "lazy" in entry:
+        entry["clues"] = [_clue_to_dict(c) for c in _location_from_dict(entry).clues]
+        del entry["lazy"]
+    return entry["clues"]
+
+def apply_patch(data, patch):
+    # Updates a state_to_dict() document in place and returns it.
+    locations = {entry["name"]: entry for entry in data["locations"]}
+    suspects = {entry["name"]: entry for entry in data["suspects"]}
+    for op in patch:
+        kind = op[0]
+        if kind == "clue":
+            _, cid, source, target = op
+            clues = data["found_clues"] if source is None else _entry_clues(locations[source])
+            clue = dict(clues.pop(_clue_index(clues, cid)), found=target is None)
+            if target is None:
+                data["found_clues"].append(clue)
+                data["found_at"][str(cid)] = source
+            else:
+                data["found_at"].pop(str(cid), None)
+                # Clues lie at a location in id order
+                bisect.insort(_entry_clues(locations[target]), clue, key=lambda c: c["id"])
+        elif kind == "interrogated":
+            suspects[op[1]]["interrogated"] = op[3]
+        elif kind in SUSPECT_CLUE_SETS:
+            entry = suspects[op[1]]
+            entry[kind] = sorted(set(entry[kind]).union(op[2]).difference(op[3]))
+        elif kind in ("presented", "accusations"):
+            _, name, _, new = op
+            if new is None:
+                data[kind].pop(name, None)
+            else:
+                data[kind][name] = new
+        else:
+            data[kind] = op[2]
+    return data
+
+# ---------------------
+# Hibernated sessions
+# ---------------------
+# A whole investigation (state, undo and redo snapshots, log entries and any
+# JSON-able extras) packed into one compressed blob, for tabs that are not
+# being looked at. Snapshots share most of their objects, which zlib turns
+# back into small back-references.
+def pack_session(state, undo=(), redo=(), log=(), **extra):
+    data = {
+        "version": SESSION_VERSION,
+        "state": state_to_dict(state),
+        "undo": [state_to_dict(s) for s in undo],
+        "redo": [state_to_dict(s) for s in redo],
+        "log": list(log),
+        "extra": extra,
+    }
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), 1)
+
+def unpack_session(blob):
+    # Returns a dict with "state", "undo", "redo", "log" and "extra"; the
+    # snapshots come back indexed and ready for GameEngine.restore.
+    data = json.loads(zlib.decompress(blob))
+    if data.get("version") != SESSION_VERSION:
+        raise ValueError(f"Unsupported session version: {data.get('version')}")
+    data["state"] = state_from_dict(data["state"])
+    data["undo"] = [index_state(state_from_dict(d)) for d in data["undo"]]
+    data["redo"] = [index_state(state_from_dict(d)) for d in data["redo"]]
+    return data
+
+def atomic_write(path, text):
+    # Write to a temporary file next to `path`, then rename over it, so a crash
+    # never leaves a half-written save behind.
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".save-", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def save_game(path, state):
+    atomic_write(path, json.dumps(state_to_dict(state)))
+
+def load_game(path):
+    with open(path, encoding="utf-8") as f:
+        return state_from_dict(json.load(f))
+
+# ---------------------
+# Background autosave
+# ---------------------
+class Autosaver:
+    # The Tk thread only hands over a snapshot (GameEngine.snapshot() is O(1)
+    # and frozen); encoding and writing happen on a daemon thread. Snapshots
+    # that arrive while a write is in progress replace each other, so a burst
+    # of actions costs one write of the newest state.
+    def __init__(self, path=AUTOSAVE_PATH, every_actions=AUTOSAVE_EVERY_ACTIONS,
+                 every_seconds=AUTOSAVE_EVERY_SECONDS, clock=time.monotonic):
+        self.path = path
+        self.every_actions = every_actions
+        self.every_seconds = every_seconds
+        self.clock = clock
+        self.last_error = None
+        self.writes = 0
+        self._actions = 0
+        self._last_save = clock()
+        self._pending = None
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def record(self, take_snapshot):
+        # Call after every action; `take_snapshot` is only called when a save is due.
+        self._actions += 1
+        if self._actions >= self.every_actions:
+            self.save(take_snapshot())
+        else:
+            self.poll(take_snapshot)
+
+    def poll(self, take_snapshot):
+        # Call from a timer as well: an idle player's last actions are saved
+        # every_seconds after the previous save. Snapshots are only ever taken
+        # on the caller's thread.
+        if self._actions and self.clock() - self._last_save >= self.every_seconds:
+            self.save(take_snapshot())
+
+    def save(self, snapshot):
+        self._actions = 0
+        self._last_save = self.clock()
+        with self._cond:
+            self._pending = snapshot
+            self._cond.notify()
+
+    def flush(self, timeout=None):
+        # Blocks until everything handed over so far is on disk.
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._busy, timeout)
+
+    def close(self, timeout=5.0):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return
+                snapshot, self._pending = self._pending, None
+                self._busy = True
+            try:
+                save_game(self.path, snapshot)
+                self.writes += 1
+            except Exception as e:
+                self.last_error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
@@ -0,0 +1,352 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np  # batch tool; numpy is required here
+
+from engine import CONTENT, draw_layout
+from sharedcases import CASE_DTYPE, MAX_CULPRIT_CLUES, MAX_FILLER_CLUES, encode_layout
+
+# ---------------------
+# Config
+# ---------------------
+# Seeds dealt per numpy pass (the MT state of a pass is 624 * 4 bytes per
+# seed) and per worker task
+DEAL_CHUNK = 8192
+TASK_SEEDS = 1 << 20
+# seeded_case seeds are hashed by random.Random; seeds below 2**32 seed it
+# with a single key word, which is what deal_structure reproduces
+MAX_SEED = 1 << 32
+# The fields deal_structure fills; the rest of a record (names, location
+# and clue types) only exists after draw_layout
+STRUCTURE_FIELDS = ("seed", "culprit", "n_culprit", "n_filler", "motives", "alibis",
+                    "filler_sources", "clue_locs")
+# random() calls draw_layout makes before the names: culprit, 5 motives,
+# 5 alibis, two clue counts, up to 3 per filler clue, then a location per clue
+MAX_DRAWS = 13 + 3 * MAX_FILLER_CLUES + MAX_CULPRIT_CLUES + MAX_FILLER_CLUES
+
+# ---------------------
+# Vectorized random.Random
+# ---------------------
+# random.Random(seed).random() for many seeds at once: MT19937 seeded the
+# way CPython's init_by_array does it, then the first outputs of the first
+# twist, tempered and paired into doubles. Bit-exact with CPython, which
+# check_deal compares against.
+MT_N = 624
+MT_M = 397
+
+def _init_genrand(s):
+    mt = [s]
+    for i in range(1, MT_N):
+        mt.append((1812433253 * (mt[-1] ^ (mt[-1] >> 30)) + i) & 0xffffffff)
+    return mt
+
+_MT_INIT = _init_genrand(19650218)
+
+def mt_state(seeds):
+    # (624, n) uint32 state of random.Random(seed) for each seed, one row
+    # per state word so every step is a contiguous pass over the seeds.
+    seeds = np.asarray(seeds, dtype=np.uint32)
+    mt = np.empty((MT_N, len(seeds)), dtype=np.uint32)
+    t = np.empty(len(seeds), dtype=np.uint32)
+    mult1 = np.uint32(1664525)
+    mult2 = np.uint32(1566083941)
+
+    def mix(i, mult, base):
+        # t = (base ^ ((mt[i-1] ^ (mt[i-1] >> 30)) * mult)), wrapping at 32 bits
+        prev = mt[i - 1]
+        np.right_shift(prev, 30, out=t)
+        np.bitwise_xor(t, prev, out=t)
+        np.multiply(t, mult, out=t)
+        np.bitwise_xor(t, base, out=t)
+        return t
+
+    # First pass: the key (the seed) is added to every word
+    mt[0] = _MT_INIT[0]
+    for i in range(1, MT_N):
+        np.add(mix(i, mult1, np.uint32(_MT_INIT[i])), seeds, out=mt[i])
+    mt[0] = mt[MT_N - 1]
+    np.add(mix(1, mult1, mt[1]), seeds, out=mt[1])
+    # Second pass, from word 2 round to word 1
+    for i in range(2, MT_N):
+        np.subtract(mix(i, mult2, mt[i]), np.uint32(i), out=mt[i])
+    mt[0] = mt[MT_N - 1]
+    np.subtract(mix(1, mult2, mt[1]), np.uint32(1), out=mt[1])
+    mt[0] = 0x80000000
+    return mt
+
+def random_doubles(seeds, count):
+    # (count, n) float64: the first `count` random() values of each seed.
+    if 2 * count > MT_N - MT_M:
+        raise ValueError(f"Only the first {(MT_N - MT_M) // 2} values can be drawn")
+    mt = mt_state(seeds)
+    k = 2 * count
+    y = mt[:k] & np.uint32(0x80000000)
+    y |= mt[1:k + 1] & np.uint32(0x7fffffff)
+    odd = (y & np.uint32(1)) * np.uint32(0x9908b0df)
+    y >>= 1
+    y ^= mt[MT_M:MT_M + k]
+    y ^= odd
+    # Tempering
+    y ^= y >> 11
+    y ^= (y << 7) & np.uint32(0x9d2c5680)
+    y ^= (y << 15) & np.uint32(0xefc60000)
+    y ^= y >> 18
+    a = (y[0::2] >> 5).astype(np.float64)
+    a *= 67108864.0
+    a += y[1::2] >> 6
+    a *= 1.0 / 9007199254740992.0
+    return a
+
+# ---------------------
+# Dealing
+# ---------------------
+def deal_structure(seeds):
+    # CASE_DTYPE records for the seeds with the STRUCTURE_FIELDS filled in,
+    # as draw_layout(random.Random(seed)) deals them; the other fields are 0.
+    seeds = np.asarray(seeds, dtype=np.int64)
+    if len(seeds) and (seeds.min() < 0 or seeds.max() >= MAX_SEED):
+        raise ValueError(f"Seeds must be in [0, {MAX_SEED})")
+    n = len(seeds)
+    d = random_doubles(seeds, MAX_DRAWS)
+    games = np.arange(n)
+    n_motives = len(CONTENT.motives)
+
+    out = np.zeros(n, dtype=CASE_DTYPE)
+    out["seed"] = seeds
+    culprit = (d[0] * 5).astype(np.int64)
+    out["culprit"] = culprit
+    out["motives"] = (d[1:6] * n_motives).astype(np.int64).T
+    out["alibis"] = (d[6:11] * 4).astype(np.int64).T
+    n_culprit = 3 + (d[11] < 0.5)
+    n_filler = 4 + (d[12] * 3).astype(np.int64)
+    out["n_culprit"] = n_culprit
+    out["n_filler"] = n_filler
+
+    # A filler clue takes one draw to pick its kind, then two for another
+    # suspect's tag or one for a generic motive, so the draws fall out of step
+    pos = np.full(n, 13)
+    sources = out["filler_sources"]
+    for f in range(MAX_FILLER_CLUES):
+        live = f < n_filler
+        named = d[pos, games] < 0.5
+        other = (d[pos + 1, games] * 4).astype(np.int64)
+        other += other >= culprit
+        source = np.where(named, other * 2 + (d[pos + 2, games] < 0.5),
+                          -1 - (d[pos + 1, games] * n_motives).astype(np.int64))
+        sources[:, f] = np.where(live, source, 0)
+        pos += np.where(live, np.where(named, 3, 2), 0)
+
+    locs = out["clue_locs"]
+    for c in range(MAX_CULPRIT_CLUES + MAX_FILLER_CLUES):
+        locs[:, c] = np.where(c < n_culprit + n_filler, (d[pos + c, games] * 4).astype(np.int64), 0)
+    return out
+
+def deal_rest(records):
+    # Fills in the names, locations and clue types of `records` in place,
+    # one draw_layout per record.
+    for i in range(len(records)):
+        seed = int(records[i]["seed"])
+        records[i] = encode_layout(draw_layout(random.Random(seed)), seed)
+    return records
+
+def check_deal(seeds):
+    # Raises AssertionError at the first seed deal_structure deals differently
+    # from draw_layout; returns the number of seeds compared.
+    seeds = list(seeds)
+    fast = deal_structure(seeds)
+    slow = np.zeros(len(seeds), dtype=CASE_DTYPE)
+    slow["seed"] = seeds
+    deal_rest(slow)
+    for field in STRUCTURE_FIELDS:
+        bad = np.flatnonzero((fast[field] != slow[field]).reshape(len(seeds), -1).any(axis=1))
+        assert not len(bad), f"{field} differs for seed {seeds[bad[0]]}"
+    return len(seeds)
+
+# ---------------------
+# Queries
+# ---------------------
+# A query is a test over a batch of CASE_DTYPE records returning one bool per
+# record. `where` may only read STRUCTURE_FIELDS; a query that also needs
+# names or clue types gives a `detail` test, which only sees the records
+# that passed `where` and have been dealt in full.
+class Query:
+    def __init__(self, name, where, detail=None, help=""):
+        self.name = name
+        self.where = where
+        self.detail = detail
+        self.help = help
+
+def _slots(count, size):
+    # (n, size) bool: which of `size` padded slots hold a dealt value
+    return np.arange(size) < count[:, None].astype(np.int64)
+
+def _culprit_locs(cases):
+    # Culprit clues come first in clue_locs
+    return cases["clue_locs"][:, :MAX_CULPRIT_CLUES], _slots(cases["n_culprit"], MAX_CULPRIT_CLUES)
+
+def _culprit_alibi(cases):
+    return cases["alibis"][np.arange(len(cases)), cases["culprit"]]
+
+def culprit_one_location(cases):
+    locs, live = _culprit_locs(cases)
+    return ((locs == locs[:, :1]) | ~live).all(axis=1)
+
+def filler_names_suspect(cases):
+    # A source >= 0 is suspect*2 + (0 for their name tag, 1 for their motive tag)
+    sources = cases["filler_sources"]
+    return ((sources >= 0) & (sources % 2 == 0) & _slots(cases["n_filler"], MAX_FILLER_CLUES)).any(axis=1)
+
+def filler_motive_tag(cases):
+    sources = cases["filler_sources"]
+    return ((sources >= 0) & (sources % 2 == 1) & _slots(cases["n_filler"], MAX_FILLER_CLUES)).any(axis=1)
+
+def culprit_alibi_holds(cases):
+    # Every culprit clue lies at the culprit's alibi: confronting them with
+    # the evidence never catches a contradiction
+    locs, live = _culprit_locs(cases)
+    return ((locs == _culprit_alibi(cases)[:, None]) | ~live).all(axis=1)
+
+def no_culprit_clue_at_alibi(cases):
+    locs, live = _culprit_locs(cases)
+    return ~((locs == _culprit_alibi(cases)[:, None]) & live).any(axis=1)
+
+def shared_motive(cases):
+    motives = cases["motives"]
+    culprit = motives[np.arange(len(cases)), cases["culprit"]]
+    return (motives == culprit[:, None]).sum(axis=1) > 1
+
+def empty_location(cases):
+    locs = cases["clue_locs"]
+    live = _slots(cases["n_culprit"].astype(np.int64) + cases["n_filler"], MAX_CULPRIT_CLUES + MAX_FILLER_CLUES)
+    held = np.zeros((len(cases), 4), dtype=bool)
+    for place in range(4):
+        held[:, place] = ((locs == place) & live).any(axis=1)
+    return ~held.all(axis=1)
+
+def filler_with_culprit_type(cases):
+    # Detail test: a filler clue is the same kind of object as a culprit clue
+    culprit = np.where(_slots(cases["n_culprit"], MAX_CULPRIT_CLUES), cases["culprit_types"].astype(np.int64), -1)
+    filler = np.where(_slots(cases["n_filler"], MAX_FILLER_CLUES), cases["filler_types"].astype(np.int64), -2)
+    return (filler[:, :, None] == culprit[:, None, :]).any(axis=(1, 2))
+
+def _everything(cases):
+    return np.ones(len(cases), dtype=bool)
+
+QUERIES = {q.name: q for q in (
+    Query("culprit-one-location", culprit_one_location, help="all culprit clues lie at one location"),
+    Query("filler-names-suspect", filler_names_suspect, help="a filler clue carries another suspect's name tag"),
+    Query("filler-motive-tag", filler_motive_tag, help="a filler clue carries another suspect's motive tag"),
+    Query("culprit-alibi-holds", culprit_alibi_holds, help="every culprit clue lies at the culprit's alibi"),
+    Query("no-culprit-clue-at-alibi", no_culprit_clue_at_alibi, help="no culprit clue lies at the culprit's alibi"),
+    Query("shared-motive", shared_motive, help="another suspect has the culprit's motive"),
+    Query("empty-location", empty_location, help="some location holds no clues"),
+    Query("filler-with-culprit-type", _everything, filler_with_culprit_type,
+          help="a filler clue has the same clue type as a culprit clue"),
+)}
+
+def match(cases, names):
+    # Bool per record: every named query holds. Records passing the
+    # structural tests are dealt in full (in place) when a detail test needs it.
+    queries = [QUERIES[name] for name in names]
+    ok = np.ones(len(cases), dtype=bool)
+    for q in queries:
+        ok &= q.where(cases)
+    details = [q.detail for q in queries if q.detail is not None]
+    if details:
+        idx = np.flatnonzero(ok)
+        full = deal_rest(cases[idx])
+        cases[idx] = full
+        for detail in details:
+            ok[idx[~detail(full)]] = False
+    return ok
+
+# ---------------------
+# Scanning
+# ---------------------
+def scan_range(start, stop, names, chunk=DEAL_CHUNK):
+    # Returns the matching seeds in [start, stop) as an int64 array.
+    found = []
+    for a in range(start, stop, chunk):
+        cases = deal_structure(np.arange(a, min(a + chunk, stop)))
+        found.append(cases["seed"][match(cases, names)])
+    return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+def task_spans(seeds, task=TASK_SEEDS, first=DEAL_CHUNK):
+    # (starts, stops) covering `seeds`; tasks start at `first` seeds and
+    # double up to `task`, so a scan with a limit answers quickly and stops
+    # without much work in flight
+    starts, stops = [], []
+    a, size = seeds.start, first
+    while a < seeds.stop:
+        starts.append(a)
+        a = min(a + size, seeds.stop)
+        stops.append(a)
+        size = min(2 * size, task)
+    return starts, stops
+
+def scan(seeds, names, workers=None, limit=None, task=TASK_SEEDS):
+    # Matching seeds in `seeds` (a range) in order, stopping once `limit`
+    # are found; returns (seeds array, seeds scanned). Workers get (start,
+    # stop) pairs and hand back only what matched.
+    for name in names:
+        if name not in QUERIES:
+            raise ValueError(f"Unknown query: {name}")
+    if seeds.start < 0 or seeds.stop > MAX_SEED:
+        raise ValueError(f"Seeds must be in [0, {MAX_SEED})")
+    starts, stops = task_spans(seeds, task)
+    found = []
+    total = scanned = 0
+    pool = ProcessPoolExecutor(workers)
+    try:
+        for stop, hits in zip(stops, pool.map(scan_range, starts, stops, repeat(names))):
+            found.append(hits)
+            total += len(hits)
+            scanned = stop - seeds.start
+            if limit and total >= limit:
+                break
+    finally:
+        pool.shutdown(cancel_futures=True)
+    out = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+    return (out[:limit] if limit else out), scanned
+
+# ---------------------
+# Command line
+# ---------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find seeds whose cases match structural criteria.")
+    parser.add_argument("queries", nargs="*", metavar="QUERY", help="queries that must all hold; see --list")
+    parser.add_argument("--list", action="store_true", help="list the queries")
+    parser.add_argument("--start", type=int, default=0, help="first seed to scan")
+    parser.add_argument("--count", type=int, default=10 ** 6, help="seeds to scan")
+    parser.add_argument("--limit", type=int, default=20, help="stop after this many matches (0: scan them all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--check", type=int, default=2000, help="seeds to compare with draw_layout first")
+    parser.add_argument("--out", help="write the matching seeds here, one per line")
+    args = parser.parse_args(argv)
+
+    if args.list or not args.queries:
+        for q in QUERIES.values():
+            print(f"{q.name:26s} {q.help}")
+        return
+    unknown = [name for name in args.queries if name not in QUERIES]
+    if unknown:
+        parser.error(f"unknown query: {', '.join(unknown)}")
+    if args.check:
+        check_deal(range(args.start, min(args.start + args.check, MAX_SEED)))
+
+    started = time.perf_counter()
+    seeds, scanned = scan(range(args.start, args.start + args.count), args.queries, args.workers, args.limit)
+    elapsed = time.perf_counter() - started
+    print(f"{scanned:,} seeds scanned in {elapsed:.1f}s ({scanned / elapsed:,.0f} seeds/s); {len(seeds)} matched")
+    if args.out:
+        np.savetxt(args.out, seeds, fmt="%d")
+    else:
+        for seed in seeds.tolist():
+            print(seed)
+
+if __name__ == "__main__":
+    main()
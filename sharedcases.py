@@ -0,0 +1,242 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
+
+import numpy as np  # batch tool; numpy is required here
+
+from engine import DEFAULT_RULES, CaseLayout, build_case, draw_layout
+from outcomes import outcome_of
+from simulate import POLICIES, play_case
+
+# ---------------------
+# Record layouts
+# ---------------------
+# A case is stored as its CaseLayout: indices into the content pack, so
+# workers must deal from the same pack as the process that drew the batch
+# (forked workers inherit it). draw_layout deals 3-4 culprit and 4-6 filler
+# clues; unused slots are left at 0.
+MAX_CULPRIT_CLUES = 4
+MAX_FILLER_CLUES = 6
+
+CASE_DTYPE = np.dtype([
+    ("seed", "<i8"),
+    ("culprit", "u1"),
+    ("n_culprit", "u1"),
+    ("n_filler", "u1"),
+    ("motives", "<u4", 5),
+    ("alibis", "u1", 5),
+    ("location_ids", "<u4", 4),
+    ("tag_ids", "<u4", 5),
+    ("suspect_ids", "<u4", 5),
+    ("culprit_types", "<u4", MAX_CULPRIT_CLUES),
+    ("filler_types", "<u4", MAX_FILLER_CLUES),
+    ("filler_sources", "<i4", MAX_FILLER_CLUES),
+    ("clue_locs", "u1", MAX_CULPRIT_CLUES + MAX_FILLER_CLUES),
+])
+
+OUTCOME_CODES = ("open", "won", "credibility", "timeout")
+RESULT_DTYPE = np.dtype([
+    ("outcome", "u1"),  # index into OUTCOME_CODES
+    ("actions", "<u2"),
+    ("turns", "<u2"),
+    ("credibility", "<i2"),
+])
+
+def _pad(values, size):
+    return list(values) + [0] * (size - len(values))
+
+def encode_layout(layout, seed):
+    n_culprit = len(layout.culprit_types)
+    n_filler = len(layout.filler_types)
+    return (seed, layout.culprit, n_culprit, n_filler, layout.motives, layout.alibis,
+            layout.location_ids, layout.tag_ids, layout.suspect_ids,
+            _pad(layout.culprit_types, MAX_CULPRIT_CLUES),
+            _pad(layout.filler_types, MAX_FILLER_CLUES),
+            _pad(layout.filler_sources, MAX_FILLER_CLUES),
+            _pad(layout.clue_locs, MAX_CULPRIT_CLUES + MAX_FILLER_CLUES))
+
+def decode_layout(record):
+    # Returns (layout, seed) for one CASE_DTYPE record.
+    n_culprit = int(record["n_culprit"])
+    n_filler = int(record["n_filler"])
+    layout = CaseLayout()
+    layout.culprit = int(record["culprit"])
+    layout.motives = record["motives"].tolist()
+    layout.alibis = record["alibis"].tolist()
+    layout.location_ids = record["location_ids"].tolist()
+    layout.tag_ids = record["tag_ids"].tolist()
+    layout.suspect_ids = record["suspect_ids"].tolist()
+    layout.culprit_types = record["culprit_types"][:n_culprit].tolist()
+    layout.filler_types = record["filler_types"][:n_filler].tolist()
+    layout.filler_sources = record["filler_sources"][:n_filler].tolist()
+    layout.clue_locs = record["clue_locs"][:n_culprit + n_filler].tolist()
+    return layout, int(record["seed"])
+
+# ---------------------
+# Shared batches
+# ---------------------
+class SharedCaseBatch:
+    # One shared memory block holding n case records followed by n result
+    # records. The creating process owns it and unlinks it on close();
+    # workers attach by name and read and write it in place.
+    def __init__(self, shm, n, owner):
+        self.shm = shm
+        self.n = n
+        self.owner = owner
+        self.cases = np.ndarray((n,), CASE_DTYPE, buffer=shm.buf)
+        self.results = np.ndarray((n,), RESULT_DTYPE, buffer=shm.buf, offset=n * CASE_DTYPE.itemsize)
+
+    @classmethod
+    def create(cls, n):
+        size = max(1, n * (CASE_DTYPE.itemsize + RESULT_DTYPE.itemsize))
+        return cls(shared_memory.SharedMemory(create=True, size=size), n, owner=True)
+
+    @classmethod
+    def attach(cls, name, n):
+        return cls(shared_memory.SharedMemory(name=name), n, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        # The numpy views must go before the buffer can be released
+        self.cases = self.results = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def draw_batch(seeds):
+    # The same cases seeded_case(seed) deals, as records in a new batch.
+    seeds = list(seeds)
+    return layout_batch([draw_layout(random.Random(seed)) for seed in seeds], seeds)
+
+def layout_batch(layouts, seeds):
+    # Already drawn layouts, with the seeds they were drawn from, in a new batch.
+    batch = SharedCaseBatch.create(len(layouts))
+    for i, (layout, seed) in enumerate(zip(layouts, seeds)):
+        batch.cases[i] = encode_layout(layout, seed)
+    return batch
+
+def result_record(state, actions, rules=DEFAULT_RULES):
+    return (OUTCOME_CODES.index(outcome_of(state, rules.max_turns)), actions, state['turns'], state['credibility'])
+
+# ---------------------
+# Workers
+# ---------------------
+_batch = None
+
+def _attach_worker(name, n):
+    global _batch
+    _batch = SharedCaseBatch.attach(name, n)
+
+# Both return the seconds spent in play_case, so the benchmark can tell
+# playing apart from getting the cases to the workers.
+def _play_shared(start, stop, policy, rules):
+    cases, results = _batch.cases, _batch.results
+    policy = POLICIES[policy]
+    play_s = 0.0
+    for i in range(start, stop):
+        layout, seed = decode_layout(cases[i])
+        case = build_case(layout)
+        case['seed'] = seed
+        started = time.perf_counter()
+        state, _, actions = play_case(case, random.Random(seed), policy, rules)
+        play_s += time.perf_counter() - started
+        results[i] = result_record(state, actions, rules)
+    return play_s
+
+def play_batch(batch, workers=None, policy="greedy", chunk=1000, rules=DEFAULT_RULES, timing=None):
+    # Plays every case in the batch; only (start, stop) pairs cross process
+    # boundaries. Fills and returns batch.results. Given a `timing` dict, adds
+    # the workers' seconds in play_case to timing["play"].
+    starts = range(0, batch.n, chunk)
+    stops = [min(a + chunk, batch.n) for a in starts]
+    play_s = 0.0
+    with ProcessPoolExecutor(workers, initializer=_attach_worker, initargs=(batch.name, batch.n)) as pool:
+        for s in pool.map(_play_shared, starts, stops, repeat(policy), repeat(rules)):
+            play_s += s
+    if timing is not None:
+        timing["play"] = timing.get("play", 0.0) + play_s
+    return batch.results
+
+def _play_pickled(cases, policy, rules):
+    policy = POLICIES[policy]
+    out = []
+    play_s = 0.0
+    for case in cases:
+        started = time.perf_counter()
+        state, _, actions = play_case(case, random.Random(case['seed']), policy, rules)
+        play_s += time.perf_counter() - started
+        out.append(result_record(state, actions, rules))
+    return out, play_s
+
+def play_pickled(cases, workers=None, policy="greedy", chunk=1000, rules=DEFAULT_RULES, timing=None):
+    # The same work with the built case graphs pickled to the workers; kept
+    # as the baseline for the benchmark. `timing` as for play_batch.
+    chunks = [cases[a:a + chunk] for a in range(0, len(cases), chunk)]
+    out = []
+    play_s = 0.0
+    with ProcessPoolExecutor(workers) as pool:
+        for records, s in pool.map(_play_pickled, chunks, repeat(policy), repeat(rules)):
+            out.extend(records)
+            play_s += s
+    if timing is not None:
+        timing["play"] = timing.get("play", 0.0) + play_s
+    return np.array(out, dtype=RESULT_DTYPE)
+
+# ---------------------
+# Benchmark
+# ---------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare shared-memory and pickled case batches.")
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="greedy")
+    args = parser.parse_args(argv)
+    seeds = range(args.seed, args.seed + args.games)
+    # Both paths start from the same layouts, drawn outside the timings: the
+    # pickled one builds the case graphs and ships them, the shared one
+    # encodes records and the workers build the graphs themselves. Whatever
+    # is not play_case is counted as build+transfer.
+    layouts = [draw_layout(random.Random(seed)) for seed in seeds]
+
+    pickled_timing = {}
+    started = time.perf_counter()
+    cases = []
+    for layout, seed in zip(layouts, seeds):
+        case = build_case(layout)
+        case['seed'] = seed
+        cases.append(case)
+    pickled = play_pickled(cases, args.workers, args.policy, args.chunk, timing=pickled_timing)
+    pickled_s = time.perf_counter() - started
+
+    shared_timing = {}
+    started = time.perf_counter()
+    with layout_batch(layouts, seeds) as batch:
+        shared = play_batch(batch, args.workers, args.policy, args.chunk, timing=shared_timing).copy()
+    shared_s = time.perf_counter() - started
+
+    print(f"{args.games} games, {args.workers} workers; play is the workers' play_case seconds summed")
+    for label, total, timing in (("pickled", pickled_s, pickled_timing), ("shared", shared_s, shared_timing)):
+        # Worker play time overlaps across workers; spread it evenly over them
+        play = timing["play"] / max(1, min(args.workers, len(range(0, args.games, args.chunk))))
+        print(f"  {label + ':':8} {total:.2f}s ({args.games / total:,.0f} games/s); "
+              f"play {timing['play']:.2f}s, build+transfer {max(0.0, total - play):.2f}s")
+    print(f"  shared is {pickled_s / shared_s:.2f}x the pickled speed overall")
+    print(f"  results match: {bool(np.array_equal(pickled, shared))}")
+
+if __name__ == "__main__":
+    main()
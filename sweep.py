@@ -0,0 +1,141 @@
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np  # batch tool; numpy is required here
+
+from engine import DEFAULT_RULES, RuleProfile, build_case
+from outcomes import outcome_of
+from sharedcases import CASE_DTYPE, OUTCOME_CODES, SharedCaseBatch, decode_layout, draw_batch
+from simulate import POLICIES, play_case
+
+# ---------------------
+# Profiles
+# ---------------------
+def profile_grid(base=DEFAULT_RULES, **values):
+    # Every combination of the given field values on top of `base`, e.g.
+    # profile_grid(win_bonus=[0, 3], start_credibility=[8, 10, 12]) -> 6 profiles.
+    for field in values:
+        if field not in RuleProfile.FIELDS:
+            raise ValueError(f"Unknown rule: {field}")
+    fields = list(values)
+    return [base.replace(**dict(zip(fields, combo))) for combo in itertools.product(*values.values())]
+
+def parse_vary(text):
+    # "win_bonus=0,3,5" -> ("win_bonus", [0, 3, 5])
+    field, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"expected rule=v1,v2,...: {text}")
+    return field, [int(v) for v in values.split(",")]
+
+# ---------------------
+# Workers
+# ---------------------
+# A worker builds the case objects for its slice once and plays every
+# profile on them; games never change a case (the engine copies on write).
+_batch = None
+_profiles = None
+_policy = None
+
+def _init_worker(name, n, profiles, policy):
+    global _batch, _profiles, _policy
+    _batch = SharedCaseBatch.attach(name, n)
+    _profiles = profiles
+    _policy = POLICIES[policy]
+
+def _sweep_slice(start, stop):
+    # Returns (outcome counts [profiles x outcomes], total turns, total actions).
+    cases = []
+    for i in range(start, stop):
+        layout, seed = decode_layout(_batch.cases[i])
+        case = build_case(layout)
+        case['seed'] = seed
+        cases.append(case)
+    counts = np.zeros((len(_profiles), len(OUTCOME_CODES)), dtype=np.int64)
+    turns = np.zeros(len(_profiles), dtype=np.int64)
+    actions = np.zeros(len(_profiles), dtype=np.int64)
+    for p, rules in enumerate(_profiles):
+        for case in cases:
+            state, _, n = play_case(case, random.Random(case['seed']), _policy, rules)
+            counts[p, OUTCOME_CODES.index(outcome_of(state, rules.max_turns))] += 1
+            turns[p] += state['turns']
+            actions[p] += n
+    return counts, turns, actions
+
+def sweep(batch, profiles, workers=None, policy="greedy", chunk=500):
+    # Plays every case in `batch` under every profile; returns one dict of
+    # totals per profile.
+    starts = range(0, batch.n, chunk)
+    stops = [min(a + chunk, batch.n) for a in starts]
+    counts = np.zeros((len(profiles), len(OUTCOME_CODES)), dtype=np.int64)
+    turns = np.zeros(len(profiles), dtype=np.int64)
+    actions = np.zeros(len(profiles), dtype=np.int64)
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(batch.name, batch.n, profiles, policy)) as pool:
+        for c, t, a in pool.map(_sweep_slice, starts, stops):
+            counts += c
+            turns += t
+            actions += a
+    games = max(1, batch.n)
+    return [{
+        "rules": rules,
+        "win_rate": counts[p, OUTCOME_CODES.index("won")] / games,
+        "avg_turns": turns[p] / games,
+        "avg_actions": actions[p] / games,
+        "outcomes": dict(zip(OUTCOME_CODES, counts[p].tolist())),
+    } for p, rules in enumerate(profiles)]
+
+def cached_batch(path, seeds):
+    # Reuses case records saved by an earlier sweep, so repeated sweeps play
+    # exactly the same cases without drawing them again.
+    if path and os.path.exists(path):
+        records = np.load(path)
+        if records.dtype != CASE_DTYPE:
+            raise ValueError(f"{path} does not hold case records")
+        batch = SharedCaseBatch.create(len(records))
+        batch.cases[:] = records
+        return batch
+    batch = draw_batch(seeds)
+    if path:
+        np.save(path, batch.cases)
+    return batch
+
+# ---------------------
+# Command line
+# ---------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare rule profiles on one set of cases.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0, help="first seed; cases use consecutive seeds")
+    parser.add_argument("--cases", help=".npy file to load the cases from, or to save them to")
+    parser.add_argument("--vary", type=parse_vary, action="append", default=[], metavar="RULE=V1,V2,...",
+                        help=f"rule values to try; one of {', '.join(RuleProfile.FIELDS)}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="greedy")
+    args = parser.parse_args(argv)
+
+    profiles = profile_grid(**dict(args.vary))
+    started = time.perf_counter()
+    with cached_batch(args.cases, range(args.seed, args.seed + args.games)) as batch:
+        results = sweep(batch, profiles, args.workers, args.policy, args.chunk)
+        games = batch.n * len(profiles)
+    elapsed = time.perf_counter() - started
+    print(f"{len(profiles)} profiles x {games // max(1, len(profiles))} cases in {elapsed:.1f}s "
+          f"({games / elapsed:,.0f} games/s)")
+
+    varied = [field for field, _ in args.vary]
+    header = varied + ["win_rate", "avg_turns", "avg_actions"] + [o for o in OUTCOME_CODES if o != "won"]
+    print(" | ".join(header))
+    for r in results:
+        rules = r["rules"].as_dict()
+        cells = [str(rules[f]) for f in varied]
+        cells += [f"{r['win_rate']:.3f}", f"{r['avg_turns']:.2f}", f"{r['avg_actions']:.2f}"]
+        cells += [str(r["outcomes"][o]) for o in OUTCOME_CODES if o != "won"]
+        print(" | ".join(cells))
+
+if __name__ == "__main__":
+    main()
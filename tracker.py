@@ -0,0 +1,157 @@
+import math
+
+import engine
+from engine import motive_tag, name_tag
+
+# ---------------------
+# Evidence model
+# ---------------------
+# Mirrors generate_case: 3-4 culprit clues carry the culprit's name tag, and
+# each of the 4-6 filler clues carries either a random motive tag or a tag
+# taken from one of the other suspects (their name or their motive).
+CULPRIT_CLUE_SHARE = sum(c / (c + f) for c in (3, 4) for f in (4, 5, 6)) / 6
+FILLER_SUSPECT_SHARE = 0.5
+
+def tag_likelihoods(names, motives):
+    # tag -> log P(a found clue carries the tag | culprit = suspect k), for every k.
+    # Tags that cannot tell suspects apart (clue types, unknown tags) are left out.
+    n = len(names)
+    name_tags = [name_tag(name) for name in names]
+    motive_tags = [motive_tag(m) for m in motives]
+    filler_share = 1.0 - CULPRIT_CLUE_SHARE
+    # A filler that borrows from another suspect picks one of n-1 suspects, then one of their 2 tags
+    borrow = FILLER_SUSPECT_SHARE / max(1, n - 1) / 2
+    # Generic fillers draw from the motives of the active content pack
+    pack_motives = engine.CONTENT.motive_tag_set
+
+    table = {}
+    for tag in set(name_tags) | set(motive_tags):
+        random_motive = (1.0 - FILLER_SUSPECT_SHARE) / len(pack_motives) if tag in pack_motives else 0.0
+        owners = [(name_tags[j] == tag) + (motive_tags[j] == tag) for j in range(n)]
+        total_owners = sum(owners)
+        row = []
+        for k in range(n):
+            p = filler_share * (random_motive + borrow * (total_owners - owners[k]))
+            if name_tags[k] == tag:
+                p += CULPRIT_CLUE_SHARE
+            row.append(math.log(p) if p > 0 else -math.inf)
+        if max(row) != min(row):
+            table[tag] = tuple(row)
+    return table
+
+# ---------------------
+# Incremental tracker
+# ---------------------
+class CulpritTracker:
+    # Keeps a log-posterior over the suspects. sync() only reads what was added
+    # to the case since the last call, so each update costs O(new tags).
+    def __init__(self, suspects):
+        self.names = list(suspects)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.table = tag_likelihoods(self.names, [s.motive for s in suspects.values()])
+        self.log_post = [0.0] * len(self.names)
+        self._clues_seen = 0
+        self._accusations_seen = 0
+
+    def observe_tags(self, tags):
+        table = self.table
+        log_post = self.log_post
+        for tag in tags:
+            row = table.get(tag)
+            if row is not None:
+                for k, v in enumerate(row):
+                    log_post[k] += v
+
+    def rule_out(self, name):
+        self.log_post[self.index[name]] = -math.inf
+
+    def confirm(self, name):
+        keep = self.index[name]
+        for k in range(len(self.log_post)):
+            if k != keep:
+                self.log_post[k] = -math.inf
+
+    def sync(self, state):
+        found = state['found_clues']
+        for c in found[self._clues_seen:]:
+            self.observe_tags(c.tags)
+        self._clues_seen = len(found)
+
+        accusations = state['accusations']
+        if len(accusations) != self._accusations_seen:
+            for name, result in list(accusations.items())[self._accusations_seen:]:
+                if result == "unproven":
+                    self.confirm(name)
+                else:
+                    self.rule_out(name)
+            self._accusations_seen = len(accusations)
+        return self
+
+    def probabilities(self):
+        top = max(self.log_post)
+        if top == -math.inf:
+            return {name: 0.0 for name in self.names}
+        weights = [math.exp(v - top) for v in self.log_post]
+        total = sum(weights)
+        return {name: w / total for name, w in zip(self.names, weights)}
+
+def posterior(state):
+    return CulpritTracker(state['suspects']).sync(state).probabilities()
+
+# ---------------------
+# Batch tracker (bots, simulations)
+# ---------------------
+# Tags are interned into one vocabulary shared by all games so that an update
+# for a whole batch is a single gather and scatter-add. vecenv.VecGames keeps
+# one in step with its games.
+class BatchTracker:
+    def __init__(self, cases):
+        import numpy as np  # optional dependency, only needed for batch mode
+        self.np = np
+        self.vocab = {}
+        tables = []
+        for case in cases:
+            suspects = case['suspects']
+            table = tag_likelihoods(list(suspects), [s.motive for s in suspects.values()])
+            for tag in table:
+                self.vocab.setdefault(tag, len(self.vocab))
+            tables.append(table)
+
+        n_suspects = max(len(case['suspects']) for case in cases)
+        # Column 0 of the vocabulary is reserved for uninformative tags
+        self.table = np.zeros((len(tables), len(self.vocab) + 1, n_suspects))
+        for g, table in enumerate(tables):
+            for tag, row in table.items():
+                self.table[g, self.vocab[tag] + 1, :len(row)] = row
+            # Padding suspects (smaller cases) can never be the culprit
+            self.table[g, :, len(cases[g]['suspects']):] = -np.inf
+        self.log_post = self.table[:, 0, :].copy()
+
+    def tag_ids(self, tags):
+        # Interns tags once so hot loops can pass integer ids to observe().
+        return [self.vocab.get(t, -1) + 1 for t in tags]
+
+    def observe(self, games, tag_ids):
+        # games[i] saw tag tag_ids[i]; both are equal-length integer arrays.
+        np = self.np
+        games = np.asarray(games)
+        np.add.at(self.log_post, games, self.table[games, np.asarray(tag_ids)])
+
+    def rule_out(self, games, suspects):
+        # games[i] learned that suspect index suspects[i] is innocent
+        self.log_post[games, suspects] = -self.np.inf
+
+    def confirm(self, games, suspects):
+        # games[i] learned that suspects[i] is the culprit
+        np = self.np
+        keep = self.log_post[games, suspects]
+        self.log_post[games] = -np.inf
+        self.log_post[games, suspects] = keep
+
+    def probabilities(self):
+        # (games, suspects); all zeros for a game where everyone was ruled out
+        np = self.np
+        top = self.log_post.max(axis=1, keepdims=True)
+        weights = np.exp(self.log_post - np.where(np.isfinite(top), top, 0.0))
+        total = weights.sum(axis=1, keepdims=True)
+        return np.divide(weights, total, out=np.zeros_like(weights), where=total > 0)
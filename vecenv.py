@@ -0,0 +1,394 @@
+import argparse
+import random
+import time
+
+import numpy as np  # batch tool; numpy is required here
+
+from engine import DEFAULT_RULES, GameEngine, seeded_case
+from simulate import POLICIES
+from tracker import BatchTracker, posterior
+
+# ---------------------
+# Config
+# ---------------------
+# presented[] values, as in case_state['presented']; 0 = not presented yet
+PRESENTED_CODES = (None, "none", "weak", "strong")
+STRONG = PRESENTED_CODES.index("strong")
+# accused[] values, as in case_state['accusations']; 0 = not accused
+ACCUSATION_CODES = (None, "unproven", "innocent")
+
+# ---------------------
+# Vectorized games
+# ---------------------
+class VecGames:
+    # K games played in lockstep as numpy arrays, with the same rules as
+    # GameEngine (apply_credibility, present_evidence, check_win).
+    #
+    # Actions are integers: with L locations, C clue slots and S suspects,
+    #   [0, L)          move to location i
+    #   [L, L+C)        collect the clue in slot j
+    #   then S each of  interrogate, present, accuse suspect s
+    #   then S*C        confront suspect s with the clue in slot j (s*C + j)
+    # Clue slots are clue ids in increasing order; encode()/decode() convert
+    # to and from GameEngine action tuples. Finished games ignore actions.
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = rules
+
+    @property
+    def n_actions(self):
+        return self.L + self.C + 3 * self.S + self.S * self.C
+
+    def reset(self, cases):
+        # Starts one game per case dict (from generate_case / seeded_case).
+        # Returns the first observation.
+        cases = list(cases)
+        K = len(cases)
+        self.K = K
+        self.L = max(len(c['locations']) for c in cases)
+        self.S = max(len(c['suspects']) for c in cases)
+        clue_ids = [sorted(cl.id for loc in c['locations'].values() for cl in loc.clues) for c in cases]
+        self.C = max((len(ids) for ids in clue_ids), default=0)
+
+        self.location_names = [list(c['locations']) for c in cases]
+        self.suspect_names = [list(c['suspects']) for c in cases]
+        self.slot_ids = clue_ids
+        self.n_locations = np.array([len(c['locations']) for c in cases])
+        self.n_suspects = np.array([len(c['suspects']) for c in cases])
+        self.culprit = np.array([names.index(c['culprit']) for names, c in zip(self.suspect_names, cases)])
+        # Per clue slot: where it lies (-1 = no clue), who it links to, whose
+        # name it carries, and whether it carries the culprit's linking tag
+        self.clue_loc = np.full((K, self.C), -1, dtype=np.int64)
+        self.links = np.zeros((K, self.C, self.S), dtype=np.int64)
+        self.named = np.zeros((K, self.C, self.S), dtype=bool)
+        self.is_key = np.zeros((K, self.C), dtype=np.int64)
+        # Each suspect's alibi location (-1 = not one of the case's)
+        self.alibi = np.full((K, self.S), -1, dtype=np.int64)
+        for g, c in enumerate(cases):
+            slot = {cid: j for j, cid in enumerate(clue_ids[g])}
+            suspect = {name: s for s, name in enumerate(self.suspect_names[g])}
+            by_clue = c['answer_key'].suspects_by_clue
+            named_by_clue = c['answer_key'].named_by_clue
+            for li, loc in enumerate(c['locations'].values()):
+                for cl in loc.clues:
+                    j = slot[cl.id]
+                    self.clue_loc[g, j] = li
+                    self.is_key[g, j] = c['linking_tag'] in cl.tags
+                    for name in by_clue[cl.id]:
+                        self.links[g, j, suspect[name]] = 1
+                    for name in named_by_clue[cl.id]:
+                        self.named[g, j, suspect[name]] = True
+            for s, sus in enumerate(c['suspects'].values()):
+                if sus.alibi in c['locations']:
+                    self.alibi[g, s] = self.location_names[g].index(sus.alibi)
+        # Showing suspect s the clue in slot j, if it carries their name, catches them out
+        self.contradicts = self.named.transpose(0, 2, 1) & (self.clue_loc[:, None, :] != self.alibi[:, :, None])
+        # Culprit odds from what each game has seen, and the tracker's tag ids
+        # of the clue in every slot (0 = no tag)
+        self.tracker = BatchTracker(cases)
+        tag_ids = [[[] for _ in range(self.C)] for _ in cases]
+        for g, c in enumerate(cases):
+            for loc in c['locations'].values():
+                for cl in loc.clues:
+                    tag_ids[g][clue_ids[g].index(cl.id)] = self.tracker.tag_ids(cl.tags)
+        width = max((len(ids) for game in tag_ids for ids in game), default=0)
+        self.clue_tags = np.zeros((K, self.C, width), dtype=np.int64)
+        for g, game in enumerate(tag_ids):
+            for j, ids in enumerate(game):
+                self.clue_tags[g, j, :len(ids)] = ids
+        self.suspect_exists = np.arange(self.S) < self.n_suspects[:, None]
+        self.location_exists = np.arange(self.L) < self.n_locations[:, None]
+
+        self.credibility = np.full(K, self.rules.start_credibility, dtype=np.int64)
+        self.turns = np.zeros(K, dtype=np.int64)
+        self.location = np.zeros(K, dtype=np.int64)
+        self.collected = np.zeros((K, self.C), dtype=bool)
+        self.interrogated = np.zeros((K, self.S), dtype=bool)
+        self.presented = np.zeros((K, self.S), dtype=np.int8)
+        self.accused = np.zeros((K, self.S), dtype=np.int8)
+        self.won = np.zeros(K, dtype=bool)
+        # Found clues linking to each suspect, of those how many were already
+        # used in a strong presentation, and found culprit clues
+        self.link_found = np.zeros((K, self.S), dtype=np.int64)
+        self.presented_found = np.zeros((K, self.S), dtype=np.int64)
+        self.key_found = np.zeros(K, dtype=np.int64)
+        # Clues each suspect was confronted with, contradictions caught and
+        # how many of those a strong presentation already used
+        self.confronted = np.zeros((K, self.S, self.C), dtype=bool)
+        self.contra_found = np.zeros((K, self.S), dtype=np.int64)
+        self.contra_presented = np.zeros((K, self.S), dtype=np.int64)
+        return self.observe()
+
+    def reset_seeds(self, seeds, **kwargs):
+        return self.reset(seeded_case(seed, **kwargs) for seed in seeds)
+
+    # ---------------------
+    # Queries
+    # ---------------------
+    def done(self):
+        return self.won | (self.credibility <= 0) | (self.turns >= self.rules.max_turns)
+
+    def legal_mask(self):
+        # (K, n_actions) bool, the same choices GameEngine.legal_actions offers.
+        L, C, S = self.L, self.C, self.S
+        mask = np.zeros((self.K, self.n_actions), dtype=bool)
+        mask[:, :L] = self.location_exists & (np.arange(L) != self.location[:, None])
+        mask[:, L:L + C] = (self.clue_loc == self.location[:, None]) & ~self.collected
+        mask[:, L + C:L + C + S] = self.suspect_exists & ~self.interrogated
+        mask[:, L + C + S:L + C + 2 * S] = self.suspect_exists & (self.presented != STRONG)
+        mask[:, L + C + 2 * S:L + C + 3 * S] = self.suspect_exists
+        confront = self.interrogated[:, :, None] & self.collected[:, None, :] & ~self.confronted
+        mask[:, L + C + 3 * S:] = confront.reshape(self.K, S * C)
+        mask[self.done()] = False
+        return mask
+
+    def observe(self):
+        # Everything a player can see; the arrays are live and change on step().
+        return {
+            "credibility": self.credibility,
+            "turns": self.turns,
+            "location": self.location,
+            "clues_here": (self.clue_loc == self.location[:, None]) & ~self.collected,
+            "collected": self.collected,
+            "collected_links": self.links * self.collected[:, :, None],
+            "interrogated": self.interrogated,
+            "presented": self.presented,
+            "accused": self.accused,
+            "confronted": self.confronted,
+            "contradictions": self.contra_found,
+            "culprit_odds": self.tracker.probabilities(),
+        }
+
+    # ---------------------
+    # Stepping
+    # ---------------------
+    def _charge(self, games):
+        # apply_credibility for the games in the index array `games`
+        rules = self.rules
+        games = games[(self.credibility[games] > 0) & (self.turns[games] < rules.max_turns)]
+        if rules.action_cost > 0:
+            self.credibility[games] -= rules.action_cost
+        self.turns[games] += 1
+
+    def step(self, actions):
+        # One action per game. Returns (observation, reward, done, info):
+        # reward is 1.0 for the games won on this step.
+        rules = self.rules
+        L, C, S = self.L, self.C, self.S
+        actions = np.asarray(actions)
+        was_won = self.won.copy()
+        games = np.flatnonzero(~self.done())
+        a = actions[games]
+
+        # Moves to another location
+        sel = a < L
+        g, i = games[sel], a[sel]
+        g, i = g[i != self.location[g]], i[i != self.location[g]]
+        self._charge(g)
+        self.location[g] = i
+
+        # Collecting a clue lying here
+        sel = (a >= L) & (a < L + C)
+        g, j = games[sel], a[sel] - L
+        ok = (self.clue_loc[g, j] == self.location[g]) & ~self.collected[g, j]
+        g, j = g[ok], j[ok]
+        self._charge(g)
+        self.collected[g, j] = True
+        self.link_found[g] += self.links[g, j]
+        self.key_found[g] += self.is_key[g, j]
+        width = self.clue_tags.shape[2]
+        self.tracker.observe(np.repeat(g, width), self.clue_tags[g, j].ravel())
+
+        # Interrogation only costs the first time
+        sel = (a >= L + C) & (a < L + C + S)
+        g, s = games[sel], a[sel] - L - C
+        g, s = g[~self.interrogated[g, s]], s[~self.interrogated[g, s]]
+        self._charge(g)
+        self.interrogated[g, s] = True
+
+        # Presentations cost regardless of the outcome
+        sel = (a >= L + C + S) & (a < L + C + 2 * S)
+        g, s = games[sel], a[sel] - L - C - S
+        self._charge(g)
+        alive = (self.credibility[g] > 0) & (self.turns[g] < rules.max_turns)
+        g, s = g[alive], s[alive]
+        g, s = g[self.presented[g, s] != STRONG], s[self.presented[g, s] != STRONG]
+        score = self.link_found[g, s] - self.presented_found[g, s] + self.contra_found[g, s] - self.contra_presented[g, s]
+        strong = score >= rules.proof_clues
+        weak = ~strong & (score >= 1)
+        gs, ss = g[strong], s[strong]
+        self.credibility[gs] = np.minimum(rules.start_credibility, self.credibility[gs] + rules.present_bonus)
+        self.presented[gs, ss] = STRONG
+        self.presented_found[gs, ss] = self.link_found[gs, ss]
+        self.contra_presented[gs, ss] = self.contra_found[gs, ss]
+        self.presented[g[weak], s[weak]] = PRESENTED_CODES.index("weak")
+        none = ~strong & ~weak
+        self.credibility[g[none]] -= rules.present_penalty
+        self.presented[g[none], s[none]] = PRESENTED_CODES.index("none")
+
+        # Accusations
+        sel = (a >= L + C + 2 * S) & (a < L + C + 3 * S)
+        g, s = games[sel], a[sel] - L - C - 2 * S
+        self._charge(g)
+        alive = (self.credibility[g] > 0) & (self.turns[g] < rules.max_turns)
+        g, s = g[alive], s[alive]
+        right = s == self.culprit[g]
+        win = right & (self.key_found[g] >= rules.proof_clues)
+        gw = g[win]
+        self.credibility[gw] = np.minimum(rules.start_credibility, self.credibility[gw] + rules.win_bonus)
+        self.won[gw] = True
+        unproven = right & ~win
+        self.credibility[g[unproven]] -= rules.unproven_penalty
+        self.accused[g[unproven], s[unproven]] = ACCUSATION_CODES.index("unproven")
+        self.tracker.confirm(g[unproven], s[unproven])
+        wrong = ~right
+        self.credibility[g[wrong]] -= rules.wrong_accusation_penalty
+        self.accused[g[wrong], s[wrong]] = ACCUSATION_CODES.index("innocent")
+        self.tracker.rule_out(g[wrong], s[wrong])
+
+        # Confrontations, once per suspect and found clue
+        sel = a >= L + C + 3 * S
+        g = games[sel]
+        s, j = np.divmod(a[sel] - L - C - 3 * S, C)
+        ok = self.interrogated[g, s] & self.collected[g, j] & ~self.confronted[g, s, j]
+        g, s, j = g[ok], s[ok], j[ok]
+        self._charge(g)
+        alive = (self.credibility[g] > 0) & (self.turns[g] < rules.max_turns)
+        g, s, j = g[alive], s[alive], j[alive]
+        self.confronted[g, s, j] = True
+        np.add.at(self.contra_found, (g, s), self.contradicts[g, s, j])
+
+        reward = (self.won & ~was_won).astype(np.float64)
+        return self.observe(), reward, self.done(), {}
+
+    # ---------------------
+    # GameEngine actions
+    # ---------------------
+    def encode(self, g, action):
+        kind, arg = action
+        L, C, S = self.L, self.C, self.S
+        if kind == "move":
+            return self.location_names[g].index(arg)
+        if kind == "collect":
+            return L + self.slot_ids[g].index(arg)
+        if kind == "confront":
+            name, cid = arg
+            return L + C + 3 * S + self.suspect_names[g].index(name) * C + self.slot_ids[g].index(cid)
+        s = self.suspect_names[g].index(arg)
+        return L + C + s + S * ("interrogate", "present", "accuse").index(kind)
+
+    def decode(self, g, a):
+        L, C, S = self.L, self.C, self.S
+        if a < L:
+            return ("move", self.location_names[g][a])
+        if a < L + C:
+            return ("collect", self.slot_ids[g][a - L])
+        if a >= L + C + 3 * S:
+            s, j = divmod(a - L - C - 3 * S, C)
+            return ("confront", (self.suspect_names[g][s], self.slot_ids[g][j]))
+        kind, s = divmod(a - L - C, S)
+        return (("interrogate", "present", "accuse")[kind], self.suspect_names[g][s])
+
+    def game_state(self, g):
+        # The parts of GameEngine.state this class tracks, in the same form.
+        names = self.suspect_names[g]
+        return {
+            "credibility": int(self.credibility[g]),
+            "turns": int(self.turns[g]),
+            "current_location": self.location_names[g][self.location[g]],
+            "found_clues": sorted(self.slot_ids[g][j] for j in np.flatnonzero(self.collected[g])),
+            "interrogated": {names[s] for s in np.flatnonzero(self.interrogated[g])},
+            "presented": {names[s]: PRESENTED_CODES[v] for s, v in enumerate(self.presented[g]) if v},
+            "accusations": {names[s]: ACCUSATION_CODES[v] for s, v in enumerate(self.accused[g]) if v},
+            "outcome": "won" if self.won[g] else None,
+            "confronted": {(names[s], self.slot_ids[g][j]) for s, j in zip(*np.nonzero(self.confronted[g]))},
+            "contradictions": {names[s]: int(n) for s, n in enumerate(self.contra_found[g]) if n},
+        }
+
+def engine_state(state):
+    # GameEngine state in the form of VecGames.game_state.
+    return {
+        "credibility": state['credibility'],
+        "turns": state['turns'],
+        "current_location": state['current_location'],
+        "found_clues": sorted(c.id for c in state['found_clues']),
+        "interrogated": {name for name, s in state['suspects'].items() if s.interrogated},
+        "presented": dict(state['presented']),
+        "accusations": dict(state['accusations']),
+        "outcome": state['outcome'],
+        "confronted": {(name, cid) for name, s in state['suspects'].items() for cid in s.confronted},
+        "contradictions": {name: len(s.contradictions) for name, s in state['suspects'].items() if s.contradictions},
+    }
+
+# ---------------------
+# Equivalence check and benchmark
+# ---------------------
+def check_equivalence(cases, rules=DEFAULT_RULES, seed=0, max_steps=60, policy=None):
+    # Plays the same actions on VecGames and on one GameEngine per case in
+    # lockstep; raises AssertionError at the first difference, culprit odds
+    # against tracker.posterior included. Actions are random legal ones, or
+    # what a simulate policy picks for the GameEngine.
+    # Returns the number of game steps compared.
+    rng = np.random.default_rng(seed)
+    cases = list(cases)
+    env = VecGames(rules)
+    env.reset(cases)
+    engines = [GameEngine(c, rng=random.Random(seed), rules=rules) for c in cases]
+    compared = 0
+    for _ in range(max_steps):
+        mask = env.legal_mask()
+        live = mask.any(axis=1)
+        if not live.any():
+            break
+        # A random legal action per game, accusing rarely so that games run
+        # long enough to reach presentations and proven accusations
+        weights = rng.random(mask.shape) * mask
+        weights[:, env.L + env.C + 2 * env.S:env.L + env.C + 3 * env.S] *= 0.05
+        actions = weights.argmax(axis=1)
+        for g in np.flatnonzero(live):
+            if policy is not None:
+                actions[g] = env.encode(g, policy(engines[g], engines[g].rng))
+            expected = sorted(map(env.encode, [g] * len(engines[g].legal_actions()), engines[g].legal_actions()))
+            assert expected == np.flatnonzero(mask[g]).tolist(), f"legal actions differ in game {g}"
+            engines[g].step(env.decode(g, actions[g]))
+            compared += 1
+        env.step(actions)
+        odds = env.tracker.probabilities()
+        for g in np.flatnonzero(live):
+            assert env.game_state(g) == engine_state(engines[g].state), f"state differs in game {g}"
+            expected = posterior(engines[g].state)
+            got = odds[g, :len(expected)]
+            assert np.allclose(got, [expected[name] for name in env.suspect_names[g]]), f"culprit odds differ in game {g}"
+    return compared
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check VecGames against GameEngine and time it.")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--check", type=int, default=2000, help="games to compare with GameEngine")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    cases = [seeded_case(s) for s in range(args.seed, args.seed + args.check)]
+    compared = check_equivalence(cases, seed=args.seed)
+    compared += check_equivalence(cases, seed=args.seed, policy=POLICIES["greedy"])
+    print(f"equivalence: {compared} steps over {args.check} games (random and greedy) match GameEngine")
+
+    env = VecGames()
+    env.reset_seeds(range(args.seed, args.seed + args.games))
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    steps = 0
+    while True:
+        mask = env.legal_mask()
+        if not mask.any():
+            break
+        # Random legal actions, drawn for all games at once
+        scores = rng.random(mask.shape) * mask
+        env.step(scores.argmax(axis=1))
+        steps += int(mask.any(axis=1).sum())
+    elapsed = time.perf_counter() - started
+    print(f"{args.games} random games, {steps} game steps in {elapsed:.2f}s "
+          f"({steps / elapsed:,.0f} steps/s, {args.games / elapsed:,.0f} games/s); "
+          f"win rate {env.won.mean():.3f}")
+
+if __name__ == "__main__":
+    main()